@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+"""
+Benchmark the table loaders and the integrity checks, and gate on regressions.
+
+    python -m test.bench --save bench.json            # record a baseline
+    python -m test.bench --compare bench.json         # fail if slower / bigger
+    python -m test.bench --scale 1 5 --repeat 5 -k db
+    python -m test.bench --scale 1 10 --synthetic     # generated data, see synth.py
+
+Every benchmark is timed (best of --repeat runs) and run once more under
+tracemalloc for its peak allocation. Checks are the real test methods, run
+against data/ or, for --scale N, against a copy of data/ with every table
+replicated N times (ids made unique per copy). With --synthetic every scale,
+including 1, is a dataset generated by synth.py with N times the seats. A
+benchmark regresses when its time or peak memory exceeds the baseline by more
+than --threshold; timings under --min-seconds are too noisy to gate on. A
+check records its test's status, and a run with a failing or erroring check is
+neither saved nor compared: it would time the failure, not the check. Name
+searches (see names.py) are timed for NAME_QUERIES names, every one new and
+all memoized.
+"""
+from contextlib import contextmanager, redirect_stdout
+from pathlib import Path
+from . import cache, codes, synth
+from .names import NameIndex
+import argparse
+import io
+import json
+import numpy as np
+import os
+import pandas as pd
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+import unittest
+import warnings
+
+
+
+
+CHECKS = {
+    "duplicates": [
+        "test.db.Test.test_member_of_parliament",
+        "test.db.Test.test_party_affiliation",
+        "test.db.Test.test_person",
+    ],
+    "catalog-coverage": [
+        "test.db.Test.test_cf_emil_person",
+        "test.db.Test.test_cf_emil_member",
+        "test.db.Test.test_cf_known_iorter_metadata",
+    ],
+    "chair-range": [
+        "test.chairs.Test.test_chair_nrs_in_range_for_year",
+    ],
+    "chair-coverage": [
+        "test.chairs.Test.test_chair_coverage",
+    ],
+    "mandate-dates": [
+        "test.mandates.Test.test_manually_checked_mandates",
+    ],
+    "party-matching": [
+        "test.party-affiliation.Test.test_party",
+    ],
+    "mp-frequency": [
+        "test.mp-frequency-test.Test.test_mp_frequency",
+    ],
+}
+
+ID_COLUMNS = ["person_id", "chair_id", "wiki_id", "riksdagen_id"]
+
+# name lookups per search benchmark, each name with one character dropped as OCR would
+NAME_QUERIES = 1000
+
+
+def scale_tables(src, dst, factor):
+    """
+    Write every csv of src to dst replicated `factor` times, suffixing id columns per copy.
+    """
+    dst.mkdir(parents=True, exist_ok=True)
+    for path in sorted(Path(src).glob("*.csv")):
+        df = pd.read_csv(path, dtype=str, keep_default_na=False)
+        copies = [df]
+        for i in range(1, factor):
+            c = df.copy()
+            for col in ID_COLUMNS:
+                if col in c.columns:
+                    c[col] = c[col].where(c[col] == "", c[col] + f"-{i}")
+            copies.append(c)
+        pd.concat(copies, ignore_index=True).to_csv(dst / path.name, index=False)
+
+
+@contextmanager
+def workdir(factor, synthetic=False):
+    """
+    Run in the repo (factor 1) or in a temporary tree with scaled or generated data/.
+    """
+    if factor == 1 and not synthetic:
+        yield Path(".")
+        return
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        if synthetic:
+            synth.generate(tmp, multiple=factor)
+        else:
+            scale_tables(Path(cwd) / "data", tmp / "data", factor)
+            shutil.copytree(Path(cwd) / "test" / "data", tmp / "test" / "data")
+        os.chdir(tmp)
+        try:
+            yield tmp
+        finally:
+            os.chdir(cwd)
+
+
+def measure(fn, repeat):
+    """
+    Return (best wall seconds, peak traced MB, return value of the last run) of a callable.
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    tracemalloc.start()
+    try:
+        value = fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return best, peak / 2**20, value
+
+
+def run_test(test_id):
+    """
+    Run one test method quietly; return its status, "ok", "skip", "fail" or "error".
+    """
+    suite = unittest.TestLoader().loadTestsFromName(test_id)
+    result = unittest.TestResult()
+    with warnings.catch_warnings(), redirect_stdout(io.StringIO()):
+        warnings.simplefilter("ignore")
+        suite.run(result)
+    if result.errors:
+        return "error"
+    if result.failures or result.unexpectedSuccesses:
+        return "fail"
+    return "skip" if result.skipped else "ok"
+
+
+def reset_memos():
+    """
+    Forget everything memoized in-process, e.g. before switching data directories.
+    """
+    cache._memo.clear()
+    codes.clear()
+    db = sys.modules.get("test.db")
+    if db is not None:
+        db.Test._catalog_coverage = None
+
+
+def cold_read(path, sep):
+    cache._memo.clear()
+    target = cache.cache_path(path, cache.content_hash(path, sep))
+    if target.exists():
+        target.unlink()
+    cache.read_csv(path, sep=sep)
+
+
+def warm_read(path, sep):
+    cache._memo.clear()
+    cache.read_csv(path, sep=sep)
+
+
+def loader_benchmarks(repeat, keep):
+    results = {}
+    for path in sorted(Path("data").glob("*.csv")):
+        for kind, fn in [
+                ("csv", lambda: pd.read_csv(path)),
+                ("cold", lambda: cold_read(path, ",")),
+                ("warm", lambda: warm_read(path, ","))]:
+            name = f"load:{path.stem}:{kind}"
+            if keep(name):
+                seconds, peak, _ = measure(fn, repeat)
+                results[name] = (seconds, peak, None)
+    return results
+
+
+def check_benchmarks(repeat, keep):
+    results = {}
+    for group, tests in CHECKS.items():
+        for test_id in tests:
+            name = f"check:{group}:{test_id.rsplit('.', 1)[-1]}"
+            if keep(name):
+                results[name] = measure(lambda: run_test(test_id), repeat)
+    return results
+
+
+def name_queries(names, n=NAME_QUERIES, seed=0):
+    """
+    Return n distinct names from name.csv, each with one character dropped.
+    """
+    names = names["name"].dropna().drop_duplicates()
+    names = names.sample(min(n, len(names)), random_state=seed).tolist()
+    drop = np.random.default_rng(seed).integers(0, [max(len(q), 1) for q in names])
+    return list(dict.fromkeys(q[:i] + q[i + 1:] for q, i in zip(names, drop)))
+
+
+def name_benchmarks(repeat, keep):
+    """
+    Time NAME_QUERIES name searches: every query new ("uncached"), and all answered from the memo.
+    """
+    names = ["names:search:uncached", "names:search:memo"]
+    if not any(keep(name) for name in names):
+        return {}
+    index = NameIndex.load()
+    queries = name_queries(cache.load_table("name"))
+
+    def uncached():
+        index.memo.clear()
+        index.candidate_memo.clear()
+        for q in queries:
+            index.search(q)
+
+    def memo():
+        for q in queries:
+            index.search(q)
+
+    results = {}
+    for name, fn in zip(names, [uncached, memo]):
+        if keep(name):
+            index.memo.clear()
+            index.candidate_memo.clear()
+            memo()
+            seconds, peak, _ = measure(fn, repeat)
+            results[name] = (seconds, peak, None)
+            print(f"{len(queries) / seconds:10.0f} queries/s  {name}")
+    return results
+
+
+def benchmark(scales, repeat, pattern=None, synthetic=False):
+    """
+    Return {name@xN: {"seconds", "peak_mb"}} for all selected benchmarks, checks with their test's "status".
+
+    Names of synthetic runs read name@synN.
+    """
+    os.environ.pop("PERSONS_BASE_REV", None)
+    keep = lambda name: pattern is None or pattern in name
+    out = {}
+    for factor in scales:
+        with workdir(factor, synthetic):
+            reset_memos()
+            results = loader_benchmarks(repeat, keep)
+            results.update(check_benchmarks(repeat, keep))
+            results.update(name_benchmarks(repeat, keep))
+        for name, (seconds, peak, status) in results.items():
+            key = f"{name}@{'syn' if synthetic else 'x'}{factor}"
+            out[key] = {"seconds": round(seconds, 5), "peak_mb": round(peak, 2)}
+            if status is not None:
+                out[key]["status"] = status
+            print(f"{seconds:10.4f}s {peak:9.1f}MB  {key}" + (f"  {status}" if status not in (None, "ok") else ""))
+    return out
+
+
+def compare(results, baseline, threshold, min_seconds):
+    """
+    Return the list of regressions of results against a baseline.
+    """
+    regressions = []
+    for name, b in baseline.items():
+        r = results.get(name)
+        if r is None:
+            continue
+        if b["seconds"] >= min_seconds and r["seconds"] > b["seconds"] * (1 + threshold):
+            regressions.append(f"{name}: {b['seconds']:.4f}s -> {r['seconds']:.4f}s")
+        if r["peak_mb"] > max(b["peak_mb"], 1) * (1 + threshold):
+            regressions.append(f"{name}: {b['peak_mb']:.1f}MB -> {r['peak_mb']:.1f}MB")
+    return regressions
+
+
+def failed(results):
+    """
+    Return the names of the benchmarks whose test failed or errored; their timings measure the failure.
+    """
+    return [name for name, r in results.items() if r.get("status", "ok") not in ("ok", "skip")]
+
+
+def main(args):
+    results = benchmark(args.scale, args.repeat, args.k, args.synthetic)
+    broken = failed(results)
+    if broken and (args.save or args.compare):
+        for name in broken:
+            print(f"FAILED {name}: {results[name]['status']}")
+        print("not saving or comparing benchmarks of failing tests")
+        return 1
+    if args.save:
+        with open(args.save, "w") as o:
+            json.dump({
+                "python": platform.python_version(),
+                "pandas": pd.__version__,
+                "machine": platform.machine(),
+                "results": results,
+            }, o, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+        if failed(baseline):
+            print(f"{args.compare} has benchmarks of failing tests: {', '.join(failed(baseline))}")
+            return 1
+        regressions = compare(results, baseline, args.threshold, args.min_seconds)
+        for r in regressions:
+            print(f"REGRESSION {r}")
+        if regressions:
+            return 1
+    return 0
+
+
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", type=int, nargs="+", default=[1], help="data multiples to benchmark")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per benchmark, the best counts")
+    parser.add_argument("-k", default=None, help="only benchmarks whose name contains this")
+    parser.add_argument("--synthetic", action="store_true", help="benchmark on generated data instead of data/")
+    parser.add_argument("--save", default=None, help="write results as a JSON baseline")
+    parser.add_argument("--compare", default=None, help="JSON baseline to gate against")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed relative slowdown")
+    parser.add_argument("--min-seconds", type=float, default=0.01, help="ignore timings below this")
+    args = parser.parse_args()
+    sys.exit(main(args))
@@ -0,0 +1,141 @@
+"""
+Content-hashed cache of the csv tables read by the integrity tests.
+
+Every csv is parsed once and stored as a typed columnar file (feather if
+pyarrow is installed, pickle otherwise) named after a hash of its contents.
+The cache file is reused by later test methods and processes and only
+rebuilt when the csv actually changes.
+
+Tables derived from a csv (see `read_derived`) are cached the same way, under
+the hash of the csv they were built from.
+
+The cache lives in `.cache/persons/`, or wherever PERSONS_CACHE_DIR points.
+"""
+from pathlib import Path
+import hashlib
+import numpy as np
+import os
+import pandas as pd
+
+try:
+    import pyarrow.feather as feather
+except ImportError:
+    feather = None
+
+
+
+
+CACHE_DIR = Path(os.environ.get("PERSONS_CACHE_DIR", ".cache/persons"))
+
+_memo = {}
+
+# rows and tables handed out, for instrument.py
+reads = {"tables": 0, "rows": 0}
+
+
+def count_read(rows, tables=1):
+    """
+    Add to the rows and tables read so far.
+    """
+    reads["tables"] += tables
+    reads["rows"] += rows
+
+
+def content_hash(path, sep=","):
+    """
+    Return the hex digest of a file's contents (and the separator it is read with).
+    """
+    h = hashlib.sha1()
+    h.update(f"{pd.__version__}|{sep}|".encode())
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def cache_path(path, digest, kind=None):
+    """
+    Return the location of the cache file for a csv (or a table of `kind` derived from it) with the given digest.
+    """
+    suffix = ".feather" if feather is not None else ".pkl"
+    stem = Path(path).stem if kind is None else f"{Path(path).stem}.{kind}"
+    return CACHE_DIR / f"{stem}-{digest[:16]}{suffix}"
+
+
+def _write(df, target):
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp = target.with_name(f"{target.name}.{os.getpid()}.tmp")
+    try:
+        if feather is not None:
+            feather.write_feather(df, tmp)
+        else:
+            df.to_pickle(tmp)
+        os.replace(tmp, target)
+    except BaseException:
+        try:
+            tmp.unlink()
+        except OSError:
+            pass
+        raise
+
+
+def _read(target):
+    if target.suffix == ".feather":
+        df = feather.read_feather(target, memory_map=True)
+        # arrow hands back None for missing strings; read_csv gives NaN
+        for col in df.columns[df.dtypes == object]:
+            df[col] = df[col].where(df[col].notna(), np.nan)
+        return df
+    return pd.read_pickle(target)
+
+
+def _cached(path, sep, kind, build):
+    path = Path(path)
+    stat = path.stat()
+    key = (str(path.resolve()), sep, kind)
+    stamp = (stat.st_mtime_ns, stat.st_size)
+    hit = _memo.get(key)
+    if hit is None or hit[0] != stamp:
+        target = cache_path(path, content_hash(path, sep), kind)
+        df = None
+        if target.exists():
+            try:
+                df = _read(target)
+            except Exception:
+                df = None
+        if df is None:
+            df = build()
+            # the cache only saves time: a df arrow or pickle can't write is still the parsed csv
+            try:
+                _write(df, target)
+            except Exception:
+                pass
+        hit = (stamp, df)
+        _memo[key] = hit
+    count_read(len(hit[1]))
+    return hit[1].copy()
+
+
+def read_csv(path, sep=","):
+    """
+    Return a csv as a df, from the in-process memo or cache file when the contents are unchanged.
+
+    The df is a copy, callers are free to modify it.
+    """
+    return _cached(path, sep, None, lambda: pd.read_csv(path, sep=sep))
+
+
+def read_derived(path, kind, build, sep=","):
+    """
+    Return `build(df)` of a csv, cached like `read_csv` and rebuilt only when the csv changes.
+
+    `kind` names the derived table; change it when `build` changes.
+    """
+    return _cached(path, sep, kind, lambda: build(read_csv(path, sep=sep)))
+
+
+def load_table(name, metadata_folder="data"):
+    """
+    Return `<metadata_folder>/<name>.csv` as a df.
+    """
+    return read_csv(Path(metadata_folder) / f"{name}.csv")
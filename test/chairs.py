@@ -3,8 +3,12 @@
 Test chars and chair-mp mapping metadata
 """
 from datetime import datetime
-from pyriksdagen.date_handling import yearize_mandates
 from pytest_cfg_fetcher.fetch import fetch_config
+from .cache import load_table
+from .incremental import get_scope
+from .issues import get_sink, issue_dir
+from .overlap import find_overlaps, resolve_chair_intervals
+from .seats import expected_chairs, load_chair_ranges, load_unmapped_years, Occupancy, start_year
 import json
 import pandas as pd
 import unittest
@@ -95,61 +99,29 @@ class Test(unittest.TestCase):
     #
     #  read in chairs.csv
     def get_chairs(self):
-        return pd.read_csv("data/chairs.csv")
+        return load_table("chairs")
 
     #  read in chair_mp.csv
     def get_chair_mp(self):
-        return pd.read_csv("data/chair_mp.csv")
+        return load_table("chair_mp")
 
     # read in mep metadata
     def get_mep(self):
-        df = pd.read_csv("data/member_of_parliament.csv")
+        df = load_table("member_of_parliament")
         return df.rename(columns={"start": "meta_start", "end":"meta_end"})
 
     # read in parliament start end dates
     def get_riksdag_year(self):
-        return pd.read_csv("data/riksdag-year.csv")
-
-    #  set max values for each chamber
-    def get_max_chair(self):
-        max_chair = {
-            'ak':233,
-            'fk':151,
-            'ek':350
-        }
-        return max_chair
-
-    #  Out of range chair for specific years
-    def get_oor_year(self):
-        oor_year = {
-            '1957':
-                    [    # until 1957 -- if year < 1957
-                    '814127872a174909bd6ecaeaf59290fe',  # a231
-                    'd423710cb9e64b17b93484e120f07e66',  # a232
-                    'c77cdeebf789416e98cf8afb05b75a23',  # a233
-                    '34ad45b358764a388b53c45ae1ce3681'   # f151
-                    ],
-            '1959':
-                    [    # until 1959 -- elif year < 1959
-                    '814127872a174909bd6ecaeaf59290fe',  # a231
-                    'd423710cb9e64b17b93484e120f07e66',  # a232
-                    'c77cdeebf789416e98cf8afb05b75a23'   # a233
-                    ],
-            '1961':
-                    [    # unitl 1961 -- elif year < 1961
-                    'd423710cb9e64b17b93484e120f07e66',  # a232
-                    'c77cdeebf789416e98cf8afb05b75a23'   # a233
-                    ],
-            '1965':
-                    [    # until 1965 -- elif year < 1965
-                    'c77cdeebf789416e98cf8afb05b75a23'   # a233
-                    ],
-            '7677':
-                    [    # from 197677
-                    'af0ebaa9aed64c2d91750aa72651ea74'   # e350
-                    ]
-        }
-        return oor_year
+        return load_table("riksdag-year")
+
+    #  chair numbers per chamber and period
+    def get_chair_ranges(self):
+        return load_chair_ranges()
+
+    #  chair_mp isn't fully mapped for these years yet:
+    #  the number of empty chairs each of them has today
+    def get_unmapped_years(self):
+        return load_unmapped_years()
 
     #
     #  --->  misc fns
@@ -180,10 +152,13 @@ class Test(unittest.TestCase):
         check chair IDs are unique
         """
         print("Testing: chairs have unique IDs")
+        get_scope().skip_if_unchanged(self)
         chairs = self.get_chairs()
         chair_ids = chairs['chair_id'].values
         if len(chair_ids) != len(set(chair_ids)):
             warnings.warn("There's probably a duplicate chair ID.", DuplicateIDWarning)
+        duplicated = chairs[chairs['chair_id'].duplicated(keep=False)]
+        get_sink().add_frame(self.id(), "chairs", duplicated, key=["chair_id"], message="duplicate chair_id")
         self.assertEqual(len(chair_ids), len(set(chair_ids)))
 
     #@unittest.skip
@@ -192,12 +167,15 @@ class Test(unittest.TestCase):
         check no chairs are numbered higher than the max chair nr for that chamber
         """
         print("Testing: chairs within max range for chamber")
+        get_scope().skip_if_unchanged(self)
         chairs = self.get_chairs()
-        max_chair = self.get_max_chair()
+        max_chair = self.get_chair_ranges().groupby("chamber")["last_chair"].max()
         for k, v in max_chair.items():
             oor_chairs = chairs.loc[(chairs['chamber'] == k) & (chairs['chair_nr'] > v)]
             if len(oor_chairs) > 0:
                 warnings.warn(k, ChairOutOfRange)
+            get_sink().add_frame(self.id(), "chairs", oor_chairs, key=["chair_id"],
+                                 message=f"chair_nr above {v}, the highest in {k}")
             self.assertEqual(len(oor_chairs), 0)
 
     #
@@ -210,12 +188,17 @@ class Test(unittest.TestCase):
         check chair IDs in chair_mp are the same set as chairs
         """
         print("Testing: chair ids are the same set in chairs.csv and chair_mp.csv")
+        get_scope().skip_if_unchanged(self, "chair_mp")
         chairs = self.get_chairs()
         chair_mp = self.get_chair_mp()
         chair_ids_a = chairs['chair_id'].unique()
         chair_ids_b = chair_mp['chair_id'].unique()
         if set(chair_ids_a) != set(chair_ids_b):
             warnings.warn(ChairIDMismatchW)
+        only_a = pd.DataFrame({"chair_id": sorted(set(chair_ids_a) - set(chair_ids_b))})
+        only_b = pd.DataFrame({"chair_id": sorted(set(chair_ids_b) - set(chair_ids_a))})
+        get_sink().add_frame(self.id(), "chairs", only_a, key=["chair_id"], message="not in chair_mp.csv")
+        get_sink().add_frame(self.id(), "chair_mp", only_b, key=["chair_id"], message="not in chairs.csv")
         self.assertEqual(len(chair_ids_a), len(chair_ids_b))
 
     #@unittest.skip
@@ -224,6 +207,7 @@ class Test(unittest.TestCase):
         check no chairs from tvåkammartiden are used in enkammartid and vice-versa
         """
         print("Testing: no chairs from tvåkammartiden are used in enkammartid and vice-versa")
+        get_scope().skip_if_unchanged(self, "chair_mp")
         chairs = self.get_chairs()
         config = fetch_config("chairs")
         tvok_chairs = chairs.loc[chairs['chamber'] != 'ek', 'chair_id'].unique()
@@ -237,24 +221,17 @@ class Test(unittest.TestCase):
             chair_mp['parliament_year'] > 1970,
             'chair_id'
         ].unique()
-        tkc_in_enkt = []           # tvåkammar chair in enkammartid
-        ekc_in_tvkt = []           # enkammar chair in tvåkammartid
-        for c in tvok_chair_mp_chairs:
-            if c in enk_chairs:
-                ekc_in_tvkt.append(c)
-        for c in enk_chair_mp_chairs:
-            if c in tvok_chairs:
-                tkc_in_enkt.append(c)
+        # tvåkammar chairs in enkammartid, enkammar chairs in tvåkammartid
+        tkc_in_enkt = pd.DataFrame({"chair_id": enk_chair_mp_chairs[pd.Index(enk_chair_mp_chairs).isin(tvok_chairs)]})
+        ekc_in_tvkt = pd.DataFrame({"chair_id": tvok_chair_mp_chairs[pd.Index(tvok_chair_mp_chairs).isin(enk_chairs)]})
         if len(tkc_in_enkt) > 0:
             warnings.warn('tvåkammar chair in enkammartid',ChairInWrongTimePeriod)
-            if config and config['write_tkc_in_enkt']:
-                with open(f"{config['test_out_dir']}/{self.what_time_it_is()}_tkc_in_enkt.txt", "w+") as o:
-                    [o.write(f"{_}\n") for _ in tkc_in_enkt]
+        get_sink().add_frame(self.id(), "chair_mp", tkc_in_enkt, key=["chair_id"],
+                             message="tvåkammar chair in enkammartid", out_dir=issue_dir(config, "write_tkc_in_enkt"))
         if len(ekc_in_tvkt) > 0:
             warnings.warn('enkammar chair in tvåkammartid', ChairInWrongTimePeriod)
-            if config and config['write_ekc_in_tvkt']:
-                with open(f"{config['test_out_dir']}/{self.what_time_it_is()}_ekc_in_tvkt.txt", "w+") as o:
-                    [o.write(f"{_}\n") for _ in ekc_in_tvkt]
+        get_sink().add_frame(self.id(), "chair_mp", ekc_in_tvkt, key=["chair_id"],
+                             message="enkammar chair in tvåkammartid", out_dir=issue_dir(config, "write_ekc_in_tvkt"))
         self.assertEqual(len(tkc_in_enkt), 0)
         self.assertEqual(len(ekc_in_tvkt), 0)
 
@@ -266,323 +243,123 @@ class Test(unittest.TestCase):
            in the chair_mp file (whether filled or not)
         """
         print("Testing: chairs are within acceptable range for a given year\n     and that every seat within that range is present at least once")
-        chairs = self.get_chairs()
+        get_scope().skip_if_unchanged(self, "chair_mp")
         config = fetch_config("chairs")
-        tvok_chairs = chairs.loc[chairs['chamber'] != 'ek', 'chair_id'].unique()
-        enk_chairs = chairs.loc[chairs['chamber'] == 'ek', 'chair_id'].unique()
-        chair_mp = self.get_chair_mp()
-        oor_year = self.get_oor_year()
-        rd_years = chair_mp['parliament_year'].unique()
-        OutOfRange = []
-        missing_in_R = []
-        for y in rd_years:
-            year_chair_mp_chairs = chair_mp.loc[
-                chair_mp['parliament_year'] == y,
-                'chair_id'
-            ].unique()
-            excludes = []
-            if y < 1971:
-                if y <= 1957:
-                    excludes = oor_year['1957']
-                elif y < 1959:
-                    excludes = oor_year['1959']
-                elif y < 1961:
-                    excludes = oor_year['1961']
-                elif y < 1965:
-                    excludes = oor_year['1965']
-                if len(excludes) > 0:
-                    for x in excludes:
-                        if x in year_chair_mp_chairs:
-                            OutOfRange.append([y, x])
-                            warnings.warn(f"{y}: {x}", ChairYearOutOfRange)
-                if len(tvok_chairs) > len(year_chair_mp_chairs)+len(excludes):
-                    for c in tvok_chairs:
-                        if c not in year_chair_mp_chairs and c not in excludes:
-                            missing_in_R.append([y, c])
-                            warnings.warn(f"{y}: {c}", ChairMissingFromRange)
-                elif len(tvok_chairs) > len(year_chair_mp_chairs)+len(excludes):
-                    self.assertFalse(True, "¡Sth is super wrong!")
-            else:
-                if y > 197576 or y == 1980:
-                    excludes = oor_year['7677']
-                if len(excludes) > 0:
-                    for x in excludes:
-                        if x in year_chair_mp_chairs:
-                            OutOfRange.append([y, x])
-                            warnings.warn(f"{y}: {x}", ChairYearOutOfRange)
-                if len(enk_chairs) < len(year_chair_mp_chairs)+len(excludes):
-                    for c in tvok_chairs:
-                        if c not in year_chair_mp_chairs and c not in excludes:
-                            missing_in_R.append([y, c])
-                            warnings.warn(f"{y}: {c}", ChairMissingFromRange)
-                elif len(enk_chairs) > len(year_chair_mp_chairs)+len(excludes):
-                    self.assertFalse(True, "¡Sth is super wrong!")
-        if len(OutOfRange) > 0:
-            if config and config["write_chair_nrs_in_range"]:
-                df = pd.DataFrame(OutOfRange, columne=["year", "chair"])
-                df.to_csv(
-                    f"{config['test_out_dir']}/{what_time_it_is}_chair-OOR.csv",
-                    sep=';',
-                    index=False)
-        if len(missing_in_R) > 0:
-            if config and config["write_chair_nrs_in_range"]:
-                df = pd.DataFrame(missing_in_R, columne=["year", "chair"])
-                df.to_csv(
-                    f"{config['test_out_dir']}/{self.what_time_it_is()}_chair-missing-in-R.csv",
-                    sep=';',
-                    index=False)
+        present = self.get_chair_mp()[["parliament_year", "chair_id"]].drop_duplicates()
+        expected = expected_chairs(self.get_chairs(), self.get_chair_ranges(), present["parliament_year"])
+        compared = present.merge(expected, on=["parliament_year", "chair_id"], how="outer", indicator=True)
+        OutOfRange = compared.loc[compared["_merge"] == "left_only", ["parliament_year", "chair_id"]]
+        missing_in_R = compared.loc[compared["_merge"] == "right_only", ["parliament_year", "chair_id"]]
+        for y, x in OutOfRange.itertuples(index=False):
+            warnings.warn(f"{y}: {x}", ChairYearOutOfRange)
+        for y, c in missing_in_R.itertuples(index=False):
+            warnings.warn(f"{y}: {c}", ChairMissingFromRange)
+        out_dir = issue_dir(config, "write_chair_nrs_in_range")
+        get_sink().add_frame(self.id(), "chair_mp", OutOfRange, key=["parliament_year", "chair_id"],
+                             message="chair out of range for the year", out_dir=out_dir)
+        get_sink().add_frame(self.id(), "chair_mp", missing_in_R, key=["parliament_year", "chair_id"],
+                             message="chair in range missing for the year", out_dir=out_dir)
         self.assertEqual(len(OutOfRange), 0)
         self.assertEqual(len(missing_in_R), 0)
 
     #
-    #  --->  Test integrity of bum to chair mapping
-    # ---------------------------------------------
+    #  --->  Test coverage
+    # ---------------------
     #
-    @unittest.skip
+    #@unittest.skip
+    def test_chair_coverage(self):
+        """
+        test all chairs are filled
+        """
+        print("Test coverage of chair-MP mapping.")
+        get_scope().skip_if_unchanged(self, "chair_mp")
+        config = fetch_config("chairs")
+        chair_mp = get_scope().restrict_parliament_years(self.get_chair_mp())
+        seats = Occupancy.build(self.get_chairs(), chair_mp)
+        empty_chairs = seats.empty_chairs()
+        in_use = dict(zip(seats.years, (seats.rows > 0).sum(axis=1)))
+        for y, year_empty in empty_chairs.groupby("parliament_year"):
+            print("\n\n")
+            warnings.warn(f"{y}: [{', '.join(year_empty['chair_id'])}]", EmptyChair)
+            print("\n" + str(len(year_empty) / in_use[y]) + " emptiness in year")
+
+        get_sink().add_frame(self.id(), "chair_mp", empty_chairs, key=["parliament_year", "chair_id"],
+                             message="empty chair", out_dir=issue_dir(config, "write_empty_seats"))
+
+        years = pd.Index(start_year(seats.years)).unique()
+        found = pd.Series(start_year(empty_chairs["parliament_year"])).value_counts().reindex(years, fill_value=0)
+        expected = self.get_unmapped_years().reindex(years, fill_value=0)
+        counts = pd.DataFrame({"empty_chairs": found, "expected": expected})
+        self.assertTrue((found == expected).all(), counts[found != expected])
+
+
+
+
+class Conflicts(unittest.TestCase):
+    """
+    Integrity of the bum to chair mapping: no double bookings.
+
+    chair_mp still has some. They fail these tests and are reported to the
+    issue sink; CI runs them apart from Test, in a job that may fail.
+    """
+    #  occupied chair_mp rows with their resolved start and end
+    def get_resolved_chair_mp(self):
+        return resolve_chair_intervals(
+            get_scope().restrict_parliament_years(load_table("chair_mp")),
+            load_table("chairs"),
+            load_table("member_of_parliament"),
+            load_table("riksdag-year"))
+
+    what_time_it_is = Test.what_time_it_is
+
+
+    #@unittest.skip
     def test_chair_hogs(self):
         """
         check no single person sits in two places at once
         """
         print("Testing: no single person sits in two places at once")
-        chair_mp = self.get_chair_mp()
-        chair_mp.rename(columns={"start": "chair_start", "end":"chair_end"}, inplace=True)
-        chair_mp = chair_mp[chair_mp["person_id"].notna()]
-        chairs = self.get_chairs()
-        chair_mp = pd.merge(chair_mp, chairs, on="chair_id", how="left")
-        mep_by_year = yearize_mandates()
-        mep_by_year.rename(columns={"start": "meta_start", "end":"meta_end"}, inplace=True)
-        mep_by_year = mep_by_year[mep_by_year["meta_start"].notna()]
+        get_scope().skip_if_unchanged(self, "chair_mp", "member_of_parliament")
         config = fetch_config("chairs")
+        chair_mp = self.get_resolved_chair_mp()
         if config and config['write_ch_chmp_merge']:
-            mep_by_year.to_csv(
+            chair_mp.to_csv(
                 f"{config['test_out_dir']}/{self.what_time_it_is()}_chair-chairmp_merge.csv",
                 sep=';',
                 index=False)
-        chair_mp = pd.merge(chair_mp, mep_by_year, on=["person_id", "parliament_year"], how="left")
-
         if config and config['write_trouble_matching']:
-            outdf = chair_mp.loc[pd.isna(chair_mp["role"])].copy()
+            outdf = chair_mp.loc[pd.isna(chair_mp["meta_start"])]
             if not outdf.empty:
                 outdf.to_csv(
                     f"{config['test_out_dir']}/{self.what_time_it_is()}_trouble-matching-yearize.csv",
                     sep=';',
                     index=False)
 
-        general_start_end = self.get_riksdag_year()
-        no_chair_hogs = True
-        counter = 0
-        ddups = []
-        issues = pd.DataFrame(columns=chair_mp.columns)
-        for y in chair_mp['parliament_year'].unique():
-            year_chair_mp = chair_mp.loc[chair_mp['parliament_year'] == y]
-            yse = general_start_end.loc[general_start_end['parliament_year'] == y].copy()
-            yse.reset_index(drop=True, inplace=True)
-            yse.sort_values(by=["chamber", "start", "end"], inplace=True)
-            cs = yse["chamber"].unique()
-            d = {}
-            for c in cs:
-                cdf = yse.loc[yse["chamber"] == c].copy()
-                cdf.reset_index(drop=True, inplace=True)
-                d[c] = {"earliest": cdf.at[0, "start"], "latest": cdf.at[len(cdf.index)-1, "end"]}
-            mps = year_chair_mp.loc[pd.notnull(year_chair_mp['person_id']), 'person_id'].values
-            if len(mps) > len(set(mps)):
-                dups = self.get_duplicated_items(mps)
-                ch = []
-                for dup in dups:
-                    df = year_chair_mp.loc[year_chair_mp["person_id"] == dup].copy()
-                    df.drop_duplicates(subset=["chair_id", "parliament_year", "chair_start", "chair_end", "person_id"], inplace=True)
-                    if len(df["chair_id"].unique()) == 1:
-                        pass
-                    elif len(df["chamber"].unique()) > 1:
-                        if dup not in ch:
-                            ch.append(dup)
-                            print("\n--->>>>", dup)
-                            print(df)
-                        print("IN TWO CHAMBERS")
-                        issues = pd.concat([issues, df], ignore_index=True)
-                    else:
-                        ranges = []
-                        for i, r in df.iterrows():
-                            rstart = None
-                            if pd.notnull(r["chair_start"]):
-                                rstart = r["chair_start"]
-                            elif pd.notnull(r['meta_start']):
-                                rstart = r['meta_start']
-                            else:
-                                rstart = d[r["chamber"]]["earliest"]
-                            rend = None
-                            if pd.notnull(r["chair_end"]):
-                                rend = r["chair_end"]
-                            elif pd.notnull(r["meta_end"]):
-                                rend = r["meta_end"]
-                            else:
-                                rend = d[r["chamber"]]["latest"]
-                            ranges.append((rstart, rend))
-                        ranges = sorted(ranges, key=lambda x: (x[0], x[1]))
-                        for ridx, _range in enumerate(ranges):
-                            if ridx < len(ranges)-1:
-                                delta = (datetime.strptime(_range[1], "%Y-%m-%d") - datetime.strptime(ranges[ridx+1][0], "%Y-%m-%d")).days
-                                if max(0, delta) > 0:
-                                    issues = pd.concat([issues,df], ignore_index=True)
-                                    if dup not in ch:
-                                        ch.append(dup)
-                                        print("\n--->>>>", dup)
-                                        print(ranges)
-                                        print(df)
-                                        print(_range, ranges[ridx+1])
-
-                if len(ch) > 0:
-                    print("\n\n")
-                    warnings.warn(f"{y}: [{', '.join(ch)}]", ChairHog)
-                    no_chair_hogs = False
-                    counter += len(ch)
-                    [ddups.append(_) for _ in ch]
-        if config and config['write_chairhogs']:
-            issues.drop_duplicates(inplace=True)
-            issues.to_csv(
-                f"{config['test_out_dir']}/{self.what_time_it_is()}_ChairHogs.csv",
-                sep=';',
-                index=False)
-        print(counter, ddups)
-        self.assertTrue(no_chair_hogs)
+        issues = find_overlaps(chair_mp, ["parliament_year", "person_id"], "chair_id", across="chamber")
+        for y, year_issues in issues.groupby("parliament_year", sort=False):
+            print("\n\n")
+            warnings.warn(f"{y}: [{', '.join(year_issues['person_id'].unique())}]", ChairHog)
+        get_sink().add_frame(self.id(), "chair_mp", issues, key=["parliament_year", "person_id"],
+                             message="in two chairs at once", out_dir=issue_dir(config, "write_chairhogs"))
+        self.assertTrue(issues.empty, issues[["parliament_year", "person_id", "chair_id"]])
 
 
-    @unittest.skip
+    #@unittest.skip
     def test_knaMP(self):
         """
         Check no one is sharing a chare
         """
         print("Testing no one sits on the same chair at the same time")
+        get_scope().skip_if_unchanged(self, "chair_mp", "member_of_parliament")
         config = fetch_config("chairs")
-        chair_mp = self.get_chair_mp()
-        chair_mp.rename(columns={"start": "chair_start", "end":"chair_end"}, inplace=True)
-        chair_mp = chair_mp[chair_mp["person_id"].notna()]
-        chairs = self.get_chairs()
-        chair_mp = pd.merge(chair_mp, chairs, on="chair_id", how="left")
-        mep_by_year = yearize_mandates()
-        mep_by_year.rename(columns={"start": "meta_start", "end":"meta_end"}, inplace=True)
-        mep_by_year = mep_by_year[mep_by_year["meta_start"].notna()]
-        chair_mp = pd.merge(chair_mp, mep_by_year, on=["person_id", "parliament_year"], how="left")
-        general_start_end = self.get_riksdag_year()
-        ingen_knahund = True
-        counter = 0
-        ddups = []
-        issues = pd.DataFrame(columns=chair_mp.columns)
-        for y in chair_mp['parliament_year'].unique():
-            year_chair_mp = chair_mp.loc[chair_mp['parliament_year'] == y].copy()
-            yse = general_start_end.loc[general_start_end['parliament_year'] == y].copy()
-            yse.reset_index(drop=True, inplace=True)
-            yse.sort_values(by=["chamber", "start", "end"], inplace=True)
-            cs = yse["chamber"].unique()
-            d = {}
-            for c in cs:
-                cdf = yse.loc[yse["chamber"] == c].copy()
-                cdf.reset_index(drop=True, inplace=True)
-                d[c] = {"earliest": cdf.at[0, "start"], "latest": cdf.at[len(cdf.index)-1, "end"]}
-            year_chair_mp.drop_duplicates(inplace=True)
-            chairs = year_chair_mp.loc[pd.notnull(year_chair_mp['chair_id']), 'chair_id'].values
-            if len(chairs) > len(set(chairs)):
-                dups = self.get_duplicated_items(chairs)
-                kh = []
-                for dup in dups:
-                    df = year_chair_mp.loc[year_chair_mp["chair_id"] == dup].copy()
-                    df.drop_duplicates(subset=["chair_id", "parliament_year", "chair_start", "chair_end", "person_id"], inplace=True)
-                    if len(df["person_id"].unique()) == 1:
-                        pass
-                    else:
-                        ranges = []
-                        for i, r in df.iterrows():
-                            rstart = None
-                            if pd.notnull(r["chair_start"]):
-                                rstart = r["chair_start"]
-                            elif pd.notnull(r["meta_start"]):
-                                rstart = r["meta_start"]
-                            else:
-                                rstart = d[r["chamber"]]["earliest"]
-                            rend = None
-                            if pd.notnull(r["chair_end"]):
-                                rend = r["chair_end"]
-                            elif pd.notnull(r["meta_end"]):
-                                rend = r["meta_end"]
-                            else:
-                                rend = d[r["chamber"]]["latest"]
-                            ranges.append((rstart, rend))
-
-                        ranges = sorted(ranges, key=lambda x: (x[0], x[1]))
-                        for ridx, _range in enumerate(ranges):
-                            if ridx < len(ranges)-1:
-                                delta = (datetime.strptime(_range[1], "%Y-%m-%d") - datetime.strptime(ranges[ridx+1][0], "%Y-%m-%d")).days
-                                if max(0, delta) > 0:
-                                    issues = pd.concat([issues,df], ignore_index=True)
-                                    if dup not in kh:
-                                        kh.append(dup)
-                                        print("\n--->>>>", dup)
-                                        print(df)
-                                        print(ranges)
-                                        print(_range, ranges[ridx+1])
-                if len(kh) > 0:
-                    print("\n\n")
-                    warnings.warn(f"{y}: [{', '.join(kh)}]", KnaMP)
-                    ingen_knahund = False
-                    counter += len(kh)
-                    [ddups.append(_) for _ in kh]
-        if config and config['write_knahund']:
-            issues.drop_duplicates(inplace=True)
-            issues.to_csv(
-                f"{config['test_out_dir']}/{self.what_time_it_is()}_LoveSeats.csv",
-                sep=';',
-                index=False)
-
-        print(counter, ddups)
-        self.assertTrue(ingen_knahund)
-
-    #
-    #  --->  Test coverage
-    # ---------------------
-    #
-    @unittest.skip
-    def test_chair_coverage(self):
-        """
-        test all chairs are filled
-        """
-        print("Test coverage of chair-MP mapping.")
-        config = fetch_config("chairs")
-        chair_mp = self.get_chair_mp()
-        no_empty_chairs = True
-        empty_chairs = []
-        counter = 0
-        for y in chair_mp['parliament_year'].unique():
-            y_empty_chairs = []
-            y_counter = 0
-            year_chair_mp = chair_mp.loc[chair_mp['parliament_year'] == y]
-            year_chairs = year_chair_mp["chair_id"].unique()
-            if year_chair_mp["person_id"].isnull().any():
-                for i, r in year_chair_mp.iterrows():
-                    if pd.isna(r["person_id"]):
-                        df = year_chair_mp.loc[
-                            (year_chair_mp["chair_id"] == r["chair_id"]) &
-                            (pd.notnull(year_chair_mp["person_id"]))]
-                        if df.empty:
-                            y_counter += 1
-                            y_empty_chairs.append(r["chair_id"])
-            if y_counter > 0:
-                no_empty_chairs = False
-                print("\n\n")
-                warnings.warn(f"{y}: [{', '.join(y_empty_chairs)}]", EmptyChair)
-                counter += y_counter
-                [empty_chairs.append([str(y), _]) for _ in y_empty_chairs]
-                print("\n" + str(y_counter / len(year_chairs)) + " emptiness in year")
-
-        if config and config['write_empty_seats']:
-            issues = pd.DataFrame(empty_chairs, columns=['year', 'chair_id'])
-            issues.to_csv(
-                f"{config['test_out_dir']}/{self.what_time_it_is()}_EmptySeats.csv",
-                sep=';',
-                index=False)
-
-        print(counter, empty_chairs)
-        self.assertTrue(no_empty_chairs)
-
+        chair_mp = self.get_resolved_chair_mp()
+        issues = find_overlaps(chair_mp, ["parliament_year", "chair_id"], "person_id")
+        for y, year_issues in issues.groupby("parliament_year", sort=False):
+            print("\n\n")
+            warnings.warn(f"{y}: [{', '.join(year_issues['chair_id'].unique())}]", KnaMP)
+        get_sink().add_frame(self.id(), "chair_mp", issues, key=["parliament_year", "chair_id"],
+                             message="two people in one chair at once", out_dir=issue_dir(config, "write_knahund"))
+        self.assertTrue(issues.empty, issues[["parliament_year", "chair_id", "person_id"]])
 
 
 
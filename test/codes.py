@@ -0,0 +1,102 @@
+"""
+Interned int32 codes for the ids shared between tables.
+
+person_id, chair_id and party_id are long strings repeated in most tables.
+Each of them is a key space with one process-wide dictionary: the first time
+an id is encoded it gets the next code, and it keeps that code in every table.
+Joins, group-bys and membership checks then run on int32 arrays, and `decode`
+turns codes back into ids for reporting.
+
+    mep = load_coded("member_of_parliament")      # person_id as int32 codes
+    PERSON.decode(mep["person_id"])
+"""
+from .cache import load_table
+import numpy as np
+import pandas as pd
+
+
+
+
+MISSING = -1
+
+
+class KeySpace:
+    """
+    A growing dictionary from ids to dense int32 codes, and back.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.clear()
+
+    def clear(self):
+        self.ids = np.array([], dtype=object)
+        self._index = pd.Index(self.ids)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __repr__(self):
+        return f"KeySpace({self.name}: {len(self)} ids)"
+
+    def encode(self, values, grow=True):
+        """
+        Return the int32 code of each id, MISSING for missing ids.
+
+        Ids not seen before are added, or also MISSING when grow=False.
+        """
+        values = pd.Series(values, dtype=object)
+        codes = self._index.get_indexer(values)
+        new = (codes == MISSING) & values.notna().values
+        if grow and new.any():
+            self.ids = np.concatenate([self.ids, pd.unique(values[new].values)])
+            self._index = pd.Index(self.ids)
+            codes[new] = self._index.get_indexer(values[new])
+        return codes.astype(np.int32)
+
+    def decode(self, codes):
+        """
+        Return the ids of codes as an object array, None for MISSING.
+        """
+        codes = np.asarray(codes)
+        return np.where(codes == MISSING, None, self.ids[codes])
+
+
+PERSON = KeySpace("person_id")
+CHAIR = KeySpace("chair_id")
+PARTY = KeySpace("party_id")
+
+KEY_SPACES = {space.name: space for space in [PERSON, CHAIR, PARTY]}
+
+
+def clear():
+    """
+    Forget all codes, e.g. before switching data directories.
+    """
+    for space in KEY_SPACES.values():
+        space.clear()
+
+
+def encode_ids(df):
+    """
+    Return a copy of df with every id column that has a key space replaced by its codes.
+    """
+    df = df.copy()
+    for col, space in KEY_SPACES.items():
+        if col in df.columns:
+            df[col] = space.encode(df[col])
+    return df
+
+
+def load_coded(name, metadata_folder="data"):
+    """
+    Return `<metadata_folder>/<name>.csv` as a df with interned id columns.
+    """
+    return encode_ids(load_table(name, metadata_folder=metadata_folder))
+
+
+def pair_keys(left, right):
+    """
+    Pack two int32 code arrays into one int64 key per row, for joins on both.
+    """
+    return (np.asarray(left, dtype=np.int64) << 32) | (np.asarray(right, dtype=np.int64) & 0xFFFFFFFF)
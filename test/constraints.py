@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+Check the constraints declared in schema.py: keys, unique columns, required columns,
+formats, allowed values and foreign keys, in one streaming pass per table.
+
+    python -m test.constraints                       # every table in the schema
+    python -m test.constraints person minister --memory-mb 16
+
+Every referenced key (e.g. person.person_id) is read once into a hash set up
+front; each table is then read in chunks and checked against its own rules and
+those sets, so memory doesn't grow with file size. For uniqueness, every row
+is reduced to a 64-bit fingerprint of the constrained columns, and
+(fingerprint, line) pairs are spilled to hash partitions on disk. Each
+partition is small enough to be sorted in memory. Offending rows are reported
+by their line in the file (the header is line 1); a duplicate points back at
+the first line it repeats.
+
+Fingerprints are compared, not the rows themselves. Two different rows
+collide with a chance of about n^2 / 2^65, which is negligible for any csv in
+this repo.
+"""
+from collections import namedtuple
+from pathlib import Path
+from .cache import count_read
+from .schema import referenced_keys, SCHEMA
+import argparse
+import numpy as np
+import os
+import pandas as pd
+import sys
+import tempfile
+
+
+
+
+MAX_ISSUES = 1000
+
+
+class Issue(namedtuple("Issue", ["path", "line", "rule", "column", "value"])):
+
+    def __str__(self):
+        return f"{self.path}:{self.line}: {self.rule} {self.column}: {self.value}"
+
+
+class Report:
+    """
+    The issues found in one csv; at most MAX_ISSUES are kept per rule and column, all are counted.
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        self.rows = 0
+        self.issues = []
+        self.counts = {}
+
+    def add(self, rule, column, lines, values):
+        n = len(lines)
+        if n == 0:
+            return
+        seen = self.counts.get((rule, column), 0)
+        self.counts[(rule, column)] = seen + n
+        keep = max(0, min(n, MAX_ISSUES - seen))
+        self.issues.extend(
+            Issue(self.path, int(l), rule, column, v) for l, v in zip(lines[:keep], values[:keep]))
+
+    @property
+    def ok(self):
+        return not self.counts
+
+    def __len__(self):
+        return sum(self.counts.values())
+
+    def __str__(self):
+        head = [f"{self.path}: {self.rows} rows, {len(self)} issues"]
+        head += [f"  {n:>7} {rule} {column}" for (rule, column), n in sorted(self.counts.items())]
+        return "\n".join(head + [str(i) for i in sorted(self.issues, key=lambda i: i.line)])
+
+
+class Fingerprints:
+    """
+    (fingerprint, line) pairs spilled to `partitions` files by the fingerprint's top bits.
+    """
+
+    def __init__(self, partitions, tmpdir):
+        self.bits = partitions.bit_length() - 1
+        self.parts = [Path(tmpdir) / f"part-{i}" for i in range(partitions)]
+        self.memory = [] if partitions == 1 else None
+
+    def add(self, hashes, lines):
+        pairs = np.empty((len(hashes), 2), dtype=np.uint64)
+        pairs[:, 0] = hashes
+        pairs[:, 1] = lines
+        if self.memory is not None:
+            self.memory.append(pairs)
+            return
+        part = hashes >> np.uint64(64 - self.bits)
+        order = np.argsort(part, kind="stable")
+        bounds = np.searchsorted(part[order], np.arange(len(self.parts) + 1))
+        for i, path in enumerate(self.parts):
+            if bounds[i] < bounds[i + 1]:
+                with open(path, "ab") as f:
+                    pairs[order[bounds[i]:bounds[i + 1]]].tofile(f)
+
+    def _partitions(self):
+        if self.memory is not None:
+            if self.memory:
+                yield np.concatenate(self.memory)
+            return
+        for path in self.parts:
+            if path.exists():
+                yield np.fromfile(path, dtype=np.uint64).reshape(-1, 2)
+                path.unlink()
+
+    def duplicates(self):
+        """
+        Yield (lines, first_lines): every repeated row and the first line it repeats.
+        """
+        for pairs in self._partitions():
+            pairs = pairs[np.lexsort((pairs[:, 1], pairs[:, 0]))]
+            h, lines = pairs[:, 0], pairs[:, 1].astype(np.int64)
+            repeat = np.concatenate([[False], h[1:] == h[:-1]])
+            if repeat.any():
+                run_start = np.maximum.accumulate(np.where(~repeat, np.arange(len(h)), 0))
+                yield lines[repeat], lines[run_start[repeat]]
+
+
+def fingerprint(chunk, columns):
+    """
+    Return a uint64 hash of the given columns of every row.
+    """
+    return pd.util.hash_pandas_object(chunk[columns], index=False).values
+
+
+def check_csv(path, key=None, unique=(), required=(), formats=None, allowed=None, references=None,
+              sep=",", chunksize=100_000, memory_mb=64):
+    """
+    Stream a csv and return a Report of its constraint violations.
+
+    key: primary key columns, unique and required; unique: other column lists
+    that must be unique, "*" for the full row; required: columns that may not be
+    empty; formats: {column: regex} that non-empty values must fully match;
+    allowed: {column: set of values}; references: {column: pd.Index of the keys
+    non-empty values must be in}. Memory is bounded by chunksize rows plus a
+    partition of at most ~memory_mb of fingerprints.
+    """
+    path = Path(path)
+    report = Report(path)
+    formats = formats or {}
+    allowed = allowed or {}
+    references = references or {}
+    required = list(required) + [c for c in key or [] if c not in required]
+    partitions = 1
+    while os.path.getsize(path) / partitions > memory_mb * 2**20:
+        partitions *= 2
+    with tempfile.TemporaryDirectory() as tmp:
+        checks = []
+        for i, columns in enumerate(([key] if key else []) + list(unique)):
+            rule = "duplicate key" if key and i == 0 else "duplicate row" if columns == "*" else "duplicate"
+            fp = Fingerprints(partitions, Path(tmp) / str(i))
+            fp.parts[0].parent.mkdir()
+            checks.append((rule, None if columns == "*" else list(columns), fp))
+        reader = pd.read_csv(path, sep=sep, dtype=str, keep_default_na=False, chunksize=chunksize)
+        for chunk in reader:
+            lines = np.arange(report.rows, report.rows + len(chunk), dtype=np.int64) + 2
+            report.rows += len(chunk)
+            for column in required:
+                empty = (chunk[column] == "").values
+                report.add("null", column, lines[empty], [""] * int(empty.sum()))
+            for column, pattern in formats.items():
+                if column in chunk.columns:
+                    values = chunk[column]
+                    bad = ((values != "") & ~values.str.fullmatch(pattern)).values
+                    report.add("format", column, lines[bad], values[bad].tolist())
+            for column, values in allowed.items():
+                bad = ~chunk[column].isin(values).values
+                report.add("not allowed", column, lines[bad], chunk[column][bad].tolist())
+            for column, keys in references.items():
+                values = chunk[column]
+                bad = ((values != "") & ~values.isin(keys)).values
+                report.add("broken reference", column, lines[bad], values[bad].tolist())
+            for _, columns, fp in checks:
+                fp.add(fingerprint(chunk, columns or list(chunk.columns)), lines)
+        for rule, columns, fp in checks:
+            label = ",".join(columns) if columns else "*"
+            for lines, first in fp.duplicates():
+                report.add(rule, label, lines, [f"same as line {f}" for f in first])
+    count_read(report.rows)
+    return report
+
+
+def table_constraints(name):
+    """
+    Return the check_csv arguments for a table's schema, without its references.
+    """
+    t = SCHEMA[name]
+    return {"key": t.key, "unique": t.unique, "required": t.required,
+            "formats": t.formats(), "allowed": t.allowed}
+
+
+def load_keys(tables=SCHEMA, metadata_folder="data"):
+    """
+    Return {(table, column): pd.Index} of every key some foreign key points at, each read once.
+    """
+    keys = {}
+    for table, column in sorted(referenced_keys(tables)):
+        values = pd.read_csv(Path(metadata_folder) / f"{table}.csv", usecols=[column], dtype=str,
+                             keep_default_na=False)[column]
+        keys[(table, column)] = pd.Index(values[values != ""].unique())
+        count_read(len(values))
+    return keys
+
+
+def check_table(name, metadata_folder="data", keys=None, **kwargs):
+    """
+    Check `<metadata_folder>/<name>.csv` against its schema; keyword arguments override single rules.
+
+    Foreign keys are checked against `keys` (see load_keys) when given.
+    """
+    constraints = table_constraints(name)
+    if keys is not None:
+        constraints["references"] = {c: keys[target] for c, target in SCHEMA[name].references.items()}
+    constraints.update(kwargs)
+    return check_csv(Path(metadata_folder) / f"{name}.csv", **constraints)
+
+
+def validate(tables=None, metadata_folder="data", **kwargs):
+    """
+    Check every table of the schema (or the named ones) and return {table: Report}.
+    """
+    names = tables or list(SCHEMA)
+    keys = load_keys({n: SCHEMA[n] for n in names}, metadata_folder)
+    return {name: check_table(name, metadata_folder, keys=keys, **kwargs) for name in names}
+
+
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("tables", nargs="*", help="tables to check (default: every table in the schema)")
+    parser.add_argument("--metadata-folder", default="data")
+    parser.add_argument("--chunksize", type=int, default=100_000, help="rows read at a time")
+    parser.add_argument("--memory-mb", type=float, default=64, help="fingerprints held in memory at a time")
+    args = parser.parse_args()
+    reports = validate(args.tables, args.metadata_folder, chunksize=args.chunksize, memory_mb=args.memory_mb)
+    for report in reports.values():
+        print(report)
+    sys.exit(int(not all(r.ok for r in reports.values())))
@@ -0,0 +1,50 @@
+"""
+Which metadata tables a set of people appear in.
+
+The coverage of every person is a bitmask with one bit per table, set in an
+int array indexed by the interned person code (see codes.py). Per-table
+reports of who is missing are derived from the mask.
+"""
+from .codes import load_coded, MISSING, PERSON
+import numpy as np
+
+
+
+
+COVERAGE_TABLES = [
+    "person",
+    "name",
+    "member_of_parliament",
+    "party_affiliation",
+    "location_specifier",
+    "minister",
+    "speaker",
+    "wiki_id",
+]
+
+
+def coverage_bit(table, tables=COVERAGE_TABLES):
+    """
+    Return the bit that stands for a table in a coverage mask.
+    """
+    return 1 << tables.index(table)
+
+
+def coverage_mask(person_ids, tables=COVERAGE_TABLES, metadata_folder="data"):
+    """
+    Return an int64 coverage mask for every person_id, aligned with the input.
+    """
+    per_table = [load_coded(table, metadata_folder=metadata_folder)["person_id"].values for table in tables]
+    bits = np.zeros(len(PERSON), dtype=np.int64)
+    for i, codes in enumerate(per_table):
+        bits[codes[codes != MISSING]] |= np.int64(1 << i)
+    codes = PERSON.encode(person_ids, grow=False)
+    return np.where(codes == MISSING, 0, bits[codes])
+
+
+def missing_from(df, mask, table, tables=COVERAGE_TABLES):
+    """
+    Return the rows of df (aligned with mask) whose person is not in table.
+    """
+    absent = (mask & coverage_bit(table, tables)) == 0
+    return df.loc[absent].reset_index(drop=True)
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Compile data/ into one indexed SQLite file and query it.
+
+    python -m test.database build persons.db
+    python -m test.database query persons.db sitting 1925-03-02
+    python -m test.database query persons.db "SELECT * FROM name WHERE name LIKE ?" "%Ericsson%"
+    python -m test.database queries                   # list the named queries
+
+Every table of schema.py becomes a table of the same name (riksdag-year is
+riksdag_year). Int and bool columns are INTEGER, everything else TEXT, empty
+cells NULL. Every date column keeps its text and gets `<col>_lo` and `<col>_hi`,
+the first and last day it covers as ISO dates, so date comparisons work at
+any precision: a mandate ending "1925" is in office on 1925-03-02 if
+`end_hi >= '1925-03-02'`.
+
+Keys become primary keys. person_id, chair_id, party_id, foreign key columns
+and the date bounds are indexed, so the spot checks below are index lookups
+instead of full scans. The views join the tables the way the tests do:
+
+    mandate_party_seat   mandates with the party and chair held during them
+    person_summary       person.csv with the primary name and wiki_id
+    seat_holder          chair_mp with chamber, chair_nr and the holder's name
+    minister_government  ministers with their government's dates
+"""
+from pathlib import Path
+from .dates import DateColumn
+from .schema import SCHEMA
+import argparse
+import csv
+import numpy as np
+import os
+import pandas as pd
+import sqlite3
+import sys
+
+
+
+
+INDEXED = ["person_id", "chair_id", "party_id", "wiki_id"]
+
+SQL_TYPES = {"int": "INTEGER", "bool": "INTEGER"}
+
+VIEWS = {
+    "parliament_year_bounds": """
+        SELECT parliament_year, chamber, MIN(start) AS start, MAX("end") AS "end"
+        FROM riksdag_year GROUP BY parliament_year, chamber""",
+    "mandate_party_seat": """
+        SELECT m.person_id, m.start, m."end", m.district, m.role,
+               p.party, p.party_id, c.parliament_year, c.chair_id, ch.chamber, ch.chair_nr
+        FROM member_of_parliament m
+        LEFT JOIN party_affiliation p
+            ON p.person_id = m.person_id
+            AND (p.start_lo IS NULL OR m.end_hi IS NULL OR p.start_lo <= m.end_hi)
+            AND (p.end_hi IS NULL OR m.start_lo IS NULL OR p.end_hi >= m.start_lo)
+        LEFT JOIN chair_mp c ON c.person_id = m.person_id
+            AND EXISTS (
+                SELECT 1 FROM parliament_year_bounds y
+                WHERE y.parliament_year = c.parliament_year
+                AND (m.end_hi IS NULL OR y.start <= m.end_hi)
+                AND (m.start_lo IS NULL OR y."end" >= m.start_lo))
+        LEFT JOIN chairs ch ON ch.chair_id = c.chair_id""",
+    "person_summary": """
+        SELECT p.*, n.name, w.wiki_id
+        FROM person p
+        LEFT JOIN name n ON n.person_id = p.person_id AND n.primary_name = 1
+        LEFT JOIN wiki_id w ON w.person_id = p.person_id""",
+    "seat_holder": """
+        SELECT c.parliament_year, ch.chamber, ch.chair_nr, c.chair_id, c.start, c."end", c.person_id, n.name
+        FROM chair_mp c
+        JOIN chairs ch ON ch.chair_id = c.chair_id
+        LEFT JOIN name n ON n.person_id = c.person_id AND n.primary_name = 1""",
+    "minister_government": """
+        SELECT m.*, g.government_id, g.start AS government_start, g."end" AS government_end
+        FROM minister m
+        LEFT JOIN government g ON g.government = m.government""",
+}
+
+# named, parameterized spot checks
+QUERIES = {
+    "person": ("everything person_summary knows about a person_id",
+               "SELECT * FROM person_summary WHERE person_id = ?"),
+    "name": ("people whose name matches a LIKE pattern",
+             "SELECT DISTINCT n.person_id, n.name, p.born, p.dead FROM name n "
+             "LEFT JOIN person p ON p.person_id = n.person_id WHERE n.name LIKE ? ORDER BY n.name"),
+    "mandates": ("mandates of a person_id, with party and seat",
+                 "SELECT * FROM mandate_party_seat WHERE person_id = ? ORDER BY start"),
+    "sitting": ("MPs with a mandate on a date",
+                "SELECT m.person_id, n.name, m.role, m.district FROM member_of_parliament m "
+                "LEFT JOIN name n ON n.person_id = m.person_id AND n.primary_name = 1 "
+                "WHERE m.start_lo <= ?1 AND (m.end_hi IS NULL OR m.end_hi >= ?1) ORDER BY n.name"),
+    "seat": ("who holds a chair: parliament_year, chamber, chair_nr",
+             "SELECT * FROM seat_holder WHERE parliament_year = ? AND chamber = ? AND chair_nr = ?"),
+    "party": ("members of a party_id on a date",
+              "SELECT p.person_id, n.name, p.party, p.start, p.\"end\" FROM party_affiliation p "
+              "LEFT JOIN name n ON n.person_id = p.person_id AND n.primary_name = 1 "
+              "WHERE p.party_id = ?1 AND (p.start_lo IS NULL OR p.start_lo <= ?2) "
+              "AND (p.end_hi IS NULL OR p.end_hi >= ?2) ORDER BY n.name"),
+}
+
+
+def sql_name(table):
+    return table.replace("-", "_")
+
+
+def _iso(days, missing):
+    return np.where(missing, None, days.astype("datetime64[D]").astype(str))
+
+
+def table_rows(df, table):
+    """
+    Return the column names and row tuples of a csv read with dtype=str, converted to SQL values.
+    """
+    columns = {}
+    for col in df.columns:
+        values = df[col].where(df[col] != "", None)
+        kind = table.columns.get(col, "str")
+        if kind == "int":
+            values = pd.to_numeric(values).astype("Int64").astype(object).where(values.notna(), None)
+        elif kind == "bool":
+            values = values.map({"True": 1, "False": 0}).astype(object).where(values.notna(), None)
+        columns[col] = values.values
+        if kind == "date":
+            dates = DateColumn.parse(values)
+            columns[f"{col}_lo"] = _iso(dates.lo, dates.missing)
+            columns[f"{col}_hi"] = _iso(dates.hi, dates.missing)
+    return list(columns), list(zip(*columns.values()))
+
+
+def create_statements(name, table, columns):
+    """
+    Return the CREATE TABLE and CREATE INDEX statements of a table.
+    """
+    t = sql_name(name)
+    defs = [f'"{c}" {SQL_TYPES.get(table.columns.get(c, "str"), "TEXT")}' for c in columns]
+    if table.key:
+        defs.append("PRIMARY KEY (" + ", ".join(f'"{c}"' for c in table.key) + ")")
+    statements = [f'CREATE TABLE "{t}" ({", ".join(defs)})']
+    indexed = [c for c in columns if c in INDEXED or c in table.references or c.endswith(("_lo", "_hi"))]
+    for c in indexed:
+        if table.key != [c]:
+            statements.append(f'CREATE INDEX "{t}__{c}" ON "{t}" ("{c}")')
+    return statements
+
+
+def build(db, metadata_folder="data"):
+    """
+    Write every schema table in metadata_folder, with indexes and views, to a new SQLite file db.
+    """
+    db = Path(db)
+    tmp = db.with_name(f"{db.name}.{os.getpid()}.tmp")
+    if tmp.exists():
+        tmp.unlink()
+    try:
+        con = sqlite3.connect(str(tmp))
+        try:
+            with con:
+                for name, table in SCHEMA.items():
+                    df = pd.read_csv(Path(metadata_folder) / f"{name}.csv", dtype=str, keep_default_na=False)
+                    columns, rows = table_rows(df, table)
+                    statements = create_statements(name, table, columns)
+                    con.execute(statements[0])
+                    marks = ", ".join("?" * len(columns))
+                    con.executemany(f'INSERT INTO "{sql_name(name)}" VALUES ({marks})', rows)
+                    for statement in statements[1:]:
+                        con.execute(statement)
+                for view, select in VIEWS.items():
+                    con.execute(f'CREATE VIEW "{view}" AS {select}')
+            con.execute("ANALYZE")
+        finally:
+            con.close()
+        os.replace(tmp, db)
+    except BaseException:
+        # a half-built database is of no use, and each failed run would leave another one
+        if tmp.exists():
+            tmp.unlink()
+        raise
+
+
+def query(db, sql, params=()):
+    """
+    Run a named query or SQL with positional parameters; return (column names, rows).
+    """
+    sql = QUERIES[sql][1] if sql in QUERIES else sql
+    con = sqlite3.connect(f"file:{db}?mode=ro", uri=True)
+    try:
+        cursor = con.execute(sql, tuple(params))
+        return [d[0] for d in cursor.description or []], cursor.fetchall()
+    finally:
+        con.close()
+
+
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    p = commands.add_parser("build", help="compile data/ into a database file")
+    p.add_argument("db", nargs="?", default="persons.db")
+    p.add_argument("--metadata-folder", default="data")
+    p = commands.add_parser("query", help="run a named query or SQL, print csv")
+    p.add_argument("db")
+    p.add_argument("sql", help="name of a query (see `queries`) or SQL with ? parameters")
+    p.add_argument("params", nargs="*")
+    commands.add_parser("queries", help="list the named queries")
+    args = parser.parse_args()
+    if args.command == "build":
+        build(args.db, args.metadata_folder)
+    elif args.command == "queries":
+        for name, (description, _) in QUERIES.items():
+            print(f"{name:10} {description}")
+    else:
+        columns, rows = query(args.db, args.sql, args.params)
+        out = csv.writer(sys.stdout)
+        out.writerow(columns)
+        out.writerows(rows)
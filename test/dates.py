@@ -0,0 +1,169 @@
+"""
+Dates of mixed precision, as they are written in the tables.
+
+member_of_parliament and speaker mostly hold bare years ("1867"), other tables
+full dates ("1867-05-16"), a few year-months ("1867-05"). A column is parsed once
+into int64 day numbers (days since 1970-01-01) of the first and last day each
+value covers plus a precision code, so comparisons and interval checks run on
+int arrays instead of re-parsing strings.
+
+    start = DateColumn.parse(mep["start"])
+    start.lower(), start.upper(), start.precision
+    start.same(DateColumn.parse(known["start"]))   # equal at the coarser precision
+"""
+from pandas.api.types import is_datetime64_any_dtype, is_numeric_dtype
+import numpy as np
+import pandas as pd
+
+
+
+
+MISSING, YEAR, MONTH, DAY = 0, 1, 2, 3
+
+OPEN_END = np.iinfo(np.int64).max // 2
+
+_PATTERN = r"\d{4}(?:-\d{2}(?:-\d{2})?)?"
+
+
+def _months_to_days(months):
+    return months.astype("datetime64[M]").astype("datetime64[D]").astype(np.int64)
+
+
+class DateColumn:
+    """
+    A parsed column: parallel int64 arrays `lo` and `hi` (first and last day
+    covered, inclusive) and `precision` (MISSING, YEAR, MONTH or DAY).
+
+    Missing and unparseable values, e.g. "1867-02-30", have precision MISSING;
+    their lo and hi are meaningless, use `lower` and `upper` to fill them.
+    """
+    __slots__ = ("lo", "hi", "precision", "index")
+
+    def __init__(self, lo, hi, precision, index=None):
+        self.lo = lo
+        self.hi = hi
+        self.precision = precision
+        self.index = index if index is not None else pd.RangeIndex(len(lo))
+
+    @classmethod
+    def parse(cls, values):
+        """
+        Parse date strings (or bare int years) in one vectorized pass.
+
+        Datetime columns are taken as given to the day.
+        """
+        values = pd.Series(values)
+        index = values.index
+        if is_datetime64_any_dtype(values.dtype):
+            days = values.values.astype("datetime64[D]").astype(np.int64)
+            precision = np.where(values.isna().values, MISSING, DAY).astype(np.int8)
+            return cls(days, days.copy(), precision, index)
+        if is_numeric_dtype(values.dtype):
+            values = values.astype("Int64")
+        values = values.astype(object)
+        values = values.where(values.isna(), values.astype(str))
+        n = len(values)
+        lo = np.zeros(n, dtype=np.int64)
+        hi = np.zeros(n, dtype=np.int64)
+        precision = np.zeros(n, dtype=np.int8)
+        ok = values.str.fullmatch(_PATTERN).fillna(False).astype(bool).values
+        if ok.any():
+            v = values[ok]
+            length = v.str.len().values
+            year = v.str[:4].astype(np.int64).values
+            month = np.where(length >= 7, pd.to_numeric(v.str[5:7], errors="coerce").fillna(1), 1).astype(np.int64)
+            day = np.where(length == 10, pd.to_numeric(v.str[8:10], errors="coerce").fillna(1), 1).astype(np.int64)
+            months = (year - 1970) * 12 + month - 1
+            first = _months_to_days(months)
+            month_len = _months_to_days(months + 1) - first
+            p = np.select([length == 4, length == 7], [YEAR, MONTH], DAY).astype(np.int8)
+            valid = (month >= 1) & (month <= 12) & (day >= 1) & (day <= month_len)
+            lo[ok] = first + day - 1
+            hi[ok] = np.select(
+                [p == YEAR, p == MONTH],
+                [_months_to_days((year - 1969) * 12) - 1, first + month_len - 1],
+                first + day - 1)
+            precision[ok] = np.where(valid, p, MISSING)
+        return cls(lo, hi, precision, index)
+
+    def __len__(self):
+        return len(self.lo)
+
+    def __getitem__(self, idx):
+        return DateColumn(self.lo[idx], self.hi[idx], self.precision[idx], self.index[idx])
+
+    def __repr__(self):
+        return f"DateColumn({len(self)} values, {int(self.missing.sum())} missing)"
+
+    @property
+    def missing(self):
+        return self.precision == MISSING
+
+    def lower(self, missing=-OPEN_END):
+        """
+        Return the first day of each value, `missing` where there is none.
+        """
+        return np.where(self.missing, missing, self.lo)
+
+    def upper(self, missing=OPEN_END):
+        """
+        Return the last day of each value, `missing` where there is none.
+        """
+        return np.where(self.missing, missing, self.hi)
+
+    def exact(self):
+        """
+        Boolean mask of the values given to the day.
+        """
+        return self.precision == DAY
+
+    def key(self, precision):
+        """
+        Return the value truncated to `precision` (a scalar or one code per row) as
+        an int: the year, the month count since 1970-01 or the day number.
+        """
+        precision = np.broadcast_to(precision, self.lo.shape)
+        days = self.lo.astype("datetime64[D]")
+        return np.select(
+            [precision == YEAR, precision == MONTH],
+            [days.astype("datetime64[Y]").astype(np.int64) + 1970, days.astype("datetime64[M]").astype(np.int64)],
+            self.lo)
+
+    def same(self, other):
+        """
+        True where both values are present and agree at the coarser of their precisions.
+
+        "1917" is the same as "1917-03-01", "1917-03" is not the same as "1917-04-30".
+        """
+        p = np.minimum(self.precision, other.precision)
+        return (p != MISSING) & (self.key(p) == other.key(p))
+
+    def before(self, other):
+        """
+        True where this value certainly ends before the other begins.
+        """
+        return ~self.missing & ~other.missing & (self.hi < other.lo)
+
+    def contains(self, days):
+        """
+        True where the day number falls within the value.
+        """
+        return ~self.missing & (self.lo <= days) & (days <= self.hi)
+
+    def to_datetime(self, bound="lo"):
+        """
+        Return the first (bound="lo") or last (bound="hi") day as a datetime64 series, NaT if missing.
+        """
+        days = getattr(self, bound).astype("datetime64[D]").astype("datetime64[ns]")
+        days[self.missing] = np.datetime64("NaT")
+        return pd.Series(days, index=self.index)
+
+
+def overlaps(start1, end1, start2, end2):
+    """
+    True where [start1, end1] and [start2, end2] may share a day.
+
+    Bounds are taken as widely as their precision allows, a missing start or end
+    leaves the interval open on that side.
+    """
+    return (start1.lower() <= end2.upper()) & (start2.lower() <= end1.upper())
@@ -3,9 +3,7 @@ throw ERROR on inconsistencies on our side
 
 WARN on upstream errors
 """
-from datetime import datetime
 from lxml import etree
-from pathlib import Path
 from pyriksdagen.db import load_metadata
 from pyriksdagen.utils import (
     get_doc_dates,
@@ -13,6 +11,13 @@ from pyriksdagen.utils import (
     protocol_iterators,
 )
 from pytest_cfg_fetcher.fetch import fetch_config
+from .cache import load_table, read_csv
+from .codes import pair_keys, PERSON
+from .constraints import check_csv, Issue
+from .coverage import coverage_mask, missing_from
+from .incremental import get_scope
+from .issues import get_sink, issue_dir
+import numpy as np
 import pandas as pd
 import unittest
 import warnings
@@ -80,46 +85,49 @@ class CatalogIntegrityWarning(Warning):
 
 
 class Test(unittest.TestCase):
+    _catalog_coverage = None
+
     #
     # ---> Helper functions
     #
     def get_duplicates(self, df_name, columns):
         """
-        Return a the df of a csv,  a df of unique rows, and a df of duplicates.
-        """
-        p = Path(".") / "data"
-        path = p / f"{df_name}.csv"
-        df = pd.read_csv(path)
+        Return a streaming check's report of rows repeating `columns` (full rows if None), with line numbers.
 
-        df_duplicate = df[df.duplicated(columns, keep=False)]
-        df_unique = df.drop_duplicates(columns)
-        return df, df_unique, df_duplicate
+        The issues kept in the report go to the issue sink.
+        """
+        report = check_csv(f"data/{df_name}.csv", unique=[columns or "*"])
+        issues = pd.DataFrame(report.issues, columns=Issue._fields).drop(columns="path")
+        get_sink().add_frame(self.id(), df_name, issues, key=["line"], message=issues["rule"] + " " + issues["column"])
+        return report
 
 
     def get_emil(self):
         """
         Return a df of hand-checked (by Emil) "members of parliament" metadata.
         """
-        emil_df = pd.read_csv('test/data/known-mps-catalog.csv', sep=';')
+        emil_df = read_csv('test/data/known-mps-catalog.csv', sep=';')
         return emil_df
 
 
-    def get_meta_df(self, df_name):
+    def get_catalog_missing(self, df_name):
         """
-        Return csv as a df by name.
+        Return the rows of the known-mps-catalog whose person is missing from a metadata table.
+
+        The catalog's coverage mask is computed once and shared by all tests.
         """
-        p = Path(".") / "data"
-        path = p / f"{df_name}.csv"
-        df = pd.read_csv(path)
-        return df
+        emil = self.get_emil()
+        if Test._catalog_coverage is None:
+            Test._catalog_coverage = coverage_mask(emil['person_id'])
+        return get_scope().restrict(missing_from(emil, Test._catalog_coverage, df_name))
 
 
-    def write_error_df(self, df_name, errs, outpath):
+    def get_meta_df(self, df_name):
         """
-        Take a list of errors and write the output as a dataframe
+        Return csv as a df by name.
         """
-        now = datetime.now().strftime('%Y%m%d-%H%M%S')
-        errs.to_csv(f"{outpath}/{now}_db_{df_name}.csv", sep=';', index=False)
+        return load_table(df_name)
+
 
     #
     # ---> Tests
@@ -130,8 +138,9 @@ class Test(unittest.TestCase):
         """
         columns = ["start", "end"]
         df_name = "government"
-        df, df_unique, df_duplicate = self.get_duplicates(df_name, columns)
-        self.assertEqual(len(df), len(df_unique), df_duplicate)
+        get_scope().skip_if_unchanged(self, df_name)
+        duplicates = self.get_duplicates(df_name, columns)
+        self.assertTrue(duplicates.ok, duplicates)
 
 
     def test_member_of_parliament(self):
@@ -140,8 +149,9 @@ class Test(unittest.TestCase):
         """
         columns = ["person_id", "start", "end"]
         df_name = "member_of_parliament"
-        df, df_unique, df_duplicate = self.get_duplicates(df_name, columns)
-        self.assertEqual(len(df), len(df_unique), df_duplicate)
+        get_scope().skip_if_unchanged(self, df_name)
+        duplicates = self.get_duplicates(df_name, columns)
+        self.assertTrue(duplicates.ok, duplicates)
 
 
     def test_minister(self):
@@ -149,8 +159,9 @@ class Test(unittest.TestCase):
         test no duplicates in Minister data
         """
         df_name = "minister"
-        df, df_unique, df_duplicate = self.get_duplicates(df_name, None)
-        self.assertEqual(len(df), len(df_unique), df_duplicate)
+        get_scope().skip_if_unchanged(self, df_name)
+        duplicates = self.get_duplicates(df_name, None)
+        self.assertTrue(duplicates.ok, duplicates)
 
 
     def test_party_affiliation(self):
@@ -159,13 +170,14 @@ class Test(unittest.TestCase):
         """
         columns = ["person_id", "start", "end"]
         df_name = "party_affiliation"
-        df, df_unique, df_duplicate = self.get_duplicates(df_name, columns)
+        get_scope().skip_if_unchanged(self, df_name)
+        duplicates = self.get_duplicates(df_name, columns)
 
-        if len(df) != len(df_unique):
-            warnings.warn(str(df_duplicate), DuplicateWarning)
+        if not duplicates.ok:
+            warnings.warn(str(duplicates), DuplicateWarning)
 
-        df, df_unique, df_duplicate = self.get_duplicates(df_name, None)
-        self.assertEqual(len(df), len(df_unique), df_duplicate)
+        duplicates = self.get_duplicates(df_name, None)
+        self.assertTrue(duplicates.ok, duplicates)
 
 
     def test_person(self):
@@ -174,8 +186,9 @@ class Test(unittest.TestCase):
         """
         columns = ["person_id"]
         df_name = "person"
-        df, df_unique, df_duplicate = self.get_duplicates(df_name, columns)
-        self.assertEqual(len(df), len(df_unique), df_duplicate)
+        get_scope().skip_if_unchanged(self, df_name)
+        duplicates = self.get_duplicates(df_name, columns)
+        self.assertTrue(duplicates.ok, duplicates)
 
 
     def test_speaker(self):
@@ -184,13 +197,14 @@ class Test(unittest.TestCase):
         """
         columns = ["start", "end", "role"]
         df_name = "speaker"
-        df, df_unique, df_duplicate = self.get_duplicates(df_name, columns)
+        get_scope().skip_if_unchanged(self, df_name)
+        duplicates = self.get_duplicates(df_name, columns)
 
-        if len(df) != len(df_unique):
-            warnings.warn(str(df_duplicate), DuplicateWarning)
+        if not duplicates.ok:
+            warnings.warn(str(duplicates), DuplicateWarning)
 
-        df, df_unique, df_duplicate = self.get_duplicates(df_name, None)
-        self.assertEqual(len(df), len(df_unique), df_duplicate)
+        duplicates = self.get_duplicates(df_name, None)
+        self.assertTrue(duplicates.ok, duplicates)
 
 
     def test_twitter(self):
@@ -198,33 +212,35 @@ class Test(unittest.TestCase):
         test no duplicates in twitter data
         """
         df_name = "twitter"
-        df, df_unique, df_duplicate = self.get_duplicates(df_name, None)
+        get_scope().skip_if_unchanged(self, df_name)
+        duplicates = self.get_duplicates(df_name, None)
 
-        if len(df) != len(df_unique):
-            warnings.warn(str(df_duplicate), DuplicateWarning)
+        if not duplicates.ok:
+            warnings.warn(str(duplicates), DuplicateWarning)
 
-        df, df_unique, df_duplicate = self.get_duplicates(df_name, None)
-        self.assertEqual(len(df), len(df_unique), df_duplicate)
+        self.assertTrue(duplicates.ok, duplicates)
 
 
     def test_emil_integrity(self):
         """
         test integrity of the known-mp-catalog
         """
+        get_scope().skip_if_unchanged(self)
         emil = self.get_emil()
         config = fetch_config("db")
 
         person_id_issue = emil[(emil['person_id'].isna()) | (emil['person_id'] == "Q00FEL00")]
         if not person_id_issue.empty:
             warnings.warn(f'{len(person_id_issue)} person_id issues', CatalogIntegrityWarning)
-            if config and congif["write_catalog_integrity"]:
-                self.write_error_df("swerik-id-issue", person_id_issue, config["test_out_dir"])
+        get_sink().add_frame(self.id(), "known-mps-catalog", person_id_issue, key=["person_id"],
+                             message="missing or placeholder person_id",
+                             out_dir=issue_dir(config, "write_catalog_integrity"))
 
         birthdate_NA = emil[(emil['born'].isna()) | (emil['born'] == "Multival")]
         if not birthdate_NA.empty:
             warnings.warn(f"{len(birthdate_NA)} birthdates missing", CatalogIntegrityWarning)
-            if config and congif["write_catalog_integrity"]:
-                self.write_error_df("missing-birthdate", birthdate_NA, config["test_out_dir"])
+        get_sink().add_frame(self.id(), "known-mps-catalog", birthdate_NA, key=["person_id"],
+                             message="missing birthdate", out_dir=issue_dir(config, "write_catalog_integrity"))
 
         self.assertEqual(len(person_id_issue), 0, person_id_issue)
         self.assertEqual(len(birthdate_NA), 0, birthdate_NA)
@@ -235,19 +251,15 @@ class Test(unittest.TestCase):
         test that every entry on the person catalog is in the person.csv file
         """
         df_name = "person"
-        df = self.get_meta_df(df_name)
-        emil = self.get_emil()
+        get_scope().skip_if_unchanged(self, df_name)
         config = fetch_config("db")
 
-        missing_persons = pd.DataFrame(columns=list(emil.columns))
-        for i, row in emil.iterrows():
-            if row['person_id'] not in df['person_id'].unique():
-                missing_persons.loc[len(missing_persons)] = row
+        missing_persons = self.get_catalog_missing(df_name)
 
         if not missing_persons.empty:
             warnings.warn(str(missing_persons), MissingPersonWarning)
-            if config and config['write_missing_person']:
-                self.write_error_df(df_name, missing_persons, config["test_out_dir"])
+        get_sink().add_frame(self.id(), df_name, missing_persons, key=["person_id"], message="not in person.csv",
+                             out_dir=issue_dir(config, "write_missing_person"))
 
         self.assertTrue(missing_persons.empty, missing_persons)
 
@@ -257,19 +269,15 @@ class Test(unittest.TestCase):
         test that every entry on the person catalog is in the name.csv file
         """
         df_name = "name"
-        df = self.get_meta_df(df_name)
-        emil = self.get_emil()
+        get_scope().skip_if_unchanged(self, df_name)
         config = fetch_config("db")
 
-        missing_names = pd.DataFrame(columns=list(emil.columns))
-        for i, row in emil.iterrows():
-            if row['person_id'] not in df['person_id'].unique():
-                missing_names.loc[len(missing_names)] = row
+        missing_names = self.get_catalog_missing(df_name)
 
         if not missing_names.empty:
             warnings.warn(str(missing_names), MissingNameWarning)
-            if config and config['write_missing_name']:
-                self.write_missing(df_name, missing_names, config["test_out_dir"])
+        get_sink().add_frame(self.id(), df_name, missing_names, key=["person_id"], message="not in name.csv",
+                             out_dir=issue_dir(config, "write_missing_name"))
 
         self.assertTrue(missing_names.empty, missing_names)
 
@@ -279,20 +287,21 @@ class Test(unittest.TestCase):
         test that every entry on the person catalog is in the location_specifier.csv with the same location
         """
         df_name = "location_specifier"
+        get_scope().skip_if_unchanged(self, df_name)
         df = self.get_meta_df(df_name)
-        iorter = pd.read_csv("test/data/known-iorter.csv", sep=";")
+        iorter = get_scope().restrict(read_csv("test/data/known-iorter.csv", sep=";"))
         config = fetch_config("db")
 
-        missing_locations = pd.DataFrame(columns=list(iorter.columns))
-        for i, row in iorter.iterrows():
-            filtered = df.loc[(df["person_id"] == row["person_id"]) & (df["location"] == row["iort"])]
-            if len(filtered) < 1:
-                missing_locations.loc[len(missing_locations)] = row
+        locations, _ = pd.factorize(pd.concat([df["location"], iorter["iort"]]))
+        known = pair_keys(PERSON.encode(df["person_id"]), locations[:len(df)])
+        wanted = pair_keys(PERSON.encode(iorter["person_id"]), locations[len(df):])
+        found = np.isin(wanted, known) & iorter["person_id"].notna().values & iorter["iort"].notna().values
+        missing_locations = iorter[~found].reset_index(drop=True)
 
         if not missing_locations.empty:
             warnings.warn(str(missing_locations), MissingLocationWarning)
-            if config and config['write_missing_iorter']:
-                self.write_error_df(df_name, missing_locations, config["test_out_dir"])
+        get_sink().add_frame(self.id(), df_name, missing_locations, key=["person_id"], message="iort not in location_specifier.csv",
+                             out_dir=issue_dir(config, "write_missing_iorter"))
 
         self.assertTrue(missing_locations.empty, missing_locations)
 
@@ -302,19 +311,15 @@ class Test(unittest.TestCase):
         test that every entry on the person catalog is in the member_of_parliament.csv file
         """
         df_name = "member_of_parliament"
-        df = self.get_meta_df(df_name)
-        emil = self.get_emil()
+        get_scope().skip_if_unchanged(self, df_name)
         config = fetch_config("db")
 
-        missing_members = pd.DataFrame(columns=list(emil.columns))
-        for i, row in emil.iterrows():
-            if row['person_id'] not in df['person_id'].unique():
-                missing_members.loc[len(missing_members)] = row
+        missing_members = self.get_catalog_missing(df_name)
 
         if not missing_members.empty:
             warnings.warn(str(missing_members), MissingMemberWarning)
-            if config and congig['write_missing_mep']:
-                self.write_error_df(df_name, missing_members, config["test_out_dir"])
+        get_sink().add_frame(self.id(), df_name, missing_members, key=["person_id"], message="not in member_of_parliament.csv",
+                             out_dir=issue_dir(config, "write_missing_mep"))
 
         self.assertTrue(missing_members.empty, missing_members)
 
@@ -325,19 +330,15 @@ class Test(unittest.TestCase):
         test that every entry on the person catalog is in the party_affiliation.csv file
         """
         df_name = "party_affiliation"
-        df = self.get_meta_df(df_name)
-        emil = self.get_emil()
+        get_scope().skip_if_unchanged(self, df_name)
         config = fetch_config("db")
 
-        missing_parties = pd.DataFrame(columns=list(emil.columns))
-        for i, row in emil.iterrows():
-            if row['person_id'] not in df['person_id'].unique():
-                missing_parties.loc[len(missing_parties)] = row
+        missing_parties = self.get_catalog_missing(df_name)
 
         if not missing_parties.empty:
             warnings.warn(str(missing_parties), MissingPartyWarning)
-            if config and config["write_missing_party"]:
-                self.write_error_df(df_name, missing_parties, config["test_out_dir"])
+        get_sink().add_frame(self.id(), df_name, missing_parties, key=["person_id"], message="not in party_affiliation.csv",
+                             out_dir=issue_dir(config, "write_missing_party"))
 
         self.assertTrue(missing_parties.empty, missing_parties)
 
@@ -349,33 +350,30 @@ class Test(unittest.TestCase):
 
         session dates scraped from protocols -- necessary? useful?
         """
-        dates_df = pd.read_csv("test/data/session-dates.csv", sep=';')
+        dates_df = read_csv("test/data/session-dates.csv", sep=';')
         protocols = sorted(list(protocol_iterators("corpus/protocols/", start=1867, end=2022)))
         config = fetch_config("db")
 
-        date_counter = 0
         err = False
         for protocol in protocols:
             E, dates = get_doc_dates(protocol)
             if E:
                 err = True
         if err:
-            rows = []
-            cols = ["protocol", "date"]
+            sink = get_sink()
+            n_issues = 0
             for i, r in dates_df.iterrows():
                 root = parse_protocol(r['protocol'])
                 d = r["date"]
                 date_match = root.findall(f'{tei_ns}docDate[@when="{d}"]')
                 if len(date_match) != 1:
-                    rows.append([r['protocol']. r['date']])
-            if len(rows) > 0:
-                if config and config["write_unknown_dates"]:
-                    df = pd.DataFrame(rows, columns=cols)
-                    self.write_error_df("session-dates", df, config["test_out_dir"])
+                    n_issues += 1
+                    sink.add(self.id(), "session-dates", r['protocol'], f"docDate {d} not in the protocol",
+                             out_dir=issue_dir(config, "write_unknown_dates"))
 
             self.assertEqual(
-                len(rows), 0,
-                f"{len(rows)} date issues // dates not in the known session dates csv")
+                n_issues, 0,
+                f"{n_issues} date issues // dates not in the known session dates csv")
 
 
 
@@ -0,0 +1,115 @@
+"""
+Test that deltas between two versions of data/ rebuild the new version, and only from the old one.
+"""
+from pathlib import Path
+from .delta import apply, diff, DeltaMismatch, diff_table, read_table
+import pandas as pd
+import tempfile
+import unittest
+
+
+
+
+PERSON = pd.DataFrame({
+    "person_id": ["i-1", "i-2", "i-3"],
+    "born": ["1850", "1861-02-03", ""],
+    "dead": ["1920", "", ""],
+    "gender": ["man", "woman", "man"],
+    "riksdagen_id": ["", "0101", ""],
+})
+
+TWITTER = pd.DataFrame({
+    "person_id": ["i-1", "i-2", "i-1", "i-3", "i-1"],
+    "twitter": ["a", "b", "a", "c", "a"],
+})
+
+
+
+
+class Test(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.tmp = Path(self._tmp.name)
+        self.addCleanup(self._tmp.cleanup)
+
+
+    def write(self, folder, tables):
+        folder.mkdir()
+        for table, df in tables.items():
+            df.to_csv(folder / f"{table}.csv", index=False)
+        return folder
+
+
+    def roundtrip(self, old, new):
+        """
+        Write both versions, diff them and apply the delta to a copy of old; return the manifest's entries.
+        """
+        root = Path(tempfile.mkdtemp(dir=self.tmp))
+        folders = {name: self.write(root / name, tables) for name, tables in [("old", old), ("new", new), ("mirror", old)]}
+        manifest = diff(folders["old"], folders["new"], root / "delta")
+        apply(root / "delta", folders["mirror"])
+        self.assertEqual(sorted(p.name for p in folders["mirror"].iterdir()), sorted(f"{t}.csv" for t in new))
+        for table, df in new.items():
+            pd.testing.assert_frame_equal(read_table(folders["mirror"] / f"{table}.csv"), df)
+        return manifest["tables"]
+
+
+    def test_keyed_update(self):
+        new = PERSON.copy()
+        new.loc[1, "dead"] = "1930"
+        entry = self.roundtrip({"person": PERSON}, {"person": new})["person"]
+        self.assertEqual(entry["action"], "patch")
+        self.assertEqual((entry["deletes"], entry["updates"], entry["inserts"]), (0, 1, 0))
+
+
+    def test_key_change(self):
+        new = PERSON.copy()
+        new.loc[1, "person_id"] = "i-9"
+        entry = self.roundtrip({"person": PERSON}, {"person": new})["person"]
+        self.assertEqual(entry["action"], "patch")
+        self.assertEqual((entry["deletes"], entry["updates"], entry["inserts"]), (1, 0, 1))
+
+
+    def test_unkeyed_nth_copy(self):
+        for n in range(3):
+            with self.subTest(copy=n):
+                copy = TWITTER.index[TWITTER["twitter"] == "a"][n]
+                new = TWITTER.drop(index=copy).reset_index(drop=True)
+                entry = self.roundtrip({"twitter": TWITTER}, {"twitter": new})["twitter"]
+                self.assertEqual(entry["action"], "patch")
+                self.assertEqual((entry["deletes"], entry["inserts"]), (1, 0))
+
+
+    def test_reordered_shipped_whole(self):
+        new = PERSON.iloc[[2, 0, 1]].reset_index(drop=True)
+        self.assertIsNone(diff_table(PERSON, new, ["person_id"]))
+        entry = self.roundtrip({"person": PERSON}, {"person": new})["person"]
+        self.assertEqual(entry["action"], "replace")
+
+
+    def test_removed_table(self):
+        tables = self.roundtrip({"person": PERSON, "twitter": TWITTER}, {"person": PERSON})
+        self.assertEqual(list(tables), ["twitter"])
+        self.assertEqual(tables["twitter"]["action"], "remove")
+
+
+    def test_wrong_base(self):
+        new, other = PERSON.copy(), PERSON.copy()
+        new.loc[0, "born"] = "1851"
+        other.loc[2, "gender"] = "woman"
+        old = self.write(self.tmp / "old", {"person": PERSON})
+        diff(old, self.write(self.tmp / "new", {"person": new, "twitter": TWITTER}), self.tmp / "delta")
+        target = self.write(self.tmp / "target", {"person": other})
+        before = (target / "person.csv").read_bytes()
+        with self.assertRaises(DeltaMismatch):
+            apply(self.tmp / "delta", target)
+        # nothing is written when any table doesn't match
+        self.assertEqual((target / "person.csv").read_bytes(), before)
+        self.assertFalse((target / "twitter.csv").exists())
+
+
+
+
+if __name__ == '__main__':
+    unittest.main()
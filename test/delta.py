@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+Row-level deltas between two versions of data/, and applying them.
+
+    python -m test.delta diff old/data data persons-delta/     # what changed from old to new
+    python -m test.delta apply persons-delta.zip mirror/data    # patch a copy of old in place
+
+Rows are matched by the table's key from schema.py, so an edited row is an
+update. Tables without a key match rows by fingerprint (see incremental.py)
+and an edited row is a delete plus an insert; rows that occur once in both
+versions anchor the match, and between two anchors the copies of a repeated
+row are matched in order. Per table the delta holds
+
+    <table>.deletes.csv   keys of the rows that are gone, or whole rows with their old position
+    <table>.updates.csv   the new version of changed keyed rows
+    <table>.inserts.csv   new rows, with their position in the new table
+
+and manifest.json has a content hash of every table before and after. apply
+checks a table's hash before patching it and again after, and leaves it
+untouched if either doesn't match. Hashes are over the parsed rows in order,
+so they don't depend on how the csv is quoted. A table whose remaining rows
+were reordered is shipped whole.
+"""
+from pathlib import Path
+from .incremental import row_hashes
+from .schema import SCHEMA
+import argparse
+import bisect
+import hashlib
+import io
+import json
+import numpy as np
+import pandas as pd
+import sys
+import zipfile
+
+
+
+
+FORMAT = 1
+
+MANIFEST = "manifest.json"
+
+POSITION = "__position"
+
+
+class DeltaMismatch(Exception):
+    pass
+
+
+def read_table(path):
+    return pd.read_csv(path, dtype=str, keep_default_na=False)
+
+
+def table_hash(df):
+    """
+    Return the sha1 of a table's columns and the fingerprints of its rows, in order.
+    """
+    h = hashlib.sha1("\x1f".join(df.columns).encode())
+    h.update(row_hashes(df).tobytes())
+    return h.hexdigest()
+
+
+def row_keys(df, key):
+    """
+    Return the hash of every row's key.
+    """
+    return pd.util.hash_pandas_object(df[key], index=False).values
+
+
+def _longest_increasing(seq):
+    """
+    Return a mask of a longest strictly increasing subsequence of seq.
+    """
+    keep = np.zeros(len(seq), dtype=bool)
+    if (np.diff(seq) > 0).all():
+        keep[:] = True
+        return keep
+    tails, tail_at, prev = [], [], np.full(len(seq), -1)
+    for i, v in enumerate(seq):
+        j = bisect.bisect_left(tails, v)
+        if j == len(tails):
+            tails.append(v)
+            tail_at.append(i)
+        else:
+            tails[j], tail_at[j] = v, i
+        prev[i] = tail_at[j-1] if j else -1
+    i = tail_at[-1]
+    while i >= 0:
+        keep[i] = True
+        i = prev[i]
+    return keep
+
+
+def align_rows(old, new):
+    """
+    Return one identity per row of two unkeyed tables, (segment, fingerprint, occurrence), equal for matched rows.
+
+    Segments are cut at the rows that occur once in each table, kept in the same order in both.
+    """
+    old_h, new_h = pd.Series(row_hashes(old)), pd.Series(row_hashes(new))
+    old_once = old_h.map(old_h.value_counts()).eq(1).values
+    new_once = new_h.map(new_h.value_counts()).eq(1).values
+    in_new = pd.Series(np.flatnonzero(new_once), index=new_h[new_once].values)
+    anchors = np.flatnonzero(old_once & old_h.isin(in_new.index).values)
+    where = in_new.reindex(old_h.values[anchors]).values
+    chosen = _longest_increasing(where)
+    ids = []
+    for h, cuts in [(old_h, anchors[chosen]), (new_h, where[chosen])]:
+        cut = np.zeros(len(h), dtype=bool)
+        cut[cuts] = True
+        segment = np.cumsum(cut)
+        occurrence = h.groupby([segment, h.values]).cumcount().values
+        ids.append(pd.MultiIndex.from_arrays([segment, h.values, occurrence]))
+    return ids
+
+
+def diff_table(old, new, key=None):
+    """
+    Return {"deletes", "updates", "inserts"} dfs turning old into new, or None if new must be shipped whole.
+    """
+    if list(old.columns) != list(new.columns):
+        return None
+    if key:
+        old_keys, new_keys = pd.Index(row_keys(old, key)), pd.Index(row_keys(new, key))
+    else:
+        old_keys, new_keys = align_rows(old, new)
+    if not (old_keys.is_unique and new_keys.is_unique):
+        return None
+    match = new_keys.get_indexer(old_keys)
+    kept = match >= 0
+    # survivors must stay in the same order for inserts by position to rebuild new
+    if (np.diff(match[kept]) < 0).any():
+        return None
+    deletes = old[~kept].assign(**{POSITION: np.flatnonzero(~kept)})
+    inserted = np.ones(len(new), dtype=bool)
+    inserted[match[kept]] = False
+    inserts = new[inserted].assign(**{POSITION: np.flatnonzero(inserted)})
+    if key:
+        changed = row_hashes(old[kept]) != row_hashes(new.iloc[match[kept]])
+        updates = new.iloc[match[kept][changed]]
+        deletes = deletes[key]
+    else:
+        updates = new.iloc[:0]
+    return {"deletes": deletes, "updates": updates, "inserts": inserts}
+
+
+def diff(old_folder, new_folder, out):
+    """
+    Write the delta from the csvs in old_folder to those in new_folder to out and return its manifest.
+    """
+    out = Path(out)
+    out.mkdir(parents=True, exist_ok=True)
+    manifest = {"format": FORMAT, "tables": {}}
+    names = sorted({p.stem for p in Path(old_folder).glob("*.csv")} | {p.stem for p in Path(new_folder).glob("*.csv")})
+    for name in names:
+        old_path, new_path = Path(old_folder) / f"{name}.csv", Path(new_folder) / f"{name}.csv"
+        old = read_table(old_path) if old_path.exists() else None
+        new = read_table(new_path) if new_path.exists() else None
+        entry = {
+            "base": table_hash(old) if old is not None else None,
+            "target": table_hash(new) if new is not None else None,
+        }
+        if entry["base"] == entry["target"]:
+            continue
+        table = SCHEMA.get(name)
+        ops = None
+        if old is not None and new is not None:
+            ops = diff_table(old, new, table.key if table is not None else None)
+        if new is None:
+            entry["action"] = "remove"
+        elif ops is None:
+            entry["action"] = "replace"
+            new.to_csv(out / f"{name}.csv", index=False)
+        else:
+            entry["action"] = "patch"
+            entry["key"] = table.key if table is not None else None
+            for op, df in ops.items():
+                entry[op] = len(df)
+                if len(df):
+                    df.to_csv(out / f"{name}.{op}.csv", index=False)
+        manifest["tables"][name] = entry
+    with open(out / MANIFEST, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+def patch_table(old, entry, read):
+    """
+    Return old with the deletes, updates and inserts of a patch entry applied.
+    """
+    key = entry.get("key")
+    ops = {op: read(op) if entry.get(op) else old.iloc[:0][key or old.columns] for op in ["deletes", "updates"]}
+    if key:
+        keys = pd.Index(row_keys(old, key))
+        drop = keys.get_indexer(row_keys(ops["deletes"], key))
+    else:
+        # unkeyed deletes are whole rows with their position in old, which must still hold them
+        drop = ops["deletes"].pop(POSITION).astype(np.int64).values if entry.get("deletes") else np.zeros(0, np.int64)
+        if (drop >= len(old)).any() or (row_hashes(old.iloc[drop]) != row_hashes(ops["deletes"])).any():
+            drop = np.full(1, -1)
+    if (drop < 0).any():
+        raise DeltaMismatch("a deleted row is not in the table")
+    if len(ops["updates"]):
+        where = keys.get_indexer(row_keys(ops["updates"], key))
+        if (where < 0).any():
+            raise DeltaMismatch("an updated row is not in the table")
+        old = old.copy()
+        old.iloc[where] = ops["updates"][old.columns].values
+    kept = old.drop(index=old.index[drop])
+    inserts = read("inserts") if entry.get("inserts") else None
+    if inserts is None:
+        return kept.reset_index(drop=True)
+    positions = inserts.pop(POSITION).astype(np.int64).values
+    n = len(kept) + len(inserts)
+    slots = np.ones(n, dtype=bool)
+    slots[positions] = False
+    rows = np.empty((n, len(old.columns)), dtype=object)
+    rows[slots] = kept[old.columns].values
+    rows[positions] = inserts[old.columns].values
+    return pd.DataFrame(rows, columns=old.columns)
+
+
+def apply(delta, folder):
+    """
+    Patch the csvs in folder with a delta (a directory or .zip); return the tables changed.
+
+    Raises DeltaMismatch, before writing anything, if a table isn't the delta's base or doesn't come out as its target.
+    """
+    delta = Path(delta)
+    archive = zipfile.ZipFile(delta) if delta.suffix == ".zip" else None
+
+    def read_bytes(name):
+        if archive is None:
+            return (delta / name).read_bytes()
+        match = [n for n in archive.namelist() if n.rsplit("/", 1)[-1] == name]
+        return archive.read(match[0])
+
+    manifest = json.loads(read_bytes(MANIFEST))
+    if manifest["format"] != FORMAT:
+        raise DeltaMismatch(f"delta format {manifest['format']}, expected {FORMAT}")
+    folder = Path(folder)
+    results = {}
+    for name, entry in manifest["tables"].items():
+        path = folder / f"{name}.csv"
+        old = read_table(path) if path.exists() else None
+        if (table_hash(old) if old is not None else None) != entry["base"]:
+            raise DeltaMismatch(f"{path}: not the version the delta was made from")
+        if entry["action"] == "remove":
+            results[name] = None
+            continue
+        if entry["action"] == "replace":
+            new = read_table(io.BytesIO(read_bytes(f"{name}.csv")))
+        else:
+            new = patch_table(old, entry, lambda op: read_table(io.BytesIO(read_bytes(f"{name}.{op}.csv"))))
+        if table_hash(new) != entry["target"]:
+            raise DeltaMismatch(f"{path}: patched table doesn't match the delta's target")
+        results[name] = new
+    for name, new in results.items():
+        path = folder / f"{name}.csv"
+        if new is None:
+            path.unlink()
+        else:
+            new.to_csv(path, index=False)
+    return list(results)
+
+
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    p = commands.add_parser("diff", help="write the delta between two data folders")
+    p.add_argument("old")
+    p.add_argument("new")
+    p.add_argument("out")
+    p = commands.add_parser("apply", help="patch a data folder with a delta")
+    p.add_argument("delta", help="delta directory or .zip")
+    p.add_argument("folder", nargs="?", default="data")
+    args = parser.parse_args()
+    if args.command == "diff":
+        manifest = diff(args.old, args.new, args.out)
+        for name, entry in manifest["tables"].items():
+            counts = ", ".join(f"{entry[op]} {op}" for op in ["deletes", "updates", "inserts"] if op in entry)
+            print(f"{name}: {entry['action']}" + (f" ({counts})" if counts else ""))
+    else:
+        try:
+            changed = apply(args.delta, args.folder)
+        except DeltaMismatch as e:
+            sys.exit(str(e))
+        print(f"patched {len(changed)} tables: {', '.join(changed)}")
@@ -0,0 +1,162 @@
+"""
+Incremental validation: only re-check what changed since a base revision.
+
+Set PERSONS_BASE_REV to a git revision and the integrity tests restrict
+themselves to the tables, person_ids and parliament_years touched by a
+row-level diff of data/*.csv against that revision. Tests whose inputs did not
+change are skipped.
+
+Everything runs in full when PERSONS_BASE_REV is unset, when the base can't be
+read, or when a change touches something the per-row rules can't scope: the
+test code or test data, or one of the FULL_RUN_TABLES.
+"""
+from .cache import load_table
+import io
+import os
+import pandas as pd
+import subprocess
+
+
+
+
+FULL_RUN_TABLES = [
+    "chairs",
+    "government",
+    "party_abbreviation",
+    "riksdag-year",
+]
+
+
+def git_show(rev, path):
+    """
+    Return the bytes of a file at a revision, or None if it does not exist there.
+    """
+    p = subprocess.run(["git", "show", f"{rev}:{path}"], capture_output=True)
+    if p.returncode != 0:
+        return None
+    return p.stdout
+
+
+def changed_files(rev):
+    """
+    Return the paths that differ between a revision and the working tree.
+    """
+    p = subprocess.run(["git", "diff", "--name-only", rev, "--"], capture_output=True, text=True, check=True)
+    return [_ for _ in p.stdout.splitlines() if _]
+
+
+def row_hashes(df):
+    """
+    Return a uint64 fingerprint of every full row.
+    """
+    return pd.util.hash_pandas_object(df.astype(str), index=False).values
+
+
+def diff_rows(old, new):
+    """
+    Return (removed, added): rows only in old and rows only in new.
+
+    An edited row shows up in both.
+    """
+    old_h = row_hashes(old)
+    new_h = row_hashes(new)
+    removed = old[~pd.Series(old_h).isin(new_h).values]
+    added = new[~pd.Series(new_h).isin(old_h).values]
+    return removed, added
+
+
+class Scope:
+    """
+    What the tests need to look at: everything, or the changed rows of some tables.
+    """
+
+    def __init__(self, base=None, metadata_folder="data"):
+        self.base = base
+        self.full = True
+        self.changed = {}
+        if base is None:
+            return
+        try:
+            paths = changed_files(base)
+        except (subprocess.CalledProcessError, OSError):
+            return
+        tables = []
+        for path in paths:
+            if path.startswith("test/") or path.startswith(".github/"):
+                return
+            if path.startswith(f"{metadata_folder}/") and path.endswith(".csv"):
+                tables.append(path[len(metadata_folder) + 1:-4])
+        if any(t in FULL_RUN_TABLES for t in tables):
+            return
+        for table in tables:
+            path = f"{metadata_folder}/{table}.csv"
+            new = load_table(table, metadata_folder=metadata_folder) if os.path.exists(path) else None
+            old = git_show(base, path)
+            old = pd.read_csv(io.BytesIO(old)) if old is not None else None
+            if old is None or new is None:
+                return
+            removed, added = diff_rows(old, new)
+            self.changed[table] = pd.concat([removed, added], ignore_index=True)
+        self.full = False
+
+    def __repr__(self):
+        if self.full:
+            return "Scope(full)"
+        return f"Scope({self.base}: {', '.join(f'{t}={len(df)}' for t, df in self.changed.items())})"
+
+    def _values(self, col):
+        return set().union(*[
+            df[col].dropna().unique() for df in self.changed.values() if col in df.columns])
+
+    @property
+    def person_ids(self):
+        return self._values("person_id")
+
+    @property
+    def parliament_years(self):
+        return self._values("parliament_year")
+
+    def unchanged(self, *tables):
+        """
+        True if none of the tables changed (and this is not a full run).
+        """
+        return not self.full and not any(t in self.changed for t in tables)
+
+    def skip_if_unchanged(self, test, *tables):
+        """
+        Skip a unittest when none of the tables it reads changed.
+        """
+        if self.unchanged(*tables):
+            test.skipTest(f"{', '.join(tables) or 'inputs'} unchanged since {self.base}")
+
+    def restrict(self, df, col="person_id"):
+        """
+        Return the rows of df whose `col` was touched by the change (all rows in a full run).
+        """
+        if self.full:
+            return df
+        return df[df[col].isin(self._values(col))]
+
+    def restrict_parliament_years(self, df):
+        """
+        Return the rows of a chair_mp-like df in the parliament years touched by the change,
+        directly or through one of the changed person_ids.
+        """
+        if self.full:
+            return df
+        years = self.parliament_years
+        years |= set(df.loc[df["person_id"].isin(self.person_ids), "parliament_year"])
+        return df[df["parliament_year"].isin(years)]
+
+
+_scope = None
+
+
+def get_scope():
+    """
+    Return the scope for PERSONS_BASE_REV, computed once per process.
+    """
+    global _scope
+    if _scope is None:
+        _scope = Scope(os.environ.get("PERSONS_BASE_REV") or None)
+    return _scope
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Run integrity checks and record what each of them cost.
+
+    python -m test.instrument test.chairs test.db --json checks.json --csv checks.csv
+
+Runs like `python -m unittest` (same output, same exit status) and records
+per test method:
+
+    seconds        wall time
+    cpu_seconds    CPU time of the process
+    peak_rss_mb    peak resident memory during the test
+    tables_read    tables handed out by cache.py, memo hits included
+    rows_read      rows of those tables plus rows scanned by constraints.py
+    issues         issues reported to the sink of issues.py
+
+With PERSONS_ISSUES set the issues themselves go to that file, see issues.py.
+The JSON report also has the commit, time and versions of the run; the CSV has
+one row per test with the commit, so reports of many commits concatenate into
+a trend. run.py records the same fields for parallel runs.
+
+Peak memory is exact on Linux, where the kernel's high-water mark is reset
+before each test. Elsewhere it is the process's peak so far.
+"""
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from .cache import reads
+from .issues import get_sink
+import argparse
+import json
+import os
+import pandas as pd
+import platform
+import subprocess
+import sys
+import time
+import unittest
+import warnings
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+
+
+FIELDS = ["commit", "test", "status", "seconds", "cpu_seconds", "peak_rss_mb", "tables_read", "rows_read", "issues"]
+
+
+def _reset_peak_rss():
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def _peak_rss_mb():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == "darwin" else peak / 1024
+
+
+@contextmanager
+def probe():
+    """
+    Measure the enclosed block; yields a dict filled in with the measurements on exit.
+    """
+    record = {}
+    sink = get_sink()
+    _reset_peak_rss()
+    tables, rows, issues = reads["tables"], reads["rows"], sink.total
+    wall, cpu = time.perf_counter(), time.process_time()
+    try:
+        yield record
+    finally:
+        peak = _peak_rss_mb()
+        sink.flush()
+        record.update({
+            "seconds": round(time.perf_counter() - wall, 3),
+            "cpu_seconds": round(time.process_time() - cpu, 3),
+            "peak_rss_mb": round(peak, 1) if peak is not None else None,
+            "tables_read": reads["tables"] - tables,
+            "rows_read": reads["rows"] - rows,
+            "issues": sink.total - issues,
+        })
+
+
+def commit():
+    """
+    Return the commit being checked: GITHUB_SHA in CI, else git's HEAD, else None.
+    """
+    if os.environ.get("GITHUB_SHA"):
+        return os.environ["GITHUB_SHA"]
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class InstrumentedResult(unittest.TextTestResult):
+    """
+    A TextTestResult that probes every test and keeps one record per test in self.records.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.records = []
+
+    def startTest(self, test):
+        super().startTest(test)
+        self._status = "ok"
+        self._warnings = warnings.catch_warnings(record=True)
+        self._caught = self._warnings.__enter__()
+        warnings.simplefilter("always")
+        self._probe = probe()
+        self._record = self._probe.__enter__()
+
+    def stopTest(self, test):
+        self._probe.__exit__(None, None, None)
+        self._warnings.__exit__(None, None, None)
+        for w in self._caught:
+            warnings.showwarning(w.message, w.category, w.filename, w.lineno)
+        self._record.update({"test": test.id(), "status": self._status})
+        self.records.append(self._record)
+        super().stopTest(test)
+
+    def addFailure(self, test, err):
+        super().addFailure(test, err)
+        self._status = "fail"
+
+    def addError(self, test, err):
+        super().addError(test, err)
+        self._status = "error"
+
+    def addSkip(self, test, reason):
+        super().addSkip(test, reason)
+        self._status = "skip"
+
+
+def run(modules, verbosity=1):
+    """
+    Run the tests of the modules serially; return (unittest result, per-test records).
+    """
+    suite = unittest.TestSuite(unittest.TestLoader().loadTestsFromName(m) for m in modules)
+    runner = unittest.TextTestRunner(resultclass=InstrumentedResult, verbosity=verbosity)
+    result = runner.run(suite)
+    return result, result.records
+
+
+def write_reports(records, json_path=None, csv_path=None):
+    """
+    Write the records as a JSON report with run metadata and/or a CSV with one row per test.
+    """
+    sha = commit()
+    if json_path:
+        with open(json_path, "w") as o:
+            json.dump({
+                "commit": sha,
+                "time": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "pandas": pd.__version__,
+                "machine": platform.machine(),
+                "results": records,
+            }, o, indent=2, ensure_ascii=False)
+    if csv_path:
+        df = pd.DataFrame(records).assign(commit=sha)
+        df.reindex(columns=FIELDS).to_csv(csv_path, index=False)
+
+
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("modules", nargs="+", help="test modules, classes or methods, as for unittest")
+    parser.add_argument("--json", default=None, help="write the report with run metadata to this file")
+    parser.add_argument("--csv", default=None, help="write one row per test to this file")
+    parser.add_argument("-v", "--verbose", action="store_const", const=2, default=1)
+    args = parser.parse_args()
+    result, records = run(args.modules, args.verbose)
+    write_reports(records, args.json, args.csv)
+    sys.exit(int(not result.wasSuccessful()))
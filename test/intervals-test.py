@@ -0,0 +1,78 @@
+"""
+Test the interval indexes of intervals.py on nested, touching and empty intervals.
+"""
+from .intervals import KeyedIntervals, SegmentIndex
+import numpy as np
+import unittest
+
+
+
+
+class Test(unittest.TestCase):
+
+    def brute_lookup(self, keys, starts, ends, key, point):
+        hits = [i for i in range(len(keys)) if keys[i] == key and starts[i] <= point < ends[i]]
+        # latest start wins, the later row on ties as the stable sort leaves it
+        return max(hits, key=lambda i: (starts[i], i)) if hits else -1
+
+
+    def test_keyed_nested(self):
+        index = KeyedIntervals([1, 1, 1], [0, 10, 20], [100, 50, 30])
+        points = [-1, 0, 5, 15, 25, 30, 40, 50, 99, 100]
+        self.assertEqual(index.lookup([1] * len(points), points).tolist(), [-1, 0, 0, 1, 2, 1, 1, 0, 0, -1])
+        self.assertEqual(KeyedIntervals([1, 1], [0, 10], [100, 20]).lookup([1], [50]).tolist(), [0])
+
+
+    def test_keyed_touching(self):
+        index = KeyedIntervals([2, 2, 2], [0, 10, 20], [10, 20, 30])
+        self.assertEqual(index.lookup([2] * 6, [0, 9, 10, 19, 20, 30]).tolist(), [0, 0, 1, 1, 2, -1])
+
+
+    def test_keyed_other_keys(self):
+        # a key's long interval must not answer for the neighbouring keys
+        index = KeyedIntervals([1, 2, 3], [0, 40, 0], [100, 50, 10])
+        self.assertEqual(index.lookup([0, 1, 2, 2, 3, 4], [50, 50, 45, 60, 50, 50]).tolist(), [-1, 0, 1, -1, -1, -1])
+
+
+    def test_keyed_random(self):
+        rng = np.random.default_rng(0)
+        keys = rng.integers(0, 20, 500)
+        starts = rng.integers(0, 1000, 500)
+        ends = starts + rng.integers(0, 300, 500)
+        qkeys, points = rng.integers(-1, 21, 2000), rng.integers(-10, 1400, 2000)
+        found = KeyedIntervals(keys, starts, ends).lookup(qkeys, points)
+        expected = [self.brute_lookup(keys, starts, ends, k, p) for k, p in zip(qkeys, points)]
+        self.assertEqual(found.tolist(), expected)
+
+
+    def test_segments_nested_touching(self):
+        # 3 is empty and never contains anything
+        starts, ends = [0, 10, 20, 5], [100, 20, 30, 5]
+        index = SegmentIndex(starts, ends)
+        at = lambda p: sorted(index.at(p).tolist())
+        self.assertEqual([at(p) for p in [-1, 0, 5, 10, 19, 20, 30, 99, 100]],
+                         [[], [0], [0], [0, 1], [0, 1], [0, 2], [0], [0], []])
+        self.assertEqual(index.count([-1, 5, 10, 20, 30, 100]).tolist(), [0, 1, 2, 2, 1, 0])
+        pos, ids = index.at_many([10, 100, 25])
+        self.assertEqual(sorted(zip(pos.tolist(), ids.tolist())), [(0, 0), (0, 1), (2, 0), (2, 2)])
+        self.assertEqual(sorted(index.between(15, 25).tolist()), [0, 1, 2])
+        self.assertEqual(sorted(index.between(30, 40).tolist()), [0])
+        self.assertEqual(index.between(100, 200).tolist(), [])
+
+
+    def test_segments_random(self):
+        rng = np.random.default_rng(1)
+        starts = rng.integers(0, 1000, 300)
+        ends = starts + rng.integers(0, 200, 300)
+        index = SegmentIndex(starts, ends)
+        points = rng.integers(-10, 1300, 500)
+        for p in points:
+            expected = np.flatnonzero((starts <= p) & (p < ends)).tolist()
+            self.assertEqual(sorted(index.at(p).tolist()), expected)
+        self.assertEqual(index.count(points).tolist(), [int(((starts <= p) & (p < ends)).sum()) for p in points])
+
+
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,188 @@
+"""
+Vectorized helpers for half-open [start, end) intervals.
+
+Intervals are passed as parallel arrays (numpy datetime64 or integers); nothing
+here loops over rows in python.
+"""
+from .dates import DateColumn, OPEN_END
+import numpy as np
+import pandas as pd
+
+
+
+
+def merge_intervals(keys, starts, ends):
+    """
+    Return the union of each key's intervals as a df with columns key, start, end.
+
+    Empty intervals (end <= start) and intervals with a missing bound are dropped,
+    overlapping or touching intervals of the same key are merged into one.
+    """
+    df = pd.DataFrame({"key": keys, "start": starts, "end": ends})
+    df = df[df["start"].notna() & df["end"].notna() & (df["start"] < df["end"])]
+    if df.empty:
+        return df.reset_index(drop=True)
+    df = df.sort_values(["key", "start"], kind="mergesort")
+    reach = df.groupby("key", sort=False)["end"].cummax()
+    prev_reach = reach.groupby(df["key"], sort=False).shift()
+    new_segment = prev_reach.isna() | (df["start"] > prev_reach)
+    segment = new_segment.cumsum()
+    merged = df.groupby(segment, sort=False).agg(
+        key=("key", "first"),
+        start=("start", "min"),
+        end=("end", "max"))
+    return merged.reset_index(drop=True)
+
+
+def count_active(starts, ends, points):
+    """
+    Return, for every point, the number of intervals with start <= point < end.
+
+    One sorted sweep: intervals started at or before the point minus those ended
+    at or before it. Intervals must be non-empty (see `merge_intervals`).
+    """
+    starts = np.sort(np.asarray(starts))
+    ends = np.sort(np.asarray(ends))
+    points = np.asarray(points)
+    opened = np.searchsorted(starts, points, side="right")
+    closed = np.searchsorted(ends, points, side="right")
+    return opened - closed
+
+
+def date_bounds(values):
+    """
+    Return the first and last day covered by each date string as datetime64 series.
+
+    "1867" covers the whole year, "1867-05" the whole month and "1867-05-16" a
+    single day. Anything else is NaT. See dates.DateColumn for the int form.
+    """
+    parsed = DateColumn.parse(values)
+    return parsed.to_datetime("lo"), parsed.to_datetime("hi")
+
+
+def to_days(values, missing=OPEN_END):
+    """
+    Return datetime64 values as int64 day numbers, NaT as `missing`.
+    """
+    values = pd.Series(values)
+    days = values.values.astype("datetime64[D]").astype(np.int64)
+    return np.where(values.isna().values, missing, days)
+
+
+def _ranges(counts):
+    """
+    Concatenate arange(c) for every c in counts.
+    """
+    counts = np.asarray(counts, dtype=np.int64)
+    starts = np.repeat(np.cumsum(counts) - counts, counts)
+    return np.arange(counts.sum(), dtype=np.int64) - starts
+
+
+class SegmentIndex:
+    """
+    Stabbing index over half-open integer intervals [start, end).
+
+    The line is cut at every interval bound into elementary segments and the
+    intervals active in each segment are stored contiguously (CSR layout). A
+    point lookup is one binary search and a slice; a batch of points is the
+    same thing vectorized.
+    """
+
+    def __init__(self, starts, ends):
+        starts = np.asarray(starts, dtype=np.int64)
+        ends = np.asarray(ends, dtype=np.int64)
+        ids = np.flatnonzero(starts < ends)
+        self.bounds = np.unique(np.concatenate([starts[ids], ends[ids]]))
+        first = np.searchsorted(self.bounds, starts[ids])
+        counts = np.searchsorted(self.bounds, ends[ids]) - first
+        segments = np.repeat(first, counts) + _ranges(counts)
+        members = np.repeat(ids, counts)
+        order = np.argsort(segments, kind="stable")
+        self.members = members[order]
+        self.offsets = np.zeros(len(self.bounds) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(segments, minlength=len(self.bounds)), out=self.offsets[1:])
+
+    def _segments(self, points):
+        return np.searchsorted(self.bounds, points, side="right") - 1
+
+    def at(self, point):
+        """
+        Return the ids (positions) of the intervals containing a point.
+        """
+        seg = self._segments(point)
+        if seg < 0:
+            return self.members[:0]
+        return self.members[self.offsets[seg]:self.offsets[seg + 1]]
+
+    def count(self, points):
+        """
+        Return the number of intervals containing each point.
+        """
+        seg = self._segments(np.asarray(points, dtype=np.int64))
+        counts = self.offsets[seg + 1] - self.offsets[seg]
+        return np.where(seg < 0, 0, counts)
+
+    def at_many(self, points):
+        """
+        Return (point position, interval id) pairs for every interval containing one of the points.
+        """
+        seg = self._segments(np.asarray(points, dtype=np.int64))
+        counts = np.where(seg < 0, 0, self.offsets[seg + 1] - self.offsets[seg])
+        pos = np.repeat(np.arange(len(seg)), counts)
+        members = self.members[np.repeat(self.offsets[seg], counts) + _ranges(counts)]
+        return pos, members
+
+    def between(self, lo, hi):
+        """
+        Return the ids of the intervals overlapping [lo, hi).
+        """
+        a = max(self._segments(lo), 0)
+        b = self._segments(hi - 1)
+        if b < a:
+            return self.members[:0]
+        return np.unique(self.members[self.offsets[a]:self.offsets[b + 1]])
+
+
+class KeyedIntervals:
+    """
+    Per-key lookup of the interval containing a point, e.g. a person's party
+    affiliations. A key's intervals may overlap or nest.
+
+    Intervals are sorted on (key, start); a batch of (key, point) queries is one
+    searchsorted over the packed int64 (key, start) pairs. If the latest interval
+    starting at or before the point has ended, earlier ones are tried while the
+    key's running maximum end still reaches past the point, which is one step
+    back per nested interval.
+    """
+    SPAN = np.int64(1 << 20)
+    ORIGIN = np.int64(-(1 << 19))
+
+    def __init__(self, keys, starts, ends):
+        keys = np.asarray(keys, dtype=np.int64)
+        starts = np.clip(np.asarray(starts, dtype=np.int64), self.ORIGIN, self.ORIGIN + self.SPAN - 1)
+        self.ends = np.asarray(ends, dtype=np.int64)
+        packed = keys * self.SPAN + (starts - self.ORIGIN)
+        self.order = np.argsort(packed, kind="stable")
+        self.packed = packed[self.order]
+        self.keys = keys[self.order]
+        self.sorted_ends = self.ends[self.order]
+        # reach[i]: the latest end of the key's intervals up to sorted position i
+        self.reach = pd.Series(self.sorted_ends).groupby(self.keys, sort=False).cummax().values
+
+    def lookup(self, keys, points):
+        """
+        Return, for every (key, point), the id of the latest-starting interval of
+        that key containing the point, or -1.
+        """
+        keys = np.asarray(keys, dtype=np.int64)
+        points = np.clip(np.asarray(points, dtype=np.int64), self.ORIGIN, self.ORIGIN + self.SPAN - 1)
+        pos = np.searchsorted(self.packed, keys * self.SPAN + (points - self.ORIGIN), side="right") - 1
+        safe = np.maximum(pos, 0)
+        hit = (pos >= 0) & (self.keys[safe] == keys) & (self.reach[safe] > points)
+        pos = np.where(hit, pos, -1)
+        # an interval of the key still covers the point, so the walk stops within the key
+        todo = np.flatnonzero(hit & (self.sorted_ends[safe] <= points))
+        while len(todo):
+            pos[todo] -= 1
+            todo = todo[self.sorted_ends[pos[todo]] <= points[todo]]
+        return np.where(pos >= 0, self.order[np.maximum(pos, 0)], -1)
@@ -0,0 +1,156 @@
+"""
+One append-only report of the issues found by all integrity checks.
+
+    sink = get_sink()
+    sink.add_frame(self.id(), "person", missing, key=["person_id"], message="not in person.csv")
+    sink.add(self.id(), "chairs", chair_id, "duplicate chair_id", out_dir=issue_dir(config, "write_errors"))
+    read_issues("issues.csv.gz")
+
+Every issue is a row of check (the test id), table, key (the key columns
+joined by "|"), message and detail (the issue's other fields as JSON), in a
+gzipped csv. Issues are written as they are reported, a frame at a time or
+buffered, and each write is appended as a gzip member of its own, so memory
+doesn't grow with the number of issues and the parallel workers of run.py can
+share one report. Only a count per check is kept.
+
+The report is PERSONS_ISSUES if that's set. Otherwise it's started in the
+test_out_dir of the first check whose config asks for its errors to be
+written (`out_dir`), as `<time>_issues.csv.gz`, and later checks in the same
+process add to that file; set PERSONS_ISSUES for one report from run.py's
+workers. Without either, issues are only counted.
+"""
+from collections import Counter
+from datetime import datetime
+from functools import reduce
+from pathlib import Path
+import atexit
+import csv
+import gzip
+import io
+import os
+import pandas as pd
+
+
+
+
+COLUMNS = ["check", "table", "key", "message", "detail"]
+
+FLUSH_ROWS = 10_000
+
+_sink = None
+
+
+class IssueSink:
+    """
+    Streams issue rows to a gzipped csv, counting them per check.
+    """
+
+    def __init__(self, path=None):
+        self.path = Path(path) if path else None
+        self.counts = Counter()
+        self._buffer = []
+
+    @property
+    def total(self):
+        return sum(self.counts.values())
+
+    def _target(self, out_dir):
+        if self.path is None and out_dir is not None:
+            self.path = Path(out_dir) / f"{datetime.now().strftime('%Y%m%d-%H%M%S')}_issues.csv.gz"
+        return self.path
+
+    def _append(self, text):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            fd = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_EXCL | os.O_APPEND)
+            text = ",".join(COLUMNS) + "\n" + text
+        except FileExistsError:
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND)
+        try:
+            # one write per member, so appends from several processes don't interleave;
+            # a short write (e.g. interrupted by a signal) is finished off by the next
+            data = memoryview(gzip.compress(text.encode("utf-8")))
+            while data:
+                written = os.write(fd, data)
+                if written == 0:
+                    raise OSError(f"could not append to {self.path}")
+                data = data[written:]
+        finally:
+            os.close(fd)
+
+    def add(self, check, table, key, message, detail=None, out_dir=None):
+        """
+        Report one issue; detail is a dict of further fields.
+        """
+        self.counts[check] += 1
+        if self._target(out_dir) is None:
+            return
+        detail = pd.Series(detail).to_json(force_ascii=False) if detail else ""
+        self._buffer.append([check, table, "" if key is None else str(key), message, detail])
+        if len(self._buffer) >= FLUSH_ROWS:
+            self.flush()
+
+    def add_frame(self, check, table, df, key=(), message="", out_dir=None):
+        """
+        Report every row of df as an issue, keyed by the key columns; message is a string or one per row.
+        """
+        if len(df) == 0:
+            return
+        self.counts[check] += len(df)
+        if self._target(out_dir) is None:
+            return
+        self.flush()
+        key = list(key)
+        if key:
+            keys = reduce(lambda a, b: a + "|" + b, [df[c].astype(object).where(df[c].notna(), "").astype(str) for c in key])
+        else:
+            keys = ""
+        rest = df.drop(columns=key)
+        if len(rest.columns):
+            detail = rest.to_json(orient="records", lines=True, force_ascii=False, date_format="iso").splitlines()
+        else:
+            detail = ""
+        message = message if isinstance(message, str) else list(message)
+        out = pd.DataFrame({"check": check, "table": table, "key": keys, "message": message, "detail": detail},
+                           index=df.index, columns=COLUMNS)
+        self._append(out.to_csv(index=False, header=False))
+
+    def flush(self):
+        """
+        Write out the issues buffered by add.
+        """
+        if self._buffer and self.path is not None:
+            out = io.StringIO()
+            csv.writer(out, lineterminator="\n").writerows(self._buffer)
+            self._append(out.getvalue())
+        self._buffer = []
+
+
+def issue_dir(config, flag):
+    """
+    Return the test_out_dir of a check's config if its flag asks for errors to be written, else None.
+    """
+    if config and config.get(flag):
+        return config["test_out_dir"]
+    return None
+
+
+def get_sink():
+    """
+    Return the process's issue sink, writing to PERSONS_ISSUES if set.
+    """
+    global _sink
+    if _sink is None:
+        _sink = IssueSink(os.environ.get("PERSONS_ISSUES") or None)
+        atexit.register(_sink.flush)
+    return _sink
+
+
+def read_issues(path):
+    """
+    Return a report as a df, check and table as categoricals.
+    """
+    df = pd.read_csv(path, dtype=str, keep_default_na=False, header=None, names=COLUMNS)
+    # the header is the first row its writer appended, not necessarily the file's first
+    df = df[df["check"] != "check"].reset_index(drop=True)
+    return df.astype({"check": "category", "table": "category"})
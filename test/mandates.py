@@ -1,10 +1,11 @@
 """
 Test that known MP start/end dates that have been manually verified do not change in the metadata.
 """
-from datetime import datetime
 from pytest_cfg_fetcher.fetch import fetch_config
+from .cache import load_table, read_csv
+from .incremental import get_scope
+from .issues import get_sink, issue_dir
 import json
-import pandas as pd
 import unittest
 import warnings
 
@@ -23,33 +24,29 @@ class DateErrorWarning(Warning):
 class Test(unittest.TestCase):
 
     def fetch_known_mandate_dates(self):
-        return pd.read_csv("test/data/mandate-dates.csv", sep=';')
+        return read_csv("test/data/mandate-dates.csv", sep=';')
 
 
     def fetch_mep_meta(self):
-        return pd.read_csv("data/member_of_parliament.csv")
+        return load_table("member_of_parliament")
 
 
     def test_manually_checked_mandates(self):
+        get_scope().skip_if_unchanged(self, "member_of_parliament")
         mep = self.fetch_mep_meta()
-        df = self.fetch_known_mandate_dates()
+        df = get_scope().restrict(self.fetch_known_mandate_dates())
         config = fetch_config("mandates")
-        counter = 0
-        rows = []
-        cols = ["person_id", "date", "type"]
+        missing = []
         for i, r in df.iterrows():
             fil = mep.loc[(mep['person_id'] == r["person_id"]) & (mep[r["type"].lower()] == r['date'])]
+            missing.append(fil.empty)
             if fil.empty:
-                counter += 1
-                rows.append([r["person_id"], r["date"], r["type"]])
                 warnings.warn(f"({r['type']}): {r['date']}, {r['person_id']}" , DateErrorWarning)
-        if len(rows) > 0:
-            if config and config['write_errors']:
-                now = datetime.now().strftime("%Y%m%d-%H%M")
-                out = pd.DataFrame(rows, columns=cols)
-                out.to_csv(f"{config['test_out_dir']}{now}_mandates-test.csv", index=False)
+        errors = df.loc[missing, ["person_id", "date", "type"]]
+        get_sink().add_frame(self.id(), "member_of_parliament", errors, key=["person_id"],
+                             message="checked mandate date not in the metadata", out_dir=issue_dir(config, "write_errors"))
 
-        self.assertEqual(counter, 0)
+        self.assertEqual(len(errors), 0)
 
 
 
@@ -2,15 +2,14 @@
 """
 Assert that at least 95% of parliament days have the correct number of MPs in the metadata with a 10% tolerance.
 """
-from pyriksdagen.metadata import (
-    load_Corpus_metadata
-)
-from pyriksdagen.utils import (
-    get_data_location,
-)
 from pytest_cfg_fetcher.fetch import fetch_config
-from tqdm import tqdm
-import datetime as dt
+from .cache import load_table, read_csv
+from .dates import DAY, DateColumn, MONTH, YEAR
+from .incremental import get_scope
+from .intervals import count_active, merge_intervals
+from .issues import get_sink, issue_dir
+from .protocols import load_session_dates
+import numpy as np
 import pandas as pd
 import unittest, warnings
 
@@ -24,81 +23,118 @@ class Info(Warning):
 
 class Test(unittest.TestCase):
 
-    def write_err_df(self, name_str, df, outdir):
-        now = dt.datetime.now().strftime('%Y%m%d-%H%M%S')
-        df.to_csv(f"{outdir}/{now}_{name_str}.csv", index=False)
-
-    def get_spec(self, protocol_path):
-        spec = None
-        spl = protocol_path.split('/')[-1].split('-')
-        if len(spl) == 4:
-            return spec
-        else:
-            if len(spl[2]) > 0:
-                spec = spl[2]
-            return spec
-
-    def mk_py(self, row):
-        if pd.isna(row['spec']):
-            return row['year']
-        else:
-            return str(row['year']) + row['spec']
-
-    def get_baseline(self, row, baseline_df):
-        y = row['year']
-        c = row['chamber']
-        fdf = baseline_df.loc[(baseline_df['year'] == y) & (baseline_df['chamber'] == c)].copy()
-        fdf.reset_index(inplace=True)
-        return fdf.at[0, "n_mps"]
-
-    def get_ch(self, protocol_path):
-        chamber = None
-        spl = protocol_path.split('/')[-1].split('-')
-        if len(spl) == 4:
-            chamber = "ek"
-        else:
-            chamber = spl[3]
-        return chamber
-
-    def is_within_tolerance(self, nmp, baseline):
-        ratio = nmp/baseline
-        #print(f" ---> R: {ratio}")
-        if ratio > 1.1:
-            return False, ratio
-        elif ratio > 0.9:
-            return True, ratio
-        else:
-            return False, ratio
-
-    def preprocess_Corpus_metadata(self):
-        corpus_meta = load_Corpus_metadata(metadata_folder='data')
-        mp_meta = corpus_meta[corpus_meta['source'] == 'member_of_parliament']
-        mp_meta = mp_meta[mp_meta.start.notnull()]
-        mp_meta['start'] = mp_meta['start'].apply(lambda x: pd.to_datetime(x, format='%Y-%m-%d', errors='ignore'))
-        mp_meta['end'] = mp_meta['end'].apply(lambda x: pd.to_datetime(x, format='%Y-%m-%d', errors='ignore'))
-        return mp_meta
+    def session_bounds(self, sessions, column, agg):
+        """
+        Return the first start (agg="min") or last end (agg="max") of the sessions per year and per month.
+        """
+        days = DateColumn.parse(sessions[column])
+        return {p: pd.Series(days.lo).groupby(days.key(p)).agg(agg) for p in [YEAR, MONTH]}
+
+    def containing_session(self, sessions, column, started, ending):
+        """
+        Return `column` of the first session in riksdag-year.csv that starts on or
+        before `started` and ends on or after `ending` (day numbers), NaN if none.
+        """
+        s = sessions.assign(lo=DateColumn.parse(sessions["start"]).lo, hi=DateColumn.parse(sessions["end"]).lo,
+                            order=np.arange(len(sessions)))
+        pairs = pd.DataFrame({"row": np.arange(len(started)), "started": started, "ending": ending}).merge(s, how="cross")
+        first = pairs[(pairs["lo"] <= pairs["started"]) & (pairs["hi"] >= pairs["ending"])]
+        first = first.sort_values(["row", "order"]).drop_duplicates("row")
+        return pd.Series(first[column].values, index=first["row"].values).reindex(range(len(started))).values
+
+    def load_mandates(self):
+        """
+        Return member_of_parliament with chamber codes (ak 2, fk 1, ek 0) and start and end as day numbers.
+
+        Dates are completed like pyriksdagen's metadata loader does: a missing
+        end is the end of the session the start is in (else the year's last
+        session), a missing start the start of the session the end is in. A
+        year or month is its first session start or last session end, else its
+        first or last day. People without a name are left out.
+        """
+        mp_meta = load_table("member_of_parliament")
+        mp_meta = mp_meta[mp_meta["person_id"].isin(load_table("name")["person_id"])].reset_index(drop=True)
+        sessions = load_table("riksdag-year")
+        first_start, last_end = self.session_bounds(sessions, "start", "min"), self.session_bounds(sessions, "end", "max")
+        start, end = DateColumn.parse(mp_meta["start"]), DateColumn.parse(mp_meta["end"])
+
+        lo = np.where(start.missing, np.nan, start.lo)
+        for p, bounds in first_start.items():
+            lo = np.where(start.precision == p, pd.Series(start.key(p)).map(bounds).fillna(pd.Series(start.lo)).values, lo)
+        hi = np.where(end.missing, np.nan, end.lo)
+        for p, bounds in last_end.items():
+            hi = np.where(end.precision == p, pd.Series(end.key(p)).map(bounds).fillna(pd.Series(end.hi)).values, hi)
+
+        no_end = end.missing & ~start.missing & (start.key(YEAR) >= 1867)
+        years = start.key(YEAR)[no_end]
+        fill = pd.Series(years).map(last_end[YEAR]).values
+        fill = np.where(fill < start.lo[no_end], pd.Series(years + 1).map(last_end[YEAR]).values, fill)
+        # like pyriksdagen, a year or month is in a session that started before it and ends in or after it
+        days, exact = start.lo[no_end], start.exact()[no_end]
+        inside = self.containing_session(sessions, "hi", np.where(exact, days, days - 1), np.where(exact, days + 1, days))
+        hi[no_end] = np.where(np.isnan(inside), fill, inside)
+
+        no_start = start.missing & ~end.missing
+        days, exact = end.lo[no_start], end.exact()[no_start]
+        lo[no_start] = self.containing_session(sessions, "lo", np.where(exact, days, days - 1), days)
+
+        mp_meta["chamber"] = mp_meta["role"].map({"förstakammarledamot": 1, "andrakammarledamot": 2}).fillna(0).astype(int)
+        mp_meta["start"], mp_meta["end"] = lo, hi
+        return mp_meta.dropna(subset=["start", "end"]).astype({"start": np.int64, "end": np.int64})
 
     def expand_dates_df(self, dates, baseline_df):
+        """
+        Add the result columns and each day's baseline to the parsed session dates.
+        """
         for _ in ["N_MP", "passes_test", "almost_passes_test",
-                "ratio", "year", "spec", "parliament_year",
-                "chamber", "baseline_N", "MEPs"]:
+                "ratio", "MEPs"]:
             if _ not in dates.columns:
                 dates[_] = None
 
-        dates["year"] = dates["protocol"].apply(lambda x: str(x.split('/')[0][:4]))
-        dates["spec"] = dates["protocol"].apply(lambda x: self.get_spec(x))
-        dates["parliament_year"] = dates.apply(self.mk_py, axis=1)
-        dates['chamber'] = dates['protocol'].apply(lambda x: self.get_ch(x))
-        dates['baseline_N'] = dates.apply(self.get_baseline, args=(baseline_df,), axis=1)
+        dates = dates.drop(columns=["valid", "number", "part"])
+        baseline_df = baseline_df.drop_duplicates(["year", "chamber"])
+        baseline_df = baseline_df[["year", "chamber", "n_mps"]].rename(columns={"n_mps": "baseline_N"})
+        baseline_df["year"] = baseline_df["year"].astype(dates["year"].dtype)
+        baseline_df["chamber"] = baseline_df["chamber"].astype(dates["chamber"].dtype)
+        dates = dates.merge(baseline_df, on=["year", "chamber"], how="left")
         return dates
 
+    def count_mps(self, dates, mp_meta, ledamot_map):
+        """
+        Count the MPs sitting on each session day, one sorted sweep per chamber.
+        """
+        days = DateColumn.parse(dates['date'])
+        N_MP = pd.Series(0, index=dates.index)
+        for chamber, v in ledamot_map.items():
+            sub_df = mp_meta.loc[mp_meta['chamber'] == v]
+            mandates = merge_intervals(sub_df['person_id'], sub_df['start'], sub_df['end'])
+            mask = (dates['chamber'] == chamber).values & days.exact()
+            N_MP[mask] = count_active(mandates['start'].values, mandates['end'].values, days.lo[mask])
+        return N_MP
+
+    def list_meps(self, r, mp_meta, ledamot_map):
+        """
+        List the MPs sitting on a single session day.
+        """
+        day = DateColumn.parse([r['date']])
+        if not day.exact()[0]:
+            return []
+        day = day.lo[0]
+        sub_df = mp_meta.loc[mp_meta['chamber'] == ledamot_map[r['chamber']]]
+        sub_df = sub_df[(sub_df["start"] <= day) & (sub_df["end"] > day)]
+        return list(sub_df["person_id"].unique())
+
     def test_mp_frequency(self):
+        get_scope().skip_if_unchanged(self, "member_of_parliament", "person", "name")
         config = fetch_config("mp-freq-test")
-        baseline_df = pd.read_csv(f"./test/data/baseline-n-mps-year.csv")
+        baseline_df = read_csv("test/data/baseline-n-mps-year.csv")
         baseline_df['year'] = baseline_df['year'].apply(lambda x: str(x)[:4])
-        dates = pd.read_csv(f"./test/data/session-dates.csv", sep=";")
+        dates = load_session_dates()
+        invalid = dates.loc[~dates["valid"], "protocol"].unique()
+        if len(invalid) > 0:
+            warnings.warn(f"\n\n\n --> {len(invalid)} protocol paths don't follow the naming scheme: {', '.join(invalid[:10])}\n", Info)
         dates = self.expand_dates_df(dates, baseline_df)
-        mp_meta = self.preprocess_Corpus_metadata()
+        mp_meta = self.load_mandates()
 
         ledamot_map = {
             "fk": 1,
@@ -106,62 +142,26 @@ class Test(unittest.TestCase):
             "ek": 0
         }
 
-        filtered_DFs = {}
-        for k, v in ledamot_map.items():
-            filtered_DFs[k] = mp_meta.loc[mp_meta['chamber'] == v]
-
-        shouldnt_happen = 0
-
-        with tqdm(total=len(dates)) as prgbr:
-            for i, r in dates.iterrows():
-                N_MP = 0
-                chamber = r['chamber']
-                MEPs = []
-                if not pd.isna(chamber):
-                    parliament_day = r['date']
-                    baseline = r['baseline_N']
-                    prgbr.set_postfix_str(f"{chamber} / {r['parliament_year']} / {shouldnt_happen}")
-
-                    if len(parliament_day) == 10:
-                        #print(r['date'], type(r['date']))
-                        day = dt.datetime.strptime(r['date'], '%Y-%m-%d')
-                        year = day.year
-
-                        sub_df = filtered_DFs[chamber]
-                        sub_df = sub_df[sub_df["start"] <= day]
-                        sub_df = sub_df[sub_df["end"] > day]
-
-                        N_MP = len(sub_df["person_id"].unique())
-                        MEPs = list(sub_df["person_id"].unique())
-
-                    dates.at[i, 'N_MP'] = N_MP
-
-                    if N_MP != 0:
-                        if N_MP == r['baseline_N']:
-                            dates.at[i, 'passes_test'] = True
-                            dates.at[i, 'almost_passes_test'], dates.at[i, "ratio"] = self.is_within_tolerance(N_MP, baseline)
-                        else:
-                            dates.at[i, 'passes_test'] = False
-                            dates.at[i, 'almost_passes_test'], dates.at[i, "ratio"] = self.is_within_tolerance(N_MP, baseline)
-                    else:
-                        dates.at[i, 'passes_test'] = False
-                        dates.at[i, 'almost_passes_test'] = False
-                        dates.at[i, "ratio"] = 0
-                else:
-                    dates.at[i, 'passes_test'] = "None"
-                    dates.at[i, 'almost_passes_test'] = "None"
-                    dates.at[i, "ratio"] = "None"
-                dates.at[i, "MEPs"] = list(MEPs)
-                prgbr.update()
+        has_chamber = dates['chamber'].notna()
+        N_MP = self.count_mps(dates, mp_meta, ledamot_map)
+        ratio = N_MP / dates['baseline_N']
+        dates['N_MP'] = N_MP.where(has_chamber, None)
+        dates['passes_test'] = (N_MP != 0) & (N_MP == dates['baseline_N'])
+        dates['almost_passes_test'] = (N_MP != 0) & (ratio > 0.9) & (ratio <= 1.1)
+        dates['ratio'] = ratio.where(N_MP != 0, 0)
+        for col in ['passes_test', 'almost_passes_test', 'ratio']:
+            dates[col] = dates[col].astype(object).where(has_chamber, "None")
         dates = dates.sort_values(by=['protocol', 'date'], ignore_index=True)
 
         total_passed = len(dates.loc[dates['passes_test'] == True])
         total_almost = len(dates.loc[dates['almost_passes_test'] == True])
         total = len(dates)
-        if total > total_almost:
-            if config and config["write-err-days"]:
-                no_passdf = dates.loc[dates['almost_passes_test'] == False]
-                self.write_err_df("mp-freq-oor", no_passdf, config["test_out_dir"])
+        no_passdf = dates.loc[dates['almost_passes_test'] == False].copy()
+        out_dir = issue_dir(config, "write-err-days")
+        if out_dir:
+            no_passdf['MEPs'] = no_passdf.apply(self.list_meps, args=(mp_meta, ledamot_map), axis=1)
+        get_sink().add_frame(self.id(), "member_of_parliament", no_passdf, key=["protocol", "date"],
+                             message="number of MPs off by more than 10%", out_dir=out_dir)
 
         warnings.warn(f"\n\n\n --> of {total} Parliament days, {total_almost} almost have the correct number of MPs (+/-10%) {total_almost/total}\n", Info)
 
@@ -0,0 +1,84 @@
+"""
+Test name normalization and how NameIndex ranks its candidates.
+"""
+from .names import NameIndex, normalize, split_iort
+import pandas as pd
+import unittest
+
+
+
+
+NAMES = pd.DataFrame({
+    "person_id": ["i-1", "i-2", "i-3", "i-4", "i-5", "i-6"],
+    "name": ["Karl Ericsson", "Karl Ericsson-Dahl", "Karl Eriksson", "Anders Karlsson", "Per Persson", "Per Persson"],
+})
+
+LOCATIONS = pd.DataFrame({
+    "person_id": ["i-5", "i-6"],
+    "location": ["Dansjö", "Malmö"],
+})
+
+
+
+
+class Test(unittest.TestCase):
+
+    def setUp(self):
+        self.index = NameIndex(NAMES, LOCATIONS)
+
+
+    def ranking(self, query):
+        return [(c.person_id, c.match) for c in self.index.search(query)]
+
+
+    def test_normalize(self):
+        self.assertEqual(normalize("Aaby-Ericsson"), "aaby ericsson")
+        self.assertEqual(normalize("  ÅSTRÖM,  K. "), "astrom k")
+        self.assertEqual(normalize("Gustaf_Åkerhielm"), "gustaf akerhielm")
+        self.assertEqual(normalize(" - "), "")
+
+
+    def test_split_iort(self):
+        self.assertEqual(split_iort("Aaby-Ericsson i Dansjö"), ("aaby ericsson", "dansjo"))
+        self.assertEqual(split_iort("Per Persson i Nedra Kilen"), ("per persson", "nedra kilen"))
+        self.assertEqual(split_iort("Ericsson"), ("ericsson", None))
+        self.assertEqual(split_iort("Lind"), ("lind", None))
+
+
+    def test_exact(self):
+        found = self.index.search("Karl Ericsson")
+        self.assertEqual((found[0].person_id, found[0].score, found[0].match), ("i-1", 1.0, "exact"))
+        self.assertTrue(all(c.score < 1 for c in found[1:]))
+
+
+    def test_prefix(self):
+        self.assertEqual(self.ranking("Karl Eric")[0], ("i-1", "prefix"))
+        self.assertNotIn("i-4", [p for p, _ in self.ranking("Karl Eric")])
+
+
+    def test_fuzzy(self):
+        self.assertEqual(self.ranking("Karl Erikson")[0], ("i-3", "fuzzy"))
+        self.assertEqual(self.ranking("Karl Erikson")[1], ("i-1", "fuzzy"))
+
+
+    def test_location(self):
+        self.assertEqual(self.ranking("Per Persson i Malmö"), [("i-6", "exact"), ("i-5", "exact")])
+        self.assertEqual(self.ranking("Per Persson i Dansjö"), [("i-5", "exact"), ("i-6", "exact")])
+        # an unknown location changes nothing
+        self.assertEqual(self.ranking("Per Persson i Lund"), self.ranking("Per Persson"))
+
+
+    def test_empty(self):
+        self.assertEqual(self.index.search(""), [])
+        self.assertEqual(self.index.search(" - "), [])
+
+
+    def test_limit(self):
+        self.assertEqual(len(self.index.search("Karl Ericsson", limit=2)), 2)
+        self.assertEqual(len(self.index.search("Karl Ericsson", limit=10)), 3)
+
+
+
+
+if __name__ == '__main__':
+    unittest.main()
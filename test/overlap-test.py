@@ -0,0 +1,173 @@
+"""
+Test that overlap.py finds the same double bookings as the per-year loops of
+test_chair_hogs and test_knaMP did on top of pyriksdagen's yearize_mandates.
+
+The reference below transcribes those loops and yearize_mandates' rules for the
+cases compared here: mandates with both ends given, year precision only in
+calendar parliament years (as before 1971) and at most one mandate per person
+and parliament year. yearize_mandates itself no longer runs on data/.
+"""
+from datetime import datetime
+from .overlap import find_overlaps, resolve_chair_intervals
+import numpy as np
+import pandas as pd
+import unittest
+
+
+
+
+RIKSDAG_YEAR = pd.DataFrame([
+    [1925, "ak", "1925-01-10", "1925-05-30"],
+    [1925, "fk", "1925-01-12", "1925-06-05"],
+    [1926, "ak", "1926-01-11", "1926-05-29"],
+    [1926, "fk", "1926-01-11", "1926-06-02"],
+    [198081, "ek", "1980-10-07", "1981-06-10"],
+    [198182, "ek", "1981-10-06", "1982-06-09"],
+], columns=["parliament_year", "chamber", "start", "end"])
+
+CHAIRS = pd.DataFrame([
+    ["a1", "ak", 1],
+    ["a2", "ak", 2],
+    ["f1", "fk", 1],
+    ["e1", "ek", 1],
+    ["e2", "ek", 2],
+], columns=["chair_id", "chamber", "chair_nr"])
+
+MEP = pd.DataFrame([
+    ["p1", "1925", "1926"],
+    ["p2", "1925", "1925"],
+    ["p3", "1925-03-31", "1925-12-31"],
+    ["p4", "1926", "1926"],
+    ["p5", "1980-11-01", "1981-12-31"],
+    ["p6", "1981-01-15", "1982-06-09"],
+    ["p7", "1982-01-01", "1982-06-09"],
+    ["p9", "1980-12-01", "1982-06-09"],
+], columns=["person_id", "start", "end"])
+
+CHAIR_MP = pd.DataFrame([
+    # p1 keeps a1 all year and takes a2 from April: in two chairs
+    ["a1", 1925, np.nan, np.nan, "p1"],
+    ["a2", 1925, "1925-04-01", np.nan, "p1"],
+    # p2 hands a2 on to p3 on the day p3 starts: touching, but p3 and p1 share it
+    ["a2", 1925, np.nan, "1925-03-31", "p2"],
+    ["a2", 1925, "1925-03-31", np.nan, "p3"],
+    # p4 sits in both chambers
+    ["a1", 1926, np.nan, np.nan, "p4"],
+    ["f1", 1926, np.nan, np.nan, "p4"],
+    ["a1", 1926, np.nan, np.nan, "p1"],
+    # p5's mandate spans two parliament years and overlaps p6 in the first
+    ["e1", 198081, np.nan, np.nan, "p5"],
+    ["e1", 198081, np.nan, np.nan, "p6"],
+    ["e1", 198182, np.nan, np.nan, "p5"],
+    ["e1", 198182, np.nan, np.nan, "p7"],
+    # p8 has no mandate and falls back on the chamber's first day
+    ["e2", 198081, np.nan, "1980-12-01", "p8"],
+    ["e2", 198081, np.nan, np.nan, "p9"],
+    ["e2", 198182, np.nan, np.nan, "p9"],
+    ["e2", 198182, np.nan, np.nan, "p6"],
+    ["e2", 198182, np.nan, np.nan, np.nan],
+], columns=["chair_id", "parliament_year", "start", "end", "person_id"])
+
+
+
+
+class Test(unittest.TestCase):
+
+    def yearize(self, mep, riksdag_year):
+        """
+        Split each mandate over the parliament years it touches, as yearize_mandates did.
+
+        Year precision and the years in between take the parliament year's first
+        start and last end, a day precise start or end is kept in its year.
+        """
+        years = riksdag_year.groupby("parliament_year").agg(start=("start", "min"), end=("end", "max"))
+        rows = []
+        for _, m in mep.iterrows():
+            lo = m["start"] if len(m["start"]) == 10 else m["start"] + "-01-01"
+            hi = m["end"] if len(m["end"]) == 10 else m["end"] + "-12-31"
+            touched = [py for py, y in years.iterrows() if y["start"] <= hi and lo <= y["end"]]
+            for i, py in enumerate(touched):
+                start = m["start"] if i == 0 and len(m["start"]) == 10 else years.at[py, "start"]
+                end = m["end"] if i == len(touched) - 1 and len(m["end"]) == 10 else years.at[py, "end"]
+                rows.append([m["person_id"], py, start, end])
+        return pd.DataFrame(rows, columns=["person_id", "parliament_year", "meta_start", "meta_end"])
+
+
+    def baseline_conflicts(self, chair_mp, mep, group, distinct, across=False):
+        """
+        Return the (parliament_year, group value) pairs the old per-year loops reported.
+        """
+        chair_mp = chair_mp.rename(columns={"start": "chair_start", "end": "chair_end"})
+        chair_mp = chair_mp[chair_mp["person_id"].notna()]
+        chair_mp = pd.merge(chair_mp, CHAIRS, on="chair_id", how="left")
+        chair_mp = pd.merge(chair_mp, self.yearize(mep, RIKSDAG_YEAR), on=["person_id", "parliament_year"], how="left")
+        found = set()
+        for y in chair_mp["parliament_year"].unique():
+            year_chair_mp = chair_mp.loc[chair_mp["parliament_year"] == y]
+            yse = RIKSDAG_YEAR.loc[RIKSDAG_YEAR["parliament_year"] == y].sort_values(["chamber", "start", "end"])
+            d = {c: {"earliest": cdf["start"].iloc[0], "latest": cdf["end"].iloc[-1]} for c, cdf in yse.groupby("chamber")}
+            for dup in year_chair_mp[group].unique():
+                df = year_chair_mp.loc[year_chair_mp[group] == dup]
+                df = df.drop_duplicates(subset=["chair_id", "parliament_year", "chair_start", "chair_end", "person_id"])
+                if len(df[distinct].unique()) == 1:
+                    continue
+                if across and len(df["chamber"].unique()) > 1:
+                    found.add((y, dup))
+                    continue
+                ranges = []
+                for _, r in df.iterrows():
+                    rstart = r["chair_start"] if pd.notnull(r["chair_start"]) else (
+                        r["meta_start"] if pd.notnull(r["meta_start"]) else d[r["chamber"]]["earliest"])
+                    rend = r["chair_end"] if pd.notnull(r["chair_end"]) else (
+                        r["meta_end"] if pd.notnull(r["meta_end"]) else d[r["chamber"]]["latest"])
+                    ranges.append((rstart, rend))
+                ranges = sorted(ranges)
+                for a, b in zip(ranges, ranges[1:]):
+                    if (datetime.strptime(a[1], "%Y-%m-%d") - datetime.strptime(b[0], "%Y-%m-%d")).days > 0:
+                        found.add((y, dup))
+        return found
+
+
+    def conflicts(self, chair_mp, mep, group, distinct, across=None):
+        resolved = resolve_chair_intervals(chair_mp, CHAIRS, mep, RIKSDAG_YEAR)
+        issues = find_overlaps(resolved, ["parliament_year", group], distinct, across=across)
+        return set(zip(issues["parliament_year"], issues[group]))
+
+
+    def test_chair_hogs(self):
+        expected = self.baseline_conflicts(CHAIR_MP, MEP, "person_id", "chair_id", across=True)
+        self.assertEqual(expected, {(1925, "p1"), (1926, "p4")})
+        self.assertEqual(self.conflicts(CHAIR_MP, MEP, "person_id", "chair_id", across="chamber"), expected)
+
+
+    def test_shared_chairs(self):
+        expected = self.baseline_conflicts(CHAIR_MP, MEP, "chair_id", "person_id")
+        self.assertEqual(expected, {(1925, "a2"), (1926, "a1"), (198081, "e1"), (198182, "e2")})
+        self.assertEqual(self.conflicts(CHAIR_MP, MEP, "chair_id", "person_id"), expected)
+
+
+    def test_random(self):
+        # one mandate each; chair rows with or without their own dates inside the mandate's year
+        rng = np.random.default_rng(0)
+        days = pd.date_range("1980-10-07", "1982-06-09").strftime("%Y-%m-%d")
+        mep = pd.DataFrame([[f"p{i}", *sorted(rng.choice(days, 2))] if i % 2 else [f"p{i}", "1925", str(rng.choice([1925, 1926]))]
+                            for i in range(60)], columns=["person_id", "start", "end"])
+        rows = []
+        for _, m in self.yearize(mep, RIKSDAG_YEAR).iterrows():
+            chairs = ["e1", "e2"] if m["parliament_year"] > 9999 else ["a1", "a2", "f1"]
+            span = pd.date_range(m["meta_start"], m["meta_end"]).strftime("%Y-%m-%d")
+            for chair in rng.choice(chairs, rng.integers(1, 3)):
+                start, end = sorted(rng.choice(span, 2))
+                rows.append([chair, m["parliament_year"], start if rng.random() < 0.3 else np.nan,
+                             end if rng.random() < 0.3 else np.nan, m["person_id"]])
+        chair_mp = pd.DataFrame(rows, columns=["chair_id", "parliament_year", "start", "end", "person_id"])
+        for group, distinct, across in [("person_id", "chair_id", "chamber"), ("chair_id", "person_id", None)]:
+            expected = self.baseline_conflicts(chair_mp, mep, group, distinct, across=across is not None)
+            self.assertTrue(expected)
+            self.assertEqual(self.conflicts(chair_mp, mep, group, distinct, across=across), expected)
+
+
+
+
+if __name__ == '__main__':
+    unittest.main()
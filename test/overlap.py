@@ -0,0 +1,110 @@
+"""
+Resolve when each chair_mp row's occupant actually sits in the chair and find
+people in two seats and seats with two people.
+
+A row's interval is its own start/end if given, else the person's mandate
+clipped to the parliament year, else the chamber's first start and last end in
+riksdag-year.csv. Everything is done with merges and sorted group-wise
+comparisons over the whole table.
+"""
+from .codes import CHAIR, MISSING, PERSON
+from .intervals import date_bounds
+import numpy as np
+import pandas as pd
+
+
+
+
+def parliament_year_bounds(riksdag_year):
+    """
+    Return the first start and last end of every parliament year, per chamber and overall.
+    """
+    ry = riksdag_year.copy()
+    ry["start"] = pd.to_datetime(ry["start"], format="%Y-%m-%d")
+    ry["end"] = pd.to_datetime(ry["end"], format="%Y-%m-%d")
+    ry = ry.sort_values(["parliament_year", "chamber", "start", "end"])
+    chamber = ry.groupby(["parliament_year", "chamber"], as_index=False).agg(
+        earliest=("start", "first"),
+        latest=("end", "last"))
+    year = ry.groupby("parliament_year", as_index=False).agg(
+        py_start=("start", "min"),
+        py_end=("end", "max"))
+    return chamber, year
+
+
+def mandate_bounds(chair_mp, mep, year_bounds):
+    """
+    Return meta_start, meta_end for every chair_mp row from the person's mandates in that year.
+
+    Mandates with year precision cover the whole parliament year, day precision
+    mandates are clipped to it. Rows without a matching mandate get NaT.
+    """
+    mandates = pd.DataFrame({"person": PERSON.encode(mep["person_id"])})
+    mandates["lo"], _ = date_bounds(mep["start"])
+    _, mandates["hi"] = date_bounds(mep["end"])
+    mandates["lo_year"] = mep["start"].astype(str).str.len() == 4
+    mandates["hi_year"] = mep["end"].astype(str).str.len() == 4
+    mandates = mandates[mandates["lo"].notna().values & (mandates["person"] != MISSING).values]
+
+    rows = pd.DataFrame({
+        "person": PERSON.encode(chair_mp["person_id"]),
+        "parliament_year": chair_mp["parliament_year"].values,
+        "row": np.arange(len(chair_mp))})
+    rows = rows.merge(year_bounds, on="parliament_year", how="inner")
+    rows = rows.merge(mandates, on="person", how="inner")
+    hi = rows["hi"].fillna(rows["py_end"])
+    rows = rows[(rows["lo"] <= rows["py_end"]) & (hi >= rows["py_start"])]
+    rows["meta_start"] = rows["lo"].where(
+        ~rows["lo_year"] & (rows["lo"] > rows["py_start"]), rows["py_start"])
+    rows["meta_end"] = rows["hi"].where(
+        ~rows["hi_year"] & (rows["hi"] < rows["py_end"]), rows["py_end"])
+    meta = rows.groupby("row").agg(meta_start=("meta_start", "min"), meta_end=("meta_end", "max"))
+    meta = meta.reindex(range(len(chair_mp)))
+    return meta["meta_start"].values, meta["meta_end"].values
+
+
+def resolve_chair_intervals(chair_mp, chairs, mep, riksdag_year):
+    """
+    Return the occupied chair_mp rows with chamber and resolved start and end (datetime64).
+
+    Rows that repeat chair_id, parliament_year, start, end and person_id are dropped.
+    """
+    df = chair_mp[chair_mp["person_id"].notna()]
+    df = df.rename(columns={"start": "chair_start", "end": "chair_end"})
+    df = df.drop_duplicates(subset=["chair_id", "parliament_year", "chair_start", "chair_end", "person_id"])
+    df = df.assign(chair=CHAIR.encode(df["chair_id"]))
+    df = df.merge(
+        pd.DataFrame({"chair": CHAIR.encode(chairs["chair_id"]), "chamber": chairs["chamber"].values}),
+        on="chair", how="left").drop(columns="chair")
+    chamber_bounds, year_bounds = parliament_year_bounds(riksdag_year)
+    df["meta_start"], df["meta_end"] = mandate_bounds(df, mep, year_bounds)
+    df = df.merge(chamber_bounds, on=["parliament_year", "chamber"], how="left")
+    chair_start, _ = date_bounds(df["chair_start"])
+    _, chair_end = date_bounds(df["chair_end"])
+    df["start"] = chair_start.fillna(df["meta_start"]).fillna(df["earliest"])
+    df["end"] = chair_end.fillna(df["meta_end"]).fillna(df["latest"])
+    return df
+
+
+def find_overlaps(df, by, distinct, across=None):
+    """
+    Return the rows of every `by` group in which more than one `distinct` value
+    is held at the same time.
+
+    Rows are sorted by start, end within the group and each start is compared to
+    the latest end seen before it; an earlier end strictly after the start is a
+    conflict. Groups spanning more than one `across` value (e.g. two chambers)
+    are conflicts regardless of dates.
+    """
+    groups = df.groupby(by, sort=False)
+    df = df[groups[distinct].transform("nunique") > 1]
+    if df.empty:
+        return df.copy()
+    df = df.sort_values(by + ["start", "end"], kind="mergesort")
+    keys = [df[c] for c in by]
+    reach = df.groupby(keys, sort=False)["end"].cummax()
+    prev_end = reach.groupby(keys, sort=False).shift()
+    overlapping = (prev_end > df["start"]).groupby(keys, sort=False).transform("any")
+    if across is not None:
+        overlapping |= df.groupby(by, sort=False)[across].transform("nunique") > 1
+    return df[overlapping].reset_index(drop=True)
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Normalize party names and abbreviations, as OCR'd from the protocols, with party_abbreviation.csv.
+
+    python -m test.parties mentions.csv party -o normalized.csv
+
+    parties = PartyNormalizer.load()
+    parties.normalize(["(s)", "Folkpartiet", "herr Nilsson (fp):", "(ss)"])
+
+Every string gets the abbreviation, the canonical party name and party_id, the
+ocr_correction flag of the variant it matched and how it matched:
+
+    exact      the whole string is a variant in party_abbreviation.csv
+    casefold   the same, ignoring case and surrounding whitespace
+    contains   a variant occurs in the string, e.g. "herr Nilsson (fp):"
+
+The canonical name of an abbreviation is its most used full name in
+party_affiliation.csv (so "(fp)" is Liberalerna), and its party_id the one
+most used with that name.
+
+A batch is first reduced to its distinct strings, usually a few hundred for
+millions of mentions. Those are looked up in a hash table, and the rest run
+through one regular expression of every variant, longest first, which
+finds the first variant in a string in a single scan.
+"""
+from .cache import load_table
+import argparse
+import numpy as np
+import pandas as pd
+import re
+import sys
+
+
+
+
+EXACT, CASEFOLD, CONTAINS = "exact", "casefold", "contains"
+
+COLUMNS = ["abbreviation", "party", "party_id", "ocr_correction", "match"]
+
+
+def _key(s):
+    return s.strip().casefold()
+
+
+class PartyNormalizer:
+    """
+    Exact and casefolded hash lookups plus a compiled pattern of all variants in party_abbreviation.csv.
+    """
+
+    def __init__(self, abbreviations, affiliations):
+        variants = abbreviations.dropna(subset=["party", "abbreviation"]).drop_duplicates("party")
+        variants = variants.assign(ocr_correction=variants["ocr_correction"].astype(str) == "True")
+        full = ~variants["party"].str.startswith("(")
+
+        # canonical name and party_id per abbreviation
+        used = affiliations.dropna(subset=["party", "party_id"])
+        used = used[used["party"].isin(variants.loc[full, "party"])]
+        ids = used.groupby(["party", "party_id"]).size().sort_values(ascending=False).reset_index()
+        ids = ids.drop_duplicates("party").set_index("party")
+        names = variants[full].assign(n=lambda df: df["party"].map(ids[0]).fillna(0))
+        names = names.sort_values("n", ascending=False).drop_duplicates("abbreviation")
+        canonical = names.set_index("abbreviation")["party"]
+
+        table = pd.DataFrame({
+            "abbreviation": variants["abbreviation"].values,
+            "party": variants["abbreviation"].map(canonical).values,
+            "ocr_correction": variants["ocr_correction"].values,
+        }, index=variants["party"].values)
+        # a full name is its own canonical name
+        table.loc[full.values, "party"] = variants.loc[full, "party"].values
+        table["party_id"] = table["party"].map(ids["party_id"])
+        self.table = table[COLUMNS[:-1]]
+
+        # variants whose casefolded forms collide across abbreviations are left to the exact lookup
+        casefolded = pd.Series(self.table.index, index=[_key(v) for v in self.table.index])
+        abbrev = self.table.loc[casefolded.values, "abbreviation"].values
+        clashes = pd.Series(abbrev, index=casefolded.index).groupby(level=0).nunique()
+        casefolded = casefolded[~casefolded.index.duplicated()]
+        self.casefolded = casefolded[clashes[casefolded.index].values == 1]
+
+        # abbreviations are case sensitive ("(I)" is an OCR error, "i" a word), full names are not
+        patterns = []
+        for v in sorted(self.table.index, key=len, reverse=True):
+            if v.startswith("("):
+                patterns.append(re.escape(v))
+            else:
+                patterns.append(r"(?<!\w)(?i:" + re.escape(v) + r")(?!\w)")
+        self.pattern = re.compile("(" + "|".join(patterns) + ")")
+        self.full_names = {_key(v): v for v in self.table.index[full.values]}
+
+    @classmethod
+    def load(cls, metadata_folder="data"):
+        """
+        Build the normalizer from party_abbreviation.csv and party_affiliation.csv in metadata_folder.
+        """
+        return cls(
+            load_table("party_abbreviation", metadata_folder=metadata_folder),
+            load_table("party_affiliation", metadata_folder=metadata_folder))
+
+    def _variant(self, found):
+        return found if found.startswith("(") else self.full_names.get(_key(found))
+
+    def normalize(self, strings):
+        """
+        Return a df aligned with strings: abbreviation, party, party_id, ocr_correction and match.
+
+        Unmatched and missing strings get None throughout.
+        """
+        strings = pd.Series(strings, dtype=object)
+        codes, uniques = pd.factorize(strings)
+        # missing strings point at a trailing None
+        codes = np.where(codes >= 0, codes, len(uniques))
+        uniques = pd.Series(list(uniques) + [None], dtype=object)
+
+        variant = uniques.where(uniques.isin(self.table.index))
+        match = pd.Series(np.where(variant.notna(), EXACT, None), dtype=object)
+        todo = variant.isna()
+        if todo.any():
+            folded = uniques[todo].str.strip().str.casefold().map(self.casefolded)
+            variant[todo] = folded
+            match[todo & variant.notna()] = CASEFOLD
+        todo = variant.isna()
+        if todo.any():
+            found = uniques[todo].str.extract(self.pattern, expand=False)
+            found = found.map(self._variant, na_action="ignore")
+            variant[todo] = found
+            match[todo & variant.notna()] = CONTAINS
+
+        out = self.table.reindex(variant.values).reset_index(drop=True)
+        out["match"] = match.values
+        out = out.astype(object).where(out.notna(), None)
+        out = out.iloc[codes]
+        out.index = strings.index
+        return out
+
+
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("csv", help="csv with the party mentions")
+    parser.add_argument("column", help="column of the party mentions")
+    parser.add_argument("--sep", default=",")
+    parser.add_argument("-o", "--out", help="output csv (default: stdout)")
+    parser.add_argument("--metadata-folder", default="data")
+    args = parser.parse_args()
+    df = pd.read_csv(args.csv, sep=args.sep, dtype=str)
+    normalized = PartyNormalizer.load(args.metadata_folder).normalize(df[args.column])
+    df = pd.concat([df, normalized.add_prefix("normalized_")], axis=1)
+    df.to_csv(args.out or sys.stdout, sep=args.sep, index=False)
@@ -1,8 +1,11 @@
 """
 Tests related to party affiliations.
 """
-from datetime import datetime
 from pytest_cfg_fetcher.fetch import fetch_config
+from .cache import load_table, read_csv
+from .incremental import get_scope
+from .issues import get_sink, issue_dir
+from .reconcile import EXACT, reconcile
 import pandas as pd
 import unittest
 import warnings
@@ -33,67 +36,51 @@ class Info(Warning):
 
 class Test(unittest.TestCase):
 
-    def write_err_df(self, name_str, lol, cols, outdir):
-        now = datetime.now().strftime('%Y%m%d-%H%M%S')
-        df = pd.DataFrame(lol, columns=cols)
-        df.to_csv(f"{outdir}/{now}_{name_str}.csv", index=False)
-
-
     #@unittest.skip
     def test_independent_mp(self):
+        get_scope().skip_if_unchanged(self, "explicit_no_party")
         config = fetch_config("independent-mp")
-        test_file = pd.read_csv("test/data/independent-mp.csv", sep=';')
-        independent = pd.read_csv("data/explicit_no_party.csv")
+        test_file = read_csv("test/data/independent-mp.csv", sep=';')
+        independent = load_table("explicit_no_party")
         ind_wiki = independent['wiki_id'].unique()
         ind_swerik = independent['person_id'].unique()
-        missing_ind = []
-        for i, r in test_file.iterrows():
-            if r['wiki_id'] not in ind_wiki:
-                if r['person_id'] not in ind_swerik:
-                    missing_ind.append([r['wiki_id'], r['person_id']])
-                    warnings.warn(f"Missing From Wikidata {r['wiki_id']} : {r['person_id']}", Unlisted)
-        extra_ind = []
-        [extra_ind.append(_) for _ in ind_wiki if _ not in test_file['wiki_id'].unique()]
+        missing_ind = test_file.loc[~test_file['wiki_id'].isin(ind_wiki) & ~test_file['person_id'].isin(ind_swerik),
+                                    ['wiki_id', 'person_id']]
+        for r in missing_ind.itertuples(index=False):
+            warnings.warn(f"Missing From Wikidata {r.wiki_id} : {r.person_id}", Unlisted)
+        extra_ind = pd.DataFrame({'wiki_id': ind_wiki[~pd.Index(ind_wiki).isin(test_file['wiki_id'])]})
         if len(extra_ind) > 0:
-            [warnings.warn(f"\n--> Missing from testfile {_}", Unlisted) for _ in extra_ind]
+            [warnings.warn(f"\n--> Missing from testfile {_}", Unlisted) for _ in extra_ind['wiki_id']]
             warnings.warn(f"\n\n\n~~ {len(extra_ind)} MPs currently listed as independent not in the testfile ({len(test_file)})\n", Info)
-            if config and config['write-unlisted-ind-testfile']:
-                extra_ind = [[_] for _ in extra_ind]
-                self.write_err_df("unlisted-ind-testfile", extra_ind, ["wiki_id"], config['test_out_dir'])
+        get_sink().add_frame(self.id(), "independent-mp", extra_ind, key=['wiki_id'],
+                             message="independent in Wikidata, not in the testfile",
+                             out_dir=issue_dir(config, 'write-unlisted-ind-testfile'))
         if len(missing_ind) > 0:
             warnings.warn(f"\n\n\n~~ {len(missing_ind)} MPs currently listed as independent in testfile do not appear as such in Wikidata\n", Info)
-            if config and config['write-unlisted-ind-wiki']:
-                self.write_err_df("unlisted-ind-wiki", missing_ind, ["wiki_id", "person_id"], config['test_out_dir'])
+        get_sink().add_frame(self.id(), "explicit_no_party", missing_ind, key=['person_id'],
+                             message="independent in the testfile, not in Wikidata",
+                             out_dir=issue_dir(config, 'write-unlisted-ind-wiki'))
         self.assertEqual(len(missing_ind), 0)
         #self.assertEqual(len(extra_ind), 0)
 
 
     #@unittest.skip
     def test_party(self):
+        get_scope().skip_if_unchanged(self, "party_affiliation")
         config = fetch_config("party-affiliation")
-        test_file = pd.read_csv("test/data/known-party-affiliation.csv", sep=';')
-        party_affiliation = pd.read_csv("data/party_affiliation.csv")
-
-        bad_affil = []
-        for i, r in test_file.iterrows():
-            if (pd.notnull(r['start']) or r['start'] == '') and \
-               (pd.notnull(r["end"]) or r['end'] == ''):
-                Q = party_affiliation.loc[
-                        (party_affiliation['person_id'] == r["person_id"]) &
-                        (party_affiliation['party_id'] == r['party_id']) &
-                        (party_affiliation['start'] == str(r['start'])[:4]) &
-                        (party_affiliation['end'] == str(r['end'])[:4])]
-            else:
-                Q = party_affiliation.loc[
-                        (party_affiliation['person_id'] == r["person_id"]) &
-                        (party_affiliation['party_id'] == r['party_id'])]
-            if len(Q) == 0:
-                bad_affil.append([r[_] for _ in test_file.columns])
-                warnings.warn(f"\n -> Not found in wikidata {'|'.join([str(r[_]) if pd.notnull(r[_]) else '' for _ in test_file.columns])}", Unlisted)
+        test_file = get_scope().restrict(read_csv("test/data/known-party-affiliation.csv", sep=';'))
+        party_affiliation = load_table("party_affiliation")
+
+        reconciled = reconcile(test_file, party_affiliation)
+        bad_affil = reconciled[reconciled['match'] != EXACT].drop(columns='affiliation')
+        for i, r in bad_affil.iterrows():
+            warnings.warn(f"\n -> Not found in wikidata ({r['match']}) {'|'.join([str(r[_]) if pd.notnull(r[_]) else '' for _ in test_file.columns])}", Unlisted)
         if len(bad_affil) > 0:
-            warnings.warn(f"\n\n\n~~ {len(bad_affil)} mismatches between wikidata and ({len(test_file)}) known party affiliations\n", Info)
-            if config and config["write-party-affil-err"]:
-                self.write_err_df("unmatched-party-affiliations", bad_affil, test_file.columns, config["test_out_dir"])
+            counts = ", ".join(f"{n} {m}" for m, n in bad_affil['match'].value_counts().items())
+            warnings.warn(f"\n\n\n~~ {len(bad_affil)} mismatches between wikidata and ({len(test_file)}) known party affiliations: {counts}\n", Info)
+        get_sink().add_frame(self.id(), "party_affiliation", bad_affil, key=["person_id", "party_id"],
+                             message="known party affiliation " + bad_affil['match'],
+                             out_dir=issue_dir(config, "write-party-affil-err"))
         self.assertEqual(len(bad_affil), 0)
 
 
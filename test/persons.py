@@ -0,0 +1,126 @@
+"""
+In-memory store of everyone in data/, one compact record per person.
+
+    store = PersonStore.load()
+    person = store["i-PFAPNmRqeUAaxDzNRTG1x1"]
+    person.born, person.names, person.mandates, person.parties
+
+Every table is read once. Rows of the per-person tables are grouped by
+person_id up front into tuples of namedtuples, so a lookup is a dict access
+and never touches pandas.
+"""
+from collections import namedtuple
+from .cache import load_table
+
+
+
+
+CHILD_TABLES = {
+    "names": "name",
+    "mandates": "member_of_parliament",
+    "parties": "party_affiliation",
+    "ministers": "minister",
+    "speakers": "speaker",
+    "locations": "location_specifier",
+    "identifiers": "external_identifiers",
+    "wiki_ids": "wiki_id",
+    "twitter": "twitter",
+    "portraits": "portraits",
+    "birthplaces": "place_of_birth",
+    "deathplaces": "place_of_death",
+    "sources": "described_by_source",
+    "references": "references_map",
+    "no_party": "explicit_no_party",
+}
+
+PERSON_COLUMNS = ["born", "dead", "gender", "riksdagen_id"]
+
+
+class Person:
+    """
+    One person: the person.csv columns plus a tuple of rows from each child table.
+
+    People who only occur in child tables have None for the person.csv columns.
+    """
+    __slots__ = ["person_id"] + PERSON_COLUMNS + list(CHILD_TABLES)
+
+    def __init__(self, person_id, born=None, dead=None, gender=None, riksdagen_id=None):
+        self.person_id = person_id
+        self.born = born
+        self.dead = dead
+        self.gender = gender
+        self.riksdagen_id = riksdagen_id
+        for attr in CHILD_TABLES:
+            setattr(self, attr, ())
+
+    def __repr__(self):
+        return f"Person({self.person_id!r}, born={self.born!r}, dead={self.dead!r})"
+
+
+def _records(df):
+    """
+    Yield (person_id, row) for every row of a table, missing values as None.
+    """
+    cols = [c for c in df.columns if c != "person_id"]
+    Row = namedtuple("Row", cols, rename=True)
+    df = df.astype(object).where(df.notna(), None)
+    for pid, *values in df[["person_id"] + cols].itertuples(index=False, name=None):
+        yield pid, Row(*values)
+
+
+class PersonStore:
+    """
+    Person records keyed on person_id.
+    """
+
+    def __init__(self, persons):
+        self.persons = persons
+
+    @classmethod
+    def load(cls, metadata_folder="data", tables=None):
+        """
+        Build the store from the csv files in metadata_folder.
+
+        `tables` restricts which child tables (keys of CHILD_TABLES) are loaded.
+        """
+        persons = {}
+        person = load_table("person", metadata_folder=metadata_folder)
+        for pid, row in _records(person):
+            persons[pid] = Person(pid, *(getattr(row, c) for c in PERSON_COLUMNS))
+
+        for attr in (tables if tables is not None else CHILD_TABLES):
+            df = load_table(CHILD_TABLES[attr], metadata_folder=metadata_folder)
+            df = df[df["person_id"].notna()]
+            grouped = {}
+            for pid, row in _records(df):
+                grouped.setdefault(pid, []).append(row)
+            for pid, rows in grouped.items():
+                p = persons.get(pid)
+                if p is None:
+                    p = persons[pid] = Person(pid)
+                setattr(p, attr, tuple(rows))
+        return cls(persons)
+
+    def __getitem__(self, person_id):
+        return self.persons[person_id]
+
+    def __contains__(self, person_id):
+        return person_id in self.persons
+
+    def __iter__(self):
+        return iter(self.persons.values())
+
+    def __len__(self):
+        return len(self.persons)
+
+    def get(self, person_id, default=None):
+        return self.persons.get(person_id, default)
+
+    def primary_name(self, person_id):
+        """
+        Return the person's primary name, or None.
+        """
+        for n in self.persons[person_id].names:
+            if n.primary_name in (True, "True"):
+                return n.name
+        return None
@@ -0,0 +1,58 @@
+"""
+Parse the protocol paths of test/data/session-dates.csv into their parts.
+
+    1867/prot-1867--ak--0118.xml        year 1867, chamber ak
+    1958/prot-1958-a-ak--017-01.xml     year 1958, specifier a, chamber ak, part 01
+    202122/prot-202122--097.xml         year 2021, chamber ek
+
+The whole column is parsed with one regular expression. Paths that don't follow
+the naming scheme are flagged invalid and their parts left empty. The parsed
+session dates are cached next to the csv's own cache entry (see cache.py) and
+only re-parsed when the file changes.
+"""
+from .cache import read_derived
+import pandas as pd
+
+
+
+
+PROTOCOL_PATTERN = (
+    r"^(?P<folder>\d{4}(?:\d{2}|\d{4})?)/prot-(?P=folder)"
+    r"-(?P<spec>[a-zåäö]+\d*)?"
+    r"-(?:(?P<chamber>ak|fk)--)?"
+    r"(?P<number>\d{3,4})(?:-(?P<part>\d{2}))?\.xml$"
+)
+
+CATEGORICAL = ["year", "spec", "parliament_year", "chamber"]
+
+
+def parse_protocols(paths):
+    """
+    Return a df aligned with paths: valid, year, spec, parliament_year, chamber, number, part.
+
+    year is the first four digits of the protocol's folder, parliament_year the
+    year followed by the specifier if any, chamber "ek" when the path names none.
+    The string fields are categoricals.
+    """
+    paths = pd.Series(paths, dtype=object)
+    parts = paths.str.extract(PROTOCOL_PATTERN)
+    out = pd.DataFrame(index=paths.index)
+    out["valid"] = parts["folder"].notna()
+    out["year"] = parts["folder"].str[:4]
+    out["spec"] = parts["spec"]
+    out["parliament_year"] = out["year"] + parts["spec"].fillna("")
+    out["chamber"] = parts["chamber"].where(parts["chamber"].notna() | ~out["valid"], "ek")
+    out["number"] = pd.to_numeric(parts["number"]).astype("Int64")
+    out["part"] = pd.to_numeric(parts["part"]).astype("Int64")
+    for col in CATEGORICAL:
+        out[col] = out[col].astype("category")
+    return out
+
+
+def load_session_dates(path="test/data/session-dates.csv"):
+    """
+    Return session-dates.csv with the parsed protocol fields as extra columns.
+    """
+    def build(dates):
+        return pd.concat([dates, parse_protocols(dates["protocol"])], axis=1)
+    return read_derived(path, "protocols-v1", build, sep=";")
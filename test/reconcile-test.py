@@ -0,0 +1,79 @@
+"""
+Test how curated party affiliations are classified against party_affiliation.csv.
+"""
+from .reconcile import CONTAINED, EXACT, MISSING, OVERLAPPING, reconcile
+import numpy as np
+import pandas as pd
+import unittest
+
+
+
+
+AFFILIATIONS = pd.DataFrame([
+    ["i-1", "Q1", "1920-03-01", "1928-06-30"],
+    ["i-1", "Q2", "1929", np.nan],
+    ["i-2", "Q1", np.nan, "1940-12-31"],
+], columns=["person_id", "party_id", "start", "end"])
+
+
+
+
+class Test(unittest.TestCase):
+
+    def match(self, *curated):
+        """
+        Return (match, affiliation) of each curated row (person_id, party_id, start, end).
+        """
+        df = pd.DataFrame(list(curated), columns=["person_id", "party_id", "start", "end"])
+        out = reconcile(df, AFFILIATIONS)
+        return list(zip(out["match"], out["affiliation"]))
+
+
+    def test_precision(self):
+        # a year agrees with any day in it, a day only with the same day
+        self.assertEqual(self.match(
+            ["i-1", "Q1", "1920", "1928"],
+            ["i-1", "Q1", "1920-03", "1928-06-30"],
+            ["i-1", "Q1", "1920-03-02", "1928-06-30"],
+            ["i-1", "Q1", "1920-02-29", "1928-06-30"],
+        ), [(EXACT, 0), (EXACT, 0), (CONTAINED, 0), (OVERLAPPING, 0)])
+
+
+    def test_open_ends(self):
+        # a missing affiliation date leaves it open on that side
+        self.assertEqual(self.match(
+            ["i-1", "Q2", "1930-01-01", "1990-12-31"],
+            ["i-1", "Q2", "1925-01-01", "1990-12-31"],
+            ["i-2", "Q1", "1880-01-01", "1940-12-31"],
+            ["i-2", "Q1", "1880-01-01", "1941-01-01"],
+        ), [(CONTAINED, 1), (OVERLAPPING, 1), (CONTAINED, 2), (OVERLAPPING, 2)])
+
+
+    def test_undated(self):
+        # undated curated rows only ask for the person and party to be affiliated at all
+        self.assertEqual(self.match(
+            ["i-1", "Q1", np.nan, np.nan],
+            ["i-1", "Q2", "1950-01-01", np.nan],
+            ["i-2", "Q2", np.nan, np.nan],
+        ), [(EXACT, 0), (EXACT, 1), (MISSING, -1)])
+
+
+    def test_no_candidate(self):
+        self.assertEqual(self.match(
+            ["i-1", "Q1", "1930-01-01", "1931-12-31"],
+            ["i-3", "Q1", "1920-03-01", "1928-06-30"],
+            [np.nan, "Q1", "1920-03-01", "1928-06-30"],
+        ), [(MISSING, -1), (MISSING, -1), (MISSING, -1)])
+
+
+    def test_best_candidate(self):
+        rows = pd.concat([AFFILIATIONS, AFFILIATIONS.iloc[[0]].assign(start="1910-01-01", end="1921-01-01")])
+        out = reconcile(pd.DataFrame([["i-1", "Q1", "1920-03-01", "1928-06-30"]],
+                                     columns=["person_id", "party_id", "start", "end"]), rows)
+        self.assertEqual((out["match"][0], out["affiliation"][0]), (EXACT, 0))
+
+
+
+
+if __name__ == '__main__':
+    unittest.main()
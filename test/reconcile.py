@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Reconcile curated party affiliations with party_affiliation.csv.
+
+    python -m test.reconcile test/data/known-party-affiliation.csv --sep ";" -o reconciled.csv
+
+    reconciled = reconcile(known, load_table("party_affiliation"))
+    reconciled["match"].value_counts()
+
+Every curated row (person_id, party_id, start, end) is classified against the
+affiliations of the same person and party:
+
+    exact        start and end agree, each at the coarser of the two precisions
+    contained    the curated period lies within the affiliation
+    overlapping  the periods share a day, but neither of the above
+    missing      no affiliation of that person and party shares a day
+
+A curated row without a start or end is exact if any affiliation of the person
+and party exists. Missing affiliation dates leave the affiliation open on that
+side. The best class over all of a row's candidates counts, and `affiliation`
+gives that candidate's row (-1 if missing).
+
+person_id and party_id are packed into one int64 key (see codes.py), the two
+tables are hash joined on it, and the candidates are classified with array
+comparisons on parsed dates (see dates.py), so the cost grows with the number
+of candidate pairs, not curated rows times affiliations.
+"""
+from .cache import load_table
+from .codes import pair_keys, PARTY, PERSON
+from .dates import DateColumn, MISSING as UNDATED, overlaps
+import argparse
+import numpy as np
+import pandas as pd
+
+
+
+
+MISSING, OVERLAPPING, CONTAINED, EXACT = "missing", "overlapping", "contained", "exact"
+
+MATCHES = [MISSING, OVERLAPPING, CONTAINED, EXACT]
+
+
+def _key(df):
+    return pair_keys(PERSON.encode(df["person_id"]), PARTY.encode(df["party_id"]))
+
+
+def _not_after(a, b):
+    """
+    True where a can't be later than b at the coarser of their precisions; missing values are open.
+    """
+    p = np.minimum(a.precision, b.precision)
+    return (p == UNDATED) | (a.key(p) <= b.key(p))
+
+
+def reconcile(curated, affiliations):
+    """
+    Return curated with the columns match (one of MATCHES) and affiliation (row position in affiliations, -1 if missing).
+    """
+    curated = curated.reset_index(drop=True)
+    left = pd.DataFrame({"key": _key(curated), "row": np.arange(len(curated))})
+    right = pd.DataFrame({"key": _key(affiliations), "affiliation": np.arange(len(affiliations))})
+    valid = (curated["person_id"].notna() & curated["party_id"].notna()).values
+    pairs = left[valid].merge(right[(affiliations["person_id"].notna() & affiliations["party_id"].notna()).values], on="key")
+    rows, cands = pairs["row"].values, pairs["affiliation"].values
+
+    start, end = DateColumn.parse(curated["start"]), DateColumn.parse(curated["end"])
+    a_start, a_end = DateColumn.parse(affiliations["start"]), DateColumn.parse(affiliations["end"])
+    s, e, cs, ce = start[rows], end[rows], a_start[cands], a_end[cands]
+    dated = (curated["start"].notna() & curated["end"].notna()).values[rows]
+
+    rank = np.zeros(len(pairs), dtype=np.int8)
+    overlap = overlaps(s, e, cs, ce)
+    rank[overlap] = MATCHES.index(OVERLAPPING)
+    rank[overlap & _not_after(cs, s) & _not_after(e, ce)] = MATCHES.index(CONTAINED)
+    rank[~dated | (s.same(cs) & e.same(ce))] = MATCHES.index(EXACT)
+
+    # best candidate per curated row: sort by row, then rank descending
+    order = np.lexsort((-rank, rows))
+    rows, cands, rank = rows[order], cands[order], rank[order]
+    first = np.concatenate([[True], rows[1:] != rows[:-1]]) if len(rows) else np.array([], dtype=bool)
+    best = np.zeros(len(curated), dtype=np.int8)
+    affiliation = np.full(len(curated), -1, dtype=np.int64)
+    best[rows[first]] = rank[first]
+    affiliation[rows[first]] = np.where(rank[first] > 0, cands[first], -1)
+
+    out = curated.copy()
+    out["match"] = np.array(MATCHES, dtype=object)[best]
+    out["affiliation"] = affiliation
+    return out
+
+
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("csv", help="curated affiliations: person_id, party_id, start, end")
+    parser.add_argument("--sep", default=",")
+    parser.add_argument("-o", "--out", help="output csv (default: counts per class only)")
+    parser.add_argument("--metadata-folder", default="data")
+    args = parser.parse_args()
+    curated = pd.read_csv(args.csv, sep=args.sep, dtype=str)
+    reconciled = reconcile(curated, load_table("party_affiliation", metadata_folder=args.metadata_folder))
+    counts = reconciled["match"].value_counts()
+    for match in reversed(MATCHES):
+        print(f"{counts.get(match, 0):8} {match}")
+    if args.out:
+        reconciled.to_csv(args.out, sep=args.sep, index=False)
@@ -0,0 +1,215 @@
+"""
+Who sits in the Riksdag on a given date.
+
+    roster = Roster.load()
+    roster.at("1925-03-02", chamber="ak")
+    roster.sitting("1925-03-02")["party_id"]
+    roster.count_at(dates, chamber="fk")
+
+Mandates, party affiliations, chair_mp seats and speaker/minister roles are
+turned into day-number intervals once and put in prebuilt indexes, so a single
+date is a binary search and a batch of dates is one vectorized call. A date
+string covers the days it names ("1867" is the whole year), start and end are
+both inclusive.
+"""
+from .cache import load_table
+from .codes import CHAIR, PARTY, PERSON
+from .dates import DateColumn
+from .intervals import (
+    KeyedIntervals,
+    merge_intervals,
+    OPEN_END,
+    SegmentIndex,
+    to_days,
+)
+from .overlap import resolve_chair_intervals
+import numpy as np
+import pandas as pd
+
+
+
+
+CHAMBERS = {
+    "förstakammarledamot": "fk",
+    "andrakammarledamot": "ak",
+    "ledamot": "ek",
+}
+
+
+def day_intervals(df, start="start", end="end"):
+    """
+    Return half-open day-number bounds [lo, hi) of the start and end date strings of df.
+
+    Missing starts give an empty interval, missing ends an open one.
+    """
+    start = DateColumn.parse(df[start])
+    lo = start.lower(missing=OPEN_END)
+    hi = DateColumn.parse(df[end]).upper() + 1
+    return lo, np.where(start.missing, lo, hi)
+
+
+def to_query_days(dates):
+    """
+    Return a date or a sequence of dates as int64 day numbers.
+    """
+    if np.ndim(dates) == 0:
+        # numpy parses ISO dates and date objects a lot faster than pandas
+        try:
+            day = np.datetime64(dates, "D")
+        except (TypeError, ValueError):
+            day = np.datetime64("NaT")
+        if not np.isnat(day):
+            return day.astype(np.int64)
+        return to_days(pd.to_datetime([dates]))[0]
+    return to_days(pd.to_datetime(pd.Series(dates)))
+
+
+class Roster:
+    """
+    Interval indexes over the sitting MPs and their party, seat and roles.
+    """
+
+    def __init__(self, mandates, parties, seats, roles):
+        self.mandates = mandates.reset_index(drop=True)
+        self.parties = parties.reset_index(drop=True)
+        self.seats = seats.reset_index(drop=True)
+        self.roles = roles.reset_index(drop=True)
+
+        for df in [self.mandates, self.parties, self.seats]:
+            df["code"] = PERSON.encode(df["person_id"])
+        self.person_ids = PERSON.ids
+
+        # a person's overlapping mandates are merged so every index hit is a distinct person
+        self.index = {}
+        self.index_codes = {}
+        for chamber in [None] + list(self.mandates["chamber"].dropna().unique()):
+            df = self.mandates if chamber is None else self.mandates[self.mandates["chamber"] == chamber]
+            merged = merge_intervals(df["code"], df["lo"], df["hi"])
+            self.index[chamber] = SegmentIndex(merged["start"], merged["end"])
+            self.index_codes[chamber] = merged["key"].values.astype(np.int64)
+        self.mandate_index = KeyedIntervals(self.mandates["code"], self.mandates["lo"], self.mandates["hi"])
+        self.party_index = KeyedIntervals(self.parties["code"], self.parties["lo"], self.parties["hi"])
+        self.seat_index = KeyedIntervals(self.seats["code"], self.seats["lo"], self.seats["hi"])
+        self.role_index = SegmentIndex(self.roles["lo"], self.roles["hi"])
+        self.party_codes = PARTY.encode(self.parties["party_id"])
+        self.party_ids = PARTY.ids
+        self.chair_codes = CHAIR.encode(self.seats["chair_id"])
+        self.chair_ids = CHAIR.ids
+
+        # the columns `at` hands out, with a trailing None that lookup misses (-1) index
+        self.columns = {}
+        for df, cols in [(self.mandates, ["chamber", "district"]),
+                         (self.parties, ["party", "party_id"]),
+                         (self.seats, ["chair_id", "chair_nr"])]:
+            for col in cols:
+                self.columns[col] = np.append(df[col].values.astype(object), None)
+        self.role_persons = self.roles["person_id"].values.astype(object)
+        # person codes rank by person_id, so sitting MPs sort without comparing strings
+        self.person_rank = np.empty(len(self.person_ids), dtype=np.int64)
+        self.person_rank[np.argsort(self.person_ids, kind="stable")] = np.arange(len(self.person_ids))
+        self.role_names = self.roles["role"].values.astype(object)
+
+    @classmethod
+    def load(cls, metadata_folder="data"):
+        """
+        Build the roster from the csv files in metadata_folder.
+        """
+        mep = load_table("member_of_parliament", metadata_folder=metadata_folder)
+        mandates = mep[["person_id", "district", "role"]].copy()
+        mandates["chamber"] = mep["role"].map(CHAMBERS)
+        mandates["lo"], mandates["hi"] = day_intervals(mep)
+
+        pa = load_table("party_affiliation", metadata_folder=metadata_folder)
+        parties = pa[["person_id", "party", "party_id"]].copy()
+        parties["lo"], parties["hi"] = day_intervals(pa)
+        # undated affiliations hold whenever the person sits
+        undated = pa["start"].isna() & pa["end"].isna()
+        parties.loc[undated.values, "lo"] = -OPEN_END
+        parties.loc[undated.values, "hi"] = OPEN_END
+        parties = parties[parties["person_id"].notna()]
+
+        chairs = load_table("chairs", metadata_folder=metadata_folder)
+        seats = resolve_chair_intervals(
+            load_table("chair_mp", metadata_folder=metadata_folder),
+            chairs,
+            mep,
+            load_table("riksdag-year", metadata_folder=metadata_folder))
+        seats = seats.merge(chairs[["chair_id", "chair_nr"]], on="chair_id", how="left")
+        seats = seats[["person_id", "chair_id", "chair_nr", "parliament_year"]].assign(
+            lo=to_days(seats["start"]),
+            hi=to_days(seats["end"]) + 1)
+
+        frames = []
+        for table in ["speaker", "minister"]:
+            df = load_table(table, metadata_folder=metadata_folder)
+            roles = df[["person_id", "role"]].copy()
+            roles["lo"], roles["hi"] = day_intervals(df)
+            frames.append(roles)
+        roles = pd.concat(frames, ignore_index=True)
+        return cls(mandates, parties, seats, roles)
+
+    def sitting(self, date, chamber=None):
+        """
+        Return {column: array} of the MPs sitting on a date, the columns of `at`.
+
+        Plain arrays and no df, so a lookup takes well under a millisecond.
+        """
+        day = to_query_days(date)
+        codes = self.index_codes[chamber][self.index[chamber].at(day)]
+        codes = codes[np.argsort(self.person_rank[codes], kind="stable")]
+        person_ids = self.person_ids[codes]
+        days = np.full(len(codes), day)
+        rows = {
+            "chamber": self.mandate_index.lookup(codes, days),
+            "party": self.party_index.lookup(codes, days),
+            "chair": self.seat_index.lookup(codes, days),
+        }
+        out = {"person_id": person_ids}
+        for col, row in [("chamber", "chamber"), ("district", "chamber"), ("party", "party"),
+                         ("party_id", "party"), ("chair_id", "chair"), ("chair_nr", "chair")]:
+            out[col] = self.columns[col][rows[row]]
+        # a handful of roles on any day: a dict beats a groupby
+        roles = {}
+        for i in self.role_index.at(day).tolist():
+            held = roles.setdefault(self.role_persons[i], [])
+            if self.role_names[i] not in held:
+                held.append(self.role_names[i])
+        out["roles"] = np.full(len(codes), None, dtype=object)
+        if roles:
+            found = np.flatnonzero(np.isin(person_ids, list(roles)))
+            out["roles"][found] = [", ".join(roles[p]) for p in person_ids[found].tolist()]
+        return out
+
+    def at(self, date, chamber=None):
+        """
+        Return a df of the MPs sitting on a date, one row per person, with
+        chamber, district, party, seat and any speaker or minister roles.
+        """
+        return pd.DataFrame(self.sitting(date, chamber))
+
+    def at_many(self, dates, chamber=None):
+        """
+        Return a df of (date position, person_id, party_id, chair_id) for every
+        MP sitting on any of the dates, in one vectorized pass.
+
+        The id columns are categoricals, a batch of 100k dates is ~35M rows.
+        """
+        days = to_query_days(dates)
+        pos, ids = self.index[chamber].at_many(days)
+        codes = self.index_codes[chamber][ids]
+        party = self.party_index.lookup(codes, days[pos])
+        seat = self.seat_index.lookup(codes, days[pos])
+        return pd.DataFrame({
+            "date": pos,
+            "person_id": pd.Categorical.from_codes(codes, self.person_ids),
+            "party_id": pd.Categorical.from_codes(
+                np.where(party >= 0, self.party_codes[party], -1), self.party_ids),
+            "chair_id": pd.Categorical.from_codes(
+                np.where(seat >= 0, self.chair_codes[seat], -1), self.chair_ids),
+        })
+
+    def count_at(self, dates, chamber=None):
+        """
+        Return the number of MPs sitting on each date.
+        """
+        return self.index[chamber].count(to_query_days(dates))
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Run the integrity suite in parallel and print one merged report.
+
+    python -m test.run                       # all modules, one worker per core
+    python -m test.run test.db test.chairs -j 4 --json report.json --csv checks.csv
+
+The data/ tables are loaded once up front, into cache.py's in-process memo
+and its feather cache. Workers are forked from the loaded process, so they
+inherit the parsed frames instead of parsing csv; every load_table in a worker
+hands out its own copy of the inherited frame. Only what wasn't loaded up
+front, or everything where processes can't fork, is read from the cache
+files. Every test method is a separate job.
+Warnings, prints and failures are collected per test and merged into the
+report, with the measurements of instrument.py.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+from pathlib import Path
+from .cache import load_table
+from .instrument import commit, probe, write_reports
+import argparse
+import io
+import json
+import multiprocessing as mp
+import os
+import sys
+import time
+import traceback
+import unittest
+import warnings
+
+
+
+
+MODULES = [
+    "test.db",
+    "test.chairs",
+    "test.mandates",
+    "test.party-affiliation",
+    "test.mp-frequency-test",
+]
+
+
+def warm_cache(metadata_folder="data"):
+    """
+    Parse every table in metadata_folder once so workers inherit it, or find it in the cache files.
+    """
+    for path in sorted(Path(metadata_folder).glob("*.csv")):
+        load_table(path.stem, metadata_folder=metadata_folder)
+
+
+def collect(modules):
+    """
+    Return the ids of all test methods in the modules.
+    """
+    loader = unittest.TestLoader()
+    ids = []
+    def _walk(suite):
+        for t in suite:
+            if isinstance(t, unittest.TestSuite):
+                _walk(t)
+            else:
+                ids.append(t.id())
+    for m in modules:
+        _walk(loader.loadTestsFromName(m))
+    return ids
+
+
+class _Result(unittest.TestResult):
+
+    def __init__(self):
+        super().__init__()
+        self.status = "ok"
+        self.message = ""
+
+    def addFailure(self, test, err):
+        self.status, self.message = "fail", "".join(traceback.format_exception_only(*err[:2])).strip()
+
+    def addError(self, test, err):
+        self.status, self.message = "error", "".join(traceback.format_exception(*err)).strip()
+
+    def addSkip(self, test, reason):
+        self.status, self.message = "skip", reason
+
+
+def run_one(test_id):
+    """
+    Run a single test method and return its result as a dict.
+    """
+    test = unittest.TestLoader().loadTestsFromName(test_id)
+    result = _Result()
+    out = io.StringIO()
+    with warnings.catch_warnings(record=True) as caught, redirect_stdout(out), probe() as record:
+        warnings.simplefilter("always")
+        test.run(result)
+    return {
+        "test": test_id,
+        "status": result.status,
+        "message": result.message,
+        **record,
+        "warnings": [{"category": w.category.__name__, "message": str(w.message)} for w in caught],
+        "stdout": out.getvalue(),
+    }
+
+
+def run(modules=MODULES, jobs=None):
+    """
+    Run all tests of the modules across `jobs` processes, return the list of results.
+    """
+    warm_cache()
+    ids = collect(modules)
+    ctx = mp.get_context("fork") if "fork" in mp.get_all_start_methods() else None
+    with ProcessPoolExecutor(max_workers=jobs or os.cpu_count(), mp_context=ctx) as pool:
+        return list(pool.map(run_one, ids))
+
+
+def report(results, wall):
+    """
+    Print the merged results.
+    """
+    for r in results:
+        for w in r["warnings"]:
+            print(f"--> {r['test']}: {w['category']}: {w['message'].strip()}")
+    print()
+    for r in results:
+        print(f"{r['status']:>5}  {r['seconds']:8.2f}s  {r['test']}")
+        if r["status"] in ("fail", "error"):
+            print("\n".join(f"        {_}" for _ in r["message"].splitlines()))
+    counts = {s: sum(r["status"] == s for r in results) for s in ["ok", "fail", "error", "skip"]}
+    serial = sum(r["seconds"] for r in results)
+    print(f"\n{len(results)} tests in {wall:.1f}s ({serial:.1f}s serial): "
+          + ", ".join(f"{v} {k}" for k, v in counts.items()))
+
+
+def main(args):
+    start = time.perf_counter()
+    results = run(args.modules or MODULES, args.jobs)
+    wall = time.perf_counter() - start
+    report(results, wall)
+    if args.json:
+        with open(args.json, "w") as o:
+            json.dump({"commit": commit(), "seconds": round(wall, 3), "results": results}, o, indent=2, ensure_ascii=False)
+    if args.csv:
+        write_reports(results, csv_path=args.csv)
+    return int(any(r["status"] in ("fail", "error") for r in results))
+
+
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("modules", nargs="*", help="test modules to run (default: the whole suite)")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="worker processes (default: cpu count)")
+    parser.add_argument("--json", default=None, help="also write the merged report to this file")
+    parser.add_argument("--csv", default=None, help="also write per-test timings, memory, rows and issues to this file")
+    args = parser.parse_args()
+    sys.exit(main(args))
@@ -0,0 +1,163 @@
+"""
+Machine-readable schema of the tables in data/.
+
+Every table lists its columns with a type, its primary key, other column sets
+that must be unique, required columns, allowed values and foreign keys. The
+README's table descriptions and this registry describe the same thing; the
+registry is what `python -m test.constraints` enforces.
+"""
+from collections import namedtuple
+
+
+
+
+DATE = r"\d{4}(?:-\d{2}(?:-\d{2})?)?"
+
+# regex a non-empty value of each type must fully match (None: anything goes)
+TYPES = {
+    "person_id": r"i-[1-9A-HJ-NP-Za-km-z]{20,22}",
+    "chair_id": r"[0-9a-f]{32}",
+    "qid": r"Q\d+",
+    "date": DATE,
+    "int": r"\d+",
+    "bool": r"True|False",
+    "url": r"https?://\S+",
+    "str": None,
+}
+
+CHAMBER = {"ak", "fk", "ek"}
+
+
+class Table(namedtuple("Table", ["columns", "key", "unique", "required", "allowed", "references"])):
+    """
+    columns: {column: type}; key: primary key columns or None; unique: other
+    column lists that must be unique ("*" for the full row); required: columns
+    that may not be empty; allowed: {column: set of values}; references:
+    {column: (table, column)} foreign keys.
+    """
+
+    def formats(self):
+        return {c: TYPES[t] for c, t in self.columns.items() if TYPES[t] is not None}
+
+
+def table(columns, key=None, unique=(), required=(), allowed=None, references=None):
+    return Table(columns, key, list(unique), list(required), allowed or {}, references or {})
+
+
+PERSON_FK = {"person_id": ("person", "person_id")}
+
+SCHEMA = {
+    "chair_mp": table(
+        {"chair_id": "chair_id", "parliament_year": "int", "start": "date", "end": "date", "person_id": "person_id"},
+        required=["chair_id", "parliament_year"],
+        references={
+            "chair_id": ("chairs", "chair_id"),
+            "parliament_year": ("riksdag-year", "parliament_year"),
+            **PERSON_FK}),
+    "chairs": table(
+        {"chair_id": "chair_id", "chamber": "str", "chair_nr": "int"},
+        key=["chair_id"],
+        unique=[["chamber", "chair_nr"]],
+        required=["chamber", "chair_nr"],
+        allowed={"chamber": CHAMBER}),
+    "described_by_source": table(
+        {"person_id": "person_id", "source": "url", "volume": "str"},
+        required=["person_id", "source"],
+        references=PERSON_FK),
+    "explicit_no_party": table(
+        {"person_id": "person_id", "wiki_id": "qid", "pages": "str", "ref": "url", "vol": "str"},
+        required=["person_id"],
+        references=PERSON_FK),
+    "external_identifiers": table(
+        {"person_id": "person_id", "authority": "str", "identifier": "str"},
+        unique=["*"],
+        required=["person_id", "authority", "identifier"],
+        allowed={"authority": {"WiDaID", "RiPeID", "SwePaPeGUID", "SwePoArID", "DiSweNaBiID", "UpUnAlID"}},
+        references=PERSON_FK),
+    "government": table(
+        {"start": "date", "end": "date", "government": "str", "government_id": "qid"},
+        key=["government_id"],
+        unique=[["start", "end"], ["government"]],
+        required=["start", "government", "government_id"]),
+    "location_specifier": table(
+        {"person_id": "person_id", "location": "str"},
+        unique=["*"],
+        required=["person_id", "location"],
+        references=PERSON_FK),
+    "member_of_parliament": table(
+        {"person_id": "person_id", "start": "date", "end": "date", "district": "str", "role": "str"},
+        unique=[["person_id", "start", "end"]],
+        required=["person_id", "role"],
+        allowed={"role": {"förstakammarledamot", "andrakammarledamot", "ledamot"}},
+        references=PERSON_FK),
+    "minister": table(
+        {"person_id": "person_id", "start": "date", "end": "date", "government": "str", "role": "str"},
+        unique=["*"],
+        required=["person_id", "government", "role"],
+        references={"government": ("government", "government"), **PERSON_FK}),
+    "name": table(
+        {"person_id": "person_id", "name": "str", "primary_name": "bool"},
+        unique=["*"],
+        required=["person_id", "name", "primary_name"],
+        references=PERSON_FK),
+    "party_abbreviation": table(
+        {"party": "str", "abbreviation": "str", "ocr_correction": "bool"},
+        key=["party"],
+        required=["party", "abbreviation"]),
+    "party_affiliation": table(
+        {"person_id": "person_id", "start": "date", "end": "date", "party": "str", "party_id": "qid"},
+        unique=["*"],
+        required=["person_id"],
+        references=PERSON_FK),
+    "person": table(
+        {"person_id": "person_id", "born": "date", "dead": "date", "gender": "str", "riksdagen_id": "str"},
+        key=["person_id"],
+        allowed={"gender": {"man", "woman", ""}}),
+    "place_of_birth": table(
+        {"person_id": "person_id", "link": "url", "place": "str"},
+        unique=["*"],
+        required=["person_id"],
+        references=PERSON_FK),
+    "place_of_death": table(
+        {"person_id": "person_id", "link": "url", "place": "str"},
+        unique=["*"],
+        required=["person_id"],
+        references=PERSON_FK),
+    "portraits": table(
+        {"person_id": "person_id", "portrait": "url"},
+        unique=["*"],
+        required=["person_id", "portrait"],
+        references=PERSON_FK),
+    "references_map": table(
+        {"person_id": "person_id", "bibtex_key": "str", "wiki_id": "qid", "page": "int"},
+        required=["person_id", "bibtex_key"],
+        references=PERSON_FK),
+    "riksdag-year": table(
+        {"parliament_year": "int", "specifier": "str", "chamber": "str", "start": "date", "end": "date"},
+        unique=[["chamber", "start"]],
+        required=["parliament_year", "chamber", "start", "end"],
+        allowed={"chamber": CHAMBER}),
+    "speaker": table(
+        {"person_id": "person_id", "start": "date", "end": "date", "role": "str"},
+        unique=["*"],
+        required=["person_id", "role"],
+        references=PERSON_FK),
+    "twitter": table(
+        {"person_id": "person_id", "twitter": "str"},
+        unique=["*"],
+        required=["person_id", "twitter"],
+        references=PERSON_FK),
+    "wiki_id": table(
+        {"person_id": "person_id", "wiki_id": "qid"},
+        key=["person_id"],
+        unique=[["wiki_id"]],
+        required=["person_id", "wiki_id"],
+        references=PERSON_FK),
+}
+
+
+def referenced_keys(tables=SCHEMA):
+    """
+    Return the set of (table, column) pairs some foreign key points at.
+    """
+    return {target for t in tables.values() for target in t.references.values()}
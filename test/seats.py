@@ -0,0 +1,222 @@
+"""
+Who sits in which chair, per parliament year, as a dense matrix.
+
+    seats = Occupancy.load()
+    seats.at(1925, "009a4e39332248c6b9bdd160ab529963")   # [Segment(person_id, start, end), ...]
+    seats.seat(1925, "ak", 17)
+    seats.empty_chairs(), seats.coverage()
+    seats.save("seats.npz"); Occupancy.read("seats.npz")
+    expected_chairs(chairs, load_chair_ranges(), years)
+
+chair_mp.csv is laid out once as a (parliament_year x chair) grid. Each cell
+holds the number of chair_mp rows for the chair in that year (0: the chair
+isn't in use), how many of them have an occupant, and the first occupant's
+person code. The cell's rows themselves, one per tenure with its start and end
+day, are stored flat and sorted by cell, with an offset per cell. A seat
+lookup is two dict accesses and a slice. Year-wide statistics are reductions
+over the grid's rows.
+
+Which chairs exist in which years is data, not code: test/data/chair-ranges.csv
+gives every chamber's chair numbers per period. A chamber growing or shrinking
+is a new row there. test/data/unmapped-years.csv counts the empty chairs of
+the years whose chair_mp mapping is incomplete (1918-1924).
+"""
+from collections import namedtuple
+from .cache import load_table
+from .codes import MISSING, PERSON
+from .dates import DateColumn, OPEN_END
+import numpy as np
+import pandas as pd
+
+
+
+
+Segment = namedtuple("Segment", ["person_id", "start", "end"])
+
+CHAIR_RANGES = "test/data/chair-ranges.csv"
+
+UNMAPPED_YEARS = "test/data/unmapped-years.csv"
+
+ARRAYS = ["years", "chair_ids", "chamber", "chair_nr", "offsets", "person_ids", "lo", "hi"]
+
+
+def _day(day):
+    return None if abs(day) == OPEN_END else np.datetime64(int(day), "D")
+
+
+def start_year(parliament_year):
+    """
+    Return the calendar year a parliament year starts in: 1975 -> 1975, 197576 -> 1975.
+    """
+    py = np.asarray(parliament_year, dtype=np.int64)
+    return np.where(py >= 10000, py // 100, py)
+
+
+def load_chair_ranges(path=CHAIR_RANGES):
+    """
+    Return the chair-range rules: chamber, from_year, to_year (inclusive, open if empty), first_chair, last_chair.
+    """
+    rules = pd.read_csv(path)
+    rules["to_year"] = rules["to_year"].fillna(9999).astype(np.int64)
+    return rules
+
+
+def load_unmapped_years(path=UNMAPPED_YEARS):
+    """
+    Return the number of empty chairs per year (as start_year gives them) whose chairs aren't all mapped to MPs yet.
+    """
+    df = pd.read_csv(path)
+    return pd.Series(df["empty_chairs"].astype(np.int64).values, index=df["year"].astype(np.int64).values).sort_index()
+
+
+def expected_chairs(chairs, rules, years):
+    """
+    Return a df of (parliament_year, chair_id) of every chair the rules say exists in each of the years.
+    """
+    years = pd.DataFrame({"parliament_year": np.unique(years)})
+    years["year"] = start_year(years["parliament_year"])
+    ranged = rules.merge(chairs[["chair_id", "chamber", "chair_nr"]], on="chamber")
+    ranged = ranged[(ranged["chair_nr"] >= ranged["first_chair"]) & (ranged["chair_nr"] <= ranged["last_chair"])]
+    out = years.merge(ranged, how="cross")
+    out = out[(out["year"] >= out["from_year"]) & (out["year"] <= out["to_year"])]
+    return out[["parliament_year", "chair_id"]].drop_duplicates(ignore_index=True)
+
+
+class Occupancy:
+    """
+    Dense (parliament_year x chair) counts and occupants, plus every cell's tenure segments.
+
+    A segment's lo and hi are inclusive day numbers, -OPEN_END and OPEN_END
+    where chair_mp has no start or end.
+    """
+
+    def __init__(self, years, chair_ids, chamber, chair_nr, offsets, person_ids, lo, hi):
+        self.years = np.asarray(years, dtype=np.int64)
+        self.chair_ids = np.asarray(chair_ids, dtype=object)
+        self.chamber = np.asarray(chamber, dtype=object)
+        self.chair_nr = np.asarray(chair_nr, dtype=np.int64)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.person = PERSON.encode(pd.Series(person_ids, dtype=object).replace("", None))
+        self.lo = np.asarray(lo, dtype=np.int64)
+        self.hi = np.asarray(hi, dtype=np.int64)
+
+        self.year_index = {int(y): i for i, y in enumerate(self.years)}
+        self.chair_index = {c: j for j, c in enumerate(self.chair_ids)}
+        self.nr_index = {(ch, int(nr)): j for j, (ch, nr) in enumerate(zip(self.chamber, self.chair_nr))}
+
+        shape = (len(self.years), len(self.chair_ids))
+        cells = np.repeat(np.arange(len(self.offsets) - 1), np.diff(self.offsets))
+        occupied = self.person != MISSING
+        self.rows = np.diff(self.offsets).reshape(shape)
+        self.filled = np.bincount(cells[occupied], minlength=shape[0] * shape[1]).reshape(shape)
+        occupant = np.full(shape[0] * shape[1], MISSING, dtype=np.int32)
+        first_cells, first = np.unique(cells[occupied], return_index=True)
+        occupant[first_cells] = self.person[occupied][first]
+        self.occupant = occupant.reshape(shape)
+
+    @classmethod
+    def build(cls, chairs, chair_mp):
+        """
+        Lay out chair_mp (any subset of it) over the chairs in chairs.csv.
+
+        Chairs only found in chair_mp get their own columns, without chamber and number.
+        """
+        extra = pd.Index(chair_mp["chair_id"].unique()).difference(chairs["chair_id"])
+        chair_ids = pd.Index(chairs["chair_id"]).append(extra)
+        chamber = list(chairs["chamber"]) + [None] * len(extra)
+        chair_nr = list(chairs["chair_nr"].fillna(-1).astype(np.int64)) + [-1] * len(extra)
+        years = np.sort(chair_mp["parliament_year"].unique())
+
+        lo = DateColumn.parse(chair_mp["start"]).lower()
+        hi = DateColumn.parse(chair_mp["end"]).upper()
+        cell = np.searchsorted(years, chair_mp["parliament_year"].values) * len(chair_ids)
+        cell = cell + chair_ids.get_indexer(chair_mp["chair_id"])
+        order = np.lexsort((hi, lo, cell))
+        offsets = np.searchsorted(cell[order], np.arange(len(years) * len(chair_ids) + 1))
+        person_ids = chair_mp["person_id"].values[order]
+        return cls(years, chair_ids, chamber, chair_nr, offsets, person_ids, lo[order], hi[order])
+
+    @classmethod
+    def load(cls, metadata_folder="data"):
+        """
+        Build the occupancy from chairs.csv and chair_mp.csv in metadata_folder.
+        """
+        return cls.build(
+            load_table("chairs", metadata_folder=metadata_folder),
+            load_table("chair_mp", metadata_folder=metadata_folder))
+
+    def save(self, path):
+        """
+        Persist the occupancy as an .npz file; ids are stored as strings, not as process-local codes.
+        """
+        arrays = {name: getattr(self, name) for name in ARRAYS if name != "person_ids"}
+        arrays["person_ids"] = PERSON.decode(self.person)
+        for name in ["chair_ids", "chamber", "person_ids"]:
+            arrays[name] = np.array([v or "" for v in arrays[name]], dtype=str)
+        np.savez_compressed(path, **arrays)
+
+    @classmethod
+    def read(cls, path):
+        """
+        Load an occupancy written by save.
+        """
+        with np.load(path) as f:
+            arrays = {name: f[name] for name in ARRAYS}
+        arrays["chamber"] = [c or None for c in arrays["chamber"]]
+        return cls(**arrays)
+
+    def _segments(self, i, j):
+        cell = i * len(self.chair_ids) + j
+        lo, hi = self.offsets[cell], self.offsets[cell + 1]
+        return [Segment(PERSON.ids[p] if p != MISSING else None, _day(s), _day(e))
+                for p, s, e in zip(self.person[lo:hi], self.lo[lo:hi], self.hi[lo:hi])]
+
+    def at(self, year, chair_id):
+        """
+        Return the chair's tenure segments in the parliament year, [] if it isn't in use.
+        """
+        i, j = self.year_index.get(int(year)), self.chair_index.get(chair_id)
+        if i is None or j is None:
+            return []
+        return self._segments(i, j)
+
+    def seat(self, year, chamber, chair_nr):
+        """
+        Return the tenure segments of a chair given by chamber and number.
+        """
+        j = self.nr_index.get((chamber, int(chair_nr)))
+        return [] if j is None else self.at(year, self.chair_ids[j])
+
+    def empty(self):
+        """
+        Boolean (year x chair) matrix of chairs in use that nobody occupies.
+        """
+        return (self.rows > 0) & (self.filled == 0)
+
+    def empty_chairs(self):
+        """
+        Return a df of (parliament_year, chair_id) of every empty chair.
+        """
+        i, j = np.nonzero(self.empty())
+        return pd.DataFrame({"parliament_year": self.years[i], "chair_id": self.chair_ids[j]})
+
+    def coverage(self):
+        """
+        Return a df per parliament year and chamber of the chairs in use, filled and empty, and the share filled.
+        """
+        used = self.rows > 0
+        filled = used & (self.filled > 0)
+        chambers = pd.Series(self.chamber).fillna("").values
+        frames = []
+        for chamber in np.unique(chambers):
+            cols = chambers == chamber
+            frames.append(pd.DataFrame({
+                "parliament_year": self.years,
+                "chamber": chamber or None,
+                "chairs": used[:, cols].sum(axis=1),
+                "filled": filled[:, cols].sum(axis=1)}))
+        out = pd.concat(frames, ignore_index=True)
+        out = out[out["chairs"] > 0]
+        out["empty"] = out["chairs"] - out["filled"]
+        out["share"] = out["filled"] / out["chairs"]
+        return out.sort_values(["parliament_year", "chamber"], ignore_index=True)
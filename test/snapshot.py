@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Build and map a binary snapshot of data/: one uncompressed Arrow IPC (feather
+v2) file per table, plus a manifest.
+
+    python -m test.snapshot snapshot/                  # build from data/
+    python -m test.snapshot snapshot/ --verify         # check it against data/
+
+    snap = Snapshot("snapshot")
+    snap.table("member_of_parliament")                 # pyarrow.Table, memory-mapped
+    snap.df("member_of_parliament")                    # pandas, categoricals for repeated strings
+
+Columns are typed from schema.py. Strings repeated in at least every other
+row are dictionary encoded, ints and bools get their own types, and every date
+column keeps its text next to `<col>_lo` and `<col>_hi` (date32, first and
+last day the value covers) and `<col>_precision` (see dates.py). Empty cells
+are null.
+
+The files are uncompressed, so opening one maps it and reads no data: the
+table's buffers point into the page cache, and start-up costs no parsing.
+"""
+from pathlib import Path
+from .dates import DateColumn
+from .schema import SCHEMA
+import argparse
+import hashlib
+import json
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+import sys
+
+
+
+
+FORMAT = 1
+
+MANIFEST = "manifest.json"
+
+
+def file_hash(path):
+    """
+    Return the sha1 of a file's contents.
+    """
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _strings(values):
+    arr = pa.array(values.where(values != "", None), type=pa.string())
+    if arr.null_count < len(arr) and len(values.unique()) * 2 <= len(values):
+        return arr.dictionary_encode()
+    return arr
+
+
+def to_arrow(df, table):
+    """
+    Return a csv read with dtype=str and keep_default_na=False as a typed pyarrow.Table.
+    """
+    columns = {}
+    for col in df.columns:
+        values = df[col]
+        kind = table.columns.get(col, "str") if table is not None else "str"
+        if kind == "int":
+            columns[col] = pa.array(pd.to_numeric(values.where(values != "")).astype("Int64"), type=pa.int64())
+        elif kind == "bool":
+            columns[col] = pa.array(values.map({"True": True, "False": False}), type=pa.bool_())
+        elif kind == "date":
+            columns[col] = _strings(values)
+            dates = DateColumn.parse(values.where(values != ""))
+            missing = dates.missing
+            columns[f"{col}_lo"] = pa.array(dates.lo.astype("int32"), type=pa.int32(), mask=missing).cast(pa.date32())
+            columns[f"{col}_hi"] = pa.array(dates.hi.astype("int32"), type=pa.int32(), mask=missing).cast(pa.date32())
+            columns[f"{col}_precision"] = pa.array(dates.precision, type=pa.int8())
+        else:
+            columns[col] = _strings(values)
+    return pa.table(columns)
+
+
+def build(out, metadata_folder="data"):
+    """
+    Write a snapshot of every csv in metadata_folder to out and return its manifest.
+    """
+    out = Path(out)
+    out.mkdir(parents=True, exist_ok=True)
+    manifest = {"format": FORMAT, "tables": {}}
+    for path in sorted(Path(metadata_folder).glob("*.csv")):
+        df = pd.read_csv(path, dtype=str, keep_default_na=False)
+        table = to_arrow(df, SCHEMA.get(path.stem))
+        feather.write_feather(table, out / f"{path.stem}.arrow", compression="uncompressed")
+        manifest["tables"][path.stem] = {"rows": table.num_rows, "source": file_hash(path)}
+    with open(out / MANIFEST, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+class Snapshot:
+    """
+    Memory-mapped access to the tables of a snapshot.
+    """
+
+    def __init__(self, folder="snapshot"):
+        self.folder = Path(folder)
+        with open(self.folder / MANIFEST) as f:
+            self.manifest = json.load(f)
+        if self.manifest["format"] != FORMAT:
+            raise ValueError(f"{self.folder}: snapshot format {self.manifest['format']}, expected {FORMAT}")
+        self._tables = {}
+
+    def __contains__(self, name):
+        return name in self.manifest["tables"]
+
+    def __iter__(self):
+        return iter(self.manifest["tables"])
+
+    def table(self, name):
+        """
+        Return a table as a pyarrow.Table whose buffers are mapped from the file, not copied.
+        """
+        if name not in self._tables:
+            if name not in self:
+                raise KeyError(name)
+            source = pa.memory_map(str(self.folder / f"{name}.arrow"))
+            self._tables[name] = pa.ipc.open_file(source).read_all()
+        return self._tables[name]
+
+    def df(self, name, columns=None):
+        """
+        Return a table (or some of its columns) as a pandas df, dictionary columns as categoricals.
+        """
+        table = self.table(name)
+        if columns is not None:
+            table = table.select(columns)
+        return table.to_pandas(date_as_object=False)
+
+    def stale(self, metadata_folder="data"):
+        """
+        Return the tables whose csv in metadata_folder changed, was added or removed since the snapshot.
+        """
+        current = {p.stem: file_hash(p) for p in Path(metadata_folder).glob("*.csv")}
+        built = {name: t["source"] for name, t in self.manifest["tables"].items()}
+        return sorted(name for name in set(current) | set(built) if current.get(name) != built.get(name))
+
+
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("out", nargs="?", default="snapshot", help="snapshot folder")
+    parser.add_argument("--metadata-folder", default="data")
+    parser.add_argument("--verify", action="store_true", help="check the snapshot is up to date instead of building it")
+    args = parser.parse_args()
+    if args.verify:
+        stale = Snapshot(args.out).stale(args.metadata_folder)
+        for name in stale:
+            print(f"{name}: out of date")
+        sys.exit(int(bool(stale)))
+    manifest = build(args.out, args.metadata_folder)
+    for name, t in manifest["tables"].items():
+        print(f"{name}: {t['rows']} rows")